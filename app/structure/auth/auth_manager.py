@@ -2,6 +2,9 @@ from flask_login import LoginManager, login_user, logout_user, login_required, c
 from flask import flash, redirect, url_for, request
 from functools import wraps
 from app.structure.database.models import User, db
+from app.structure.auth.password_hasher import init_password_hasher
+from app.structure.auth.user_cache import get_user_snapshot, init_user_cache
+from app.structure.functions.activity import record_activity
 from datetime import datetime
 import jwt
 import os
@@ -11,7 +14,8 @@ login_manager = LoginManager()
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Cópia somente leitura em cache: sem consulta ao banco na maioria das requisições
+    return get_user_snapshot(int(user_id))
 
 @login_manager.unauthorized_handler
 def unauthorized():
@@ -19,6 +23,8 @@ def unauthorized():
     return redirect(url_for('auth.login'))
 
 def init_auth(app):
+    init_password_hasher(app)
+    init_user_cache(app)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Por favor, faça login para acessar esta página.'
@@ -53,9 +59,8 @@ def verify_token(token):
         return None
 
 def update_last_login(user):
-    """Atualiza o último login do usuário"""
-    user.last_login = datetime.utcnow()
-    db.session.commit()
+    """Atualiza o último login do usuário (gravado em lote com a atividade)"""
+    record_activity(user.id, login=True)
 
 def create_user(username, email, password, first_name, last_name, is_admin=False):
     """Cria um novo usuário de forma segura"""
@@ -84,6 +89,10 @@ def authenticate_user(username, password):
     user = User.query.filter_by(username=username).first()
     
     if user and user.check_password(password) and user.is_active:
+        # Hash com custo antigo: regrava com o atual aproveitando a senha em mãos
+        if user.password_needs_rehash():
+            user.set_password(password)
+            db.session.commit()
         update_last_login(user)
         return user
     
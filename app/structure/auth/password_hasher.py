@@ -0,0 +1,125 @@
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import bcrypt
+
+DEFAULT_ROUNDS = 12
+
+class HasherBusyError(RuntimeError):
+    """Fila de hashing cheia ou lenta demais: a requisição deve ser recusada"""
+
+def _hashpw(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds)).decode('utf-8')
+
+def _checkpw(password, password_hash):
+    try:
+        return bcrypt.checkpw(password, password_hash)
+    except ValueError:  # hash corrompido ou em outro formato
+        return False
+
+def hash_rounds(password_hash):
+    """Custo (log2 das iterações) gravado no hash bcrypt, ou None se não for bcrypt"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+class PasswordHasher:
+    """
+    bcrypt fora da thread da requisição: hash e verificação rodam em um pool
+    de processos de tamanho fixo, então uma rajada de logins ocupa no máximo
+    `workers` núcleos e as demais rotas continuam sendo atendidas. Com
+    `workers=0` roda na própria thread (testes e scripts).
+    """
+
+    def __init__(self, rounds=DEFAULT_ROUNDS, workers=None, max_pending=None, timeout=None):
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+        self.configure(rounds, workers, max_pending, timeout)
+
+    def configure(self, rounds=DEFAULT_ROUNDS, workers=None, max_pending=None, timeout=None):
+        """Troca os parâmetros; o pool é recriado no próximo uso"""
+        self.shutdown()
+        self.rounds = rounds
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending) if max_pending else None
+
+    def _executor(self):
+        if self.workers == 0:
+            return None
+        with self._lock:
+            # Depois de um fork (gunicorn --preload) o pool do pai não serve
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.workers or os.cpu_count())
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _run(self, function, *args):
+        executor = self._executor()
+        if executor is None:
+            return function(*args)
+        slots = self._slots
+        if slots is not None and not slots.acquire(blocking=False):
+            raise HasherBusyError('Muitas verificações de senha na fila')
+        try:
+            future = executor.submit(function, *args)
+        except BaseException as error:
+            if slots is not None:
+                slots.release()
+            if isinstance(error, BrokenProcessPool):
+                self._discard(executor)
+                raise HasherBusyError('Pool de hashing reiniciado')
+            raise
+        # A vaga só volta quando o processo termina o trabalho, mesmo que a
+        # requisição já tenha desistido por timeout
+        if slots is not None:
+            future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise HasherBusyError('Verificação de senha demorou demais')
+        except BrokenProcessPool:
+            # Um processo do pool morreu (OOM, kill): o próximo uso cria outro
+            self._discard(executor)
+            raise HasherBusyError('Pool de hashing reiniciado')
+
+    def _discard(self, executor):
+        with self._lock:
+            if self._pool is executor:
+                self._pool = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def hash(self, password):
+        """Hash bcrypt da senha com o custo configurado"""
+        return self._run(_hashpw, password.encode('utf-8'), self.rounds)
+
+    def verify(self, password, password_hash):
+        """Verifica a senha contra o hash (False para senha ou hash ausentes)"""
+        if not password or not password_hash:
+            return False
+        return self._run(_checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    def needs_rehash(self, password_hash):
+        """O hash foi gerado com um custo diferente do configurado"""
+        return hash_rounds(password_hash) != self.rounds
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+password_hasher = PasswordHasher()
+atexit.register(password_hasher.shutdown)
+
+def init_password_hasher(app):
+    password_hasher.configure(
+        rounds=app.config.get('BCRYPT_ROUNDS', DEFAULT_ROUNDS),
+        workers=app.config.get('BCRYPT_WORKERS'),
+        max_pending=app.config.get('BCRYPT_MAX_PENDING'),
+        timeout=app.config.get('BCRYPT_TIMEOUT')
+    )
@@ -0,0 +1,119 @@
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.structure.database.models import User, db
+from app.structure.functions.cache import cache, LocalCache
+
+USER_EXPIRE_TIME = 60
+USER_LOCAL_EXPIRE_TIME = 5
+USER_LOCAL_ENTRIES = 10000
+SNAPSHOT_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name',
+                   'is_active', 'is_admin', 'created_at', 'last_login')
+DATETIME_FIELDS = ('created_at', 'last_login')
+
+def user_tag(user_id):
+    return f'user_account:{user_id}'
+
+class UserSnapshot:
+    """
+    Cópia somente leitura do usuário logado, usada como current_user nas
+    requisições comuns. Para alterar o usuário, carregue a instância do banco
+    com load().
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, data):
+        for name in SNAPSHOT_FIELDS:
+            value = data.get(name)
+            if name in DATETIME_FIELDS and isinstance(value, str):
+                value = datetime.fromisoformat(value)
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'UserSnapshot é somente leitura; use load() para alterar {name}')
+
+    def get_id(self):
+        return str(self.id)
+
+    def load(self):
+        """Instância ORM do usuário, para rotas que o alteram"""
+        return db.session.get(User, self.id)
+
+    def __eq__(self, other):
+        return isinstance(other, (UserSnapshot, User)) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f'<UserSnapshot {self.username}>'
+
+def _snapshot_data(user_id):
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    data = {name: getattr(user, name) for name in SNAPSHOT_FIELDS}
+    for name in DATETIME_FIELDS:
+        if data[name] is not None:
+            data[name] = data[name].isoformat()
+    return data
+
+# Sem Redis: cópias na memória do processo por poucos segundos
+_local_snapshots = LocalCache(max_entries=USER_LOCAL_ENTRIES)
+
+def get_user_snapshot(user_id):
+    """
+    Usuário para o Flask-Login, do Redis por até USER_CACHE_TTL segundos.
+    None se o usuário não existir. Com cache local (ou null) a invalidação
+    feita por um worker não chega aos outros, então cada processo guarda a
+    cópia por só USER_LOCAL_CACHE_TTL segundos: é o atraso máximo para uma
+    alteração da conta (nome, permissão de administrador) valer em todos.
+    """
+    if not cache.shared:
+        data = _local_snapshots.get(user_tag(user_id))
+        if data is None:
+            data = _snapshot_data(user_id)
+            if data is not None:
+                _local_snapshots.set(user_tag(user_id), data, USER_LOCAL_EXPIRE_TIME)
+        return UserSnapshot(data) if data is not None else None
+    key = cache.tagged_key(f'user_snapshot:{user_id}', (user_tag(user_id),))
+    data = cache.get_or_set(key, lambda: _snapshot_data(user_id), USER_EXPIRE_TIME)
+    return UserSnapshot(data) if data is not None else None
+
+def editable_user(user):
+    """Instância ORM de current_user (que pode ser um UserSnapshot)"""
+    return user.load() if isinstance(user, UserSnapshot) else user
+
+def invalidate_user(*user_ids):
+    """Descarta as cópias em cache (necessário após UPDATE/DELETE em massa em users)"""
+    _local_snapshots.delete(*(user_tag(user_id) for user_id in user_ids))
+    cache.invalidate_tag(*(user_tag(user_id) for user_id in user_ids))
+
+# Como no pacote de quiz: os usuários alterados são anotados durante o flush
+# e as cópias só são invalidadas depois do commit.
+
+def _user_changed(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_users', set()).add(target.id)
+
+for _event in ('after_update', 'after_delete'):
+    event.listen(User, _event, _user_changed)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_users(session):
+    user_ids = session.info.pop('changed_users', None)
+    if user_ids:
+        invalidate_user(*user_ids)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_user_changes(session):
+    session.info.pop('changed_users', None)
+
+def init_user_cache(app):
+    global USER_EXPIRE_TIME, USER_LOCAL_EXPIRE_TIME
+    USER_EXPIRE_TIME = app.config.get('USER_CACHE_TTL', USER_EXPIRE_TIME)
+    USER_LOCAL_EXPIRE_TIME = app.config.get('USER_LOCAL_CACHE_TTL', USER_LOCAL_EXPIRE_TIME)
+    # Os ids são do banco desta aplicação
+    _local_snapshots.delete_pattern('*')
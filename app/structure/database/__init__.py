@@ -1,12 +1,26 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from sqlalchemy import event
 
 db = SQLAlchemy()
 migrate = Migrate()
 
+def _sqlite_pragmas(busy_timeout):
+    # WAL: leituras não bloqueiam a escrita das filas em segundo plano (e
+    # vice-versa); busy_timeout: escritas concorrentes esperam em vez de falhar
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute(f'PRAGMA busy_timeout={int(busy_timeout)}')
+        cursor.close()
+    return on_connect
+
 def init_app(app):
     db.init_app(app)
     migrate.init_app(app, db)
     
     with app.app_context():
+        engine = db.engine
+        if engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:'):
+            event.listen(engine, 'connect', _sqlite_pragmas(app.config.get('SQLITE_BUSY_TIMEOUT', 5000)))
         db.create_all()
@@ -0,0 +1,301 @@
+import random
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+import click
+from flask.cli import AppGroup
+from app.structure.database import db
+from app.structure.database.models import (
+    User, Subject, Topic, StudyMaterial, Question, Answer, StudySession,
+    ProgressRecord, MaterialCompletion, QuizAttempt, UserAnswer, ProgressRollup
+)
+from app.structure.auth.password_hasher import password_hasher
+from app.structure.functions.progress_rollup import rebuild_rollups, REBUILD_CHUNK_SIZE
+from app.structure.functions.fuzzy_search import rebuild_trigram_index
+from app.structure.functions.counters import reconcile_counters
+
+DEFAULT_PASSWORD = 'enem123'
+CHUNK_SIZE = 10000
+
+dataset_cli = AppGroup('dataset', help='Geração de bases sintéticas para testes de desempenho.')
+
+SUBJECTS = (
+    ('Português', 'Linguagens', '#3498db', 'language'),
+    ('Matemática', 'Matemática', '#27ae60', 'calculator'),
+    ('História', 'Ciências Humanas', '#f39c12', 'landmark'),
+    ('Geografia', 'Ciências Humanas', '#e67e22', 'globe'),
+    ('Filosofia', 'Ciências Humanas', '#9b59b6', 'brain'),
+    ('Sociologia', 'Ciências Humanas', '#34495e', 'users'),
+    ('Física', 'Ciências da Natureza', '#e74c3c', 'atom'),
+    ('Química', 'Ciências da Natureza', '#1abc9c', 'flask'),
+    ('Biologia', 'Ciências da Natureza', '#2ecc71', 'dna'),
+    ('Inglês', 'Linguagens', '#8e44ad', 'comments'),
+)
+
+WORDS = (
+    'função', 'equação', 'revolução', 'célula', 'energia', 'movimento', 'território', 'cidadania',
+    'literatura', 'gramática', 'probabilidade', 'geometria', 'ecologia', 'genética', 'reação',
+    'clima', 'urbanização', 'república', 'império', 'ética', 'linguagem', 'interpretação',
+    'argumento', 'texto', 'gráfico', 'tabela', 'fração', 'porcentagem', 'velocidade', 'onda',
+    'eletricidade', 'orgânica', 'ácido', 'evolução', 'sociedade', 'cultura', 'economia', 'trabalho',
+)
+
+@dataclass(frozen=True)
+class DatasetSize:
+    """Volumes da base gerada (sessões e tentativas por usuário variam em torno da média)"""
+    users: int
+    sessions: int
+    questions: int
+    topics: int
+    materials: int
+    quizzes_per_session: float = 0.2
+    answers_per_quiz: int = 0  # respostas individuais por tentativa (0 = não gera user_answers)
+
+SCALES = {
+    'tiny': DatasetSize(users=200, sessions=10000, questions=2000, topics=100, materials=1000),
+    'small': DatasetSize(users=10000, sessions=500000, questions=20000, topics=500, materials=10000),
+    'medium': DatasetSize(users=100000, sessions=5000000, questions=100000, topics=1000, materials=50000),
+    'production': DatasetSize(users=1000000, sessions=50000000, questions=200000, topics=2000, materials=100000),
+}
+
+class _Loader:
+    """Acumula linhas por tabela e insere em blocos, sempre na ordem das chaves estrangeiras"""
+
+    ORDER = (User, StudySession, ProgressRecord, MaterialCompletion, QuizAttempt, UserAnswer)
+
+    def __init__(self, chunk_size):
+        self.chunk_size = chunk_size
+        self.rows = {model: [] for model in self.ORDER}
+        self.counts = dict.fromkeys(self.ORDER, 0)
+
+    def add(self, model, row):
+        buffer = self.rows[model]
+        buffer.append(row)
+        if len(buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        for model in self.ORDER:
+            buffer = self.rows[model]
+            if buffer:
+                db.session.execute(model.__table__.insert(), buffer)
+                self.counts[model] += len(buffer)
+                buffer.clear()
+        db.session.commit()
+
+def _bulk(model, rows, chunk_size):
+    """Insere um gerador de linhas em blocos; retorna a quantidade"""
+    count, chunk = 0, []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            db.session.execute(model.__table__.insert(), chunk)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(model.__table__.insert(), chunk)
+        count += len(chunk)
+    db.session.commit()
+    return count
+
+def _advance_sequences(*models):
+    """
+    A carga informa os ids explicitamente, o que não avança as sequências do
+    PostgreSQL: sem isto, o próximo INSERT da aplicação receberia o id 1 e
+    colidiria com a chave primária. No SQLite o próximo id já vem do MAX(id).
+    """
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return
+    for model in models:
+        table = model.__tablename__
+        db.session.execute(db.text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM {table}"))
+    db.session.commit()
+
+def _sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+def _catalog_rows(size, seed, now):
+    """Disciplinas, tópicos, materiais, questões e alternativas com ids fixos"""
+    # Um gerador por tabela: mudar o volume de uma não altera o conteúdo das outras
+    rng = {name: random.Random(f'{seed}:{name}') for name in ('topics', 'materials', 'questions', 'answers')}
+    subjects = [{'id': i + 1, 'name': name, 'description': f'{name} para o ENEM', 'area': area,
+                 'color': color, 'icon': icon, 'is_active': True, 'created_at': now}
+                for i, (name, area, color, icon) in enumerate(SUBJECTS)]
+    n_subjects = len(subjects)
+    r = rng['topics']
+    topics = ({'id': t, 'name': f'{r.choice(WORDS).capitalize()} e {r.choice(WORDS)} {t}',
+               'description': _sentence(r, 8), 'subject_id': (t - 1) % n_subjects + 1,
+               'difficulty_level': r.randint(1, 5), 'estimated_hours': r.choice((1.0, 2.0, 4.0)),
+               'is_active': t % 50 != 0, 'created_at': now}
+              for t in range(1, size.topics + 1))
+    r = rng['materials']
+    materials = ({'id': m, 'title': f'{r.choice(WORDS).capitalize()}: {r.choice(WORDS)} e {r.choice(WORDS)}',
+                  'content': ' '.join(_sentence(r, 12) for _ in range(6)), 'material_type': 'text',
+                  'topic_id': (m - 1) % size.topics + 1,
+                  'subject_id': ((m - 1) % size.topics) % n_subjects + 1,
+                  'difficulty_level': r.randint(1, 5), 'estimated_time': r.choice((10, 15, 30)),
+                  'is_active': m % 40 != 0, 'created_at': now, 'updated_at': now}
+                 for m in range(1, size.materials + 1))
+    r = rng['questions']
+    questions = ({'id': q, 'question_text': _sentence(r, 14)[:-1] + '?', 'question_type': 'multiple_choice',
+                  'difficulty_level': r.randint(1, 3), 'topic_id': (q - 1) % size.topics + 1,
+                  'subject_id': ((q - 1) % size.topics) % n_subjects + 1,
+                  'is_active': q % 30 != 0, 'created_at': now}
+                 for q in range(1, size.questions + 1))
+    r = rng['answers']
+    answers = ({'id': (q - 1) * 5 + j + 1, 'answer_text': _sentence(r, 5), 'is_correct': j == q % 5,
+                'question_id': q}
+               for q in range(1, size.questions + 1) for j in range(5))
+    return ((Subject, subjects), (Topic, topics), (StudyMaterial, materials),
+            (Question, questions), (Answer, answers))
+
+def _active_materials(size):
+    """Materiais ativos por tópico (o total usado no progresso do tópico)"""
+    totals = [0] * (size.topics + 1)
+    for material in range(1, size.materials + 1):
+        if material % 40 != 0:
+            totals[(material - 1) % size.topics + 1] += 1
+    return totals
+
+def _user_activity(loader, user_id, size, rng, now, attempt_ids, totals):
+    """Sessões, progresso, conclusões e quizzes de um usuário, coerentes entre si"""
+    n_subjects = len(SUBJECTS)
+    mean = size.sessions / size.users
+    # Atividade bem desigual entre alunos (exponencial), com a média pedida
+    sessions = int(mean * rng.expovariate(1.0) + rng.random())
+
+    completed, last_studied, topics = {}, {}, []
+    for _ in range(sessions):
+        # Materiais do início do catálogo são mais procurados
+        material = min(size.materials, 1 + int(size.materials * rng.random() ** 2))
+        topic = (material - 1) % size.topics + 1
+        subject = (topic - 1) % n_subjects + 1
+        start = now - timedelta(minutes=rng.randint(0, 60 * 24 * 180))
+        done = rng.random() < 0.7
+        duration = rng.randint(5, 60) if done else None
+        loader.add(StudySession, {
+            'user_id': user_id, 'subject_id': subject, 'topic_id': topic, 'material_id': material,
+            'start_time': start, 'end_time': start + timedelta(minutes=duration) if done else None,
+            'duration_minutes': duration, 'completed': done, 'session_token': None, 'notes': None})
+        topics.append(topic)
+        if done:
+            end = start + timedelta(minutes=duration)
+            completed[material] = min(completed.get(material, end), end)
+            last_studied[topic] = max(last_studied.get(topic, end), end)
+
+    per_topic = {}
+    for material, completed_at in completed.items():
+        topic = (material - 1) % size.topics + 1
+        per_topic[topic] = per_topic.get(topic, 0) + 1
+        loader.add(MaterialCompletion, {'user_id': user_id, 'material_id': material,
+                                        'topic_id': topic, 'completed_at': completed_at})
+    for topic, done in per_topic.items():
+        total = max(totals[topic], done)
+        loader.add(ProgressRecord, {
+            'user_id': user_id, 'subject_id': (topic - 1) % n_subjects + 1, 'topic_id': topic,
+            'progress_percentage': min(100.0, done * 100.0 / total), 'materials_completed': done,
+            'total_materials': total, 'last_studied': last_studied[topic], 'updated_at': last_studied[topic]})
+
+    for _ in range(int(sessions * size.quizzes_per_session + rng.random())):
+        topic = rng.choice(topics)
+        correct = rng.randint(0, 10)
+        attempt_id = next(attempt_ids)
+        loader.add(QuizAttempt, {
+            'id': attempt_id, 'user_id': user_id, 'subject_id': (topic - 1) % n_subjects + 1,
+            'topic_id': topic, 'score': correct * 10.0, 'total_questions': 10, 'correct_answers': correct,
+            'time_taken': rng.randint(120, 1800), 'completed': True,
+            'created_at': now - timedelta(minutes=rng.randint(0, 60 * 24 * 180))})
+        for i in range(size.answers_per_quiz):
+            question = (topic - 1) + (i * size.topics) + 1
+            if question > size.questions:
+                break
+            is_correct = i < correct
+            loader.add(UserAnswer, {
+                'quiz_attempt_id': attempt_id, 'question_id': question,
+                'selected_answer_id': (question - 1) * 5 + (question % 5 if is_correct else (question + 1) % 5) + 1,
+                'is_correct': is_correct, 'time_taken': rng.randint(10, 180)})
+
+def generate_dataset(size, seed=42, password=DEFAULT_PASSWORD, chunk_size=CHUNK_SIZE, as_of=None, echo=None):
+    """
+    Gera uma base sintética determinística (mesma semente e mesma data de
+    referência `as_of`, por padrão hoje à meia-noite: mesmos dados) em um
+    banco vazio. As linhas são produzidas sob demanda e inseridas em
+    blocos de `chunk_size`, então a memória não cresce com o volume. Todos
+    os usuários (aluno1, aluno2, ...) usam a mesma senha, com o hash
+    calculado uma única vez. Retorna {tabela: linhas inseridas}.
+    """
+    echo = echo or (lambda message: None)
+    now = as_of or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    counts = {}
+    started = time.perf_counter()
+
+    def report(table, count):
+        counts[table] = count
+        echo(f'{table:20} {count:>12,} linhas  ({time.perf_counter() - started:6.1f}s)')
+
+    for model, rows in _catalog_rows(size, seed, now):
+        report(model.__tablename__, _bulk(model, rows, chunk_size))
+
+    password_hash = password_hasher.hash(password)
+    users = ({'id': u, 'username': f'aluno{u}', 'email': f'aluno{u}@example.com', 'password_hash': password_hash,
+              'first_name': 'Aluno', 'last_name': str(u), 'is_active': True, 'is_admin': u == 1,
+              'created_at': now - timedelta(days=u % 365)}
+             for u in range(1, size.users + 1))
+
+    loader = _Loader(chunk_size)
+    attempt_ids = iter(range(1, 2 ** 62))
+    totals = _active_materials(size)
+    for user in users:
+        loader.add(User, user)
+        # Gerador por usuário: o aluno N é o mesmo em qualquer escala
+        _user_activity(loader, user['id'], size, random.Random(f'{seed}:user:{user["id"]}'), now, attempt_ids, totals)
+    loader.flush()
+    for model, count in loader.counts.items():
+        report(model.__tablename__, count)
+    _advance_sequences(Subject, Topic, StudyMaterial, Question, Answer, User, QuizAttempt)
+
+    # Agregados em blocos de usuários, com a mesma regra do recálculo
+    for start in range(1, size.users + 1, REBUILD_CHUNK_SIZE):
+        rebuild_rollups(list(range(start, min(start + REBUILD_CHUNK_SIZE, size.users + 1))))
+    report('progress_rollups', db.session.query(db.func.count(ProgressRollup.id)).scalar())
+    report('search_terms', rebuild_trigram_index())
+    # A carga usa INSERT em massa, que não passa pelos eventos dos contadores
+    reconcile_counters()
+    return counts
+
+@dataset_cli.command('generate')
+@click.option('--scale', type=click.Choice(list(SCALES)), default='small', show_default=True,
+              help='Volumes pré-definidos; as opções abaixo sobrescrevem cada um.')
+@click.option('--users', type=int)
+@click.option('--sessions', type=int)
+@click.option('--questions', type=int)
+@click.option('--topics', type=int)
+@click.option('--materials', type=int)
+@click.option('--answers-per-quiz', type=int, help='Gera user_answers (0 = não gera).')
+@click.option('--seed', type=int, default=42, show_default=True)
+@click.option('--password', default=DEFAULT_PASSWORD, show_default=True, help='Senha de todos os usuários.')
+@click.option('--chunk-size', type=int, default=CHUNK_SIZE, show_default=True)
+@click.option('--as-of', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Data de referência das datas geradas (padrão: hoje).')
+@click.option('--reset', is_flag=True, help='Apaga e recria todas as tabelas antes de gerar.')
+def generate_command(scale, seed, password, chunk_size, as_of, reset, **overrides):
+    """Gera uma base sintética de alto volume (ex.: --scale production)."""
+    size = replace(SCALES[scale], **{name: value for name, value in overrides.items() if value is not None})
+    if reset:
+        db.drop_all()
+        db.create_all()
+    elif db.session.query(User.id).first() is not None or db.session.query(Subject.id).first() is not None:
+        raise click.ClickException('O banco já tem dados; use --reset para recriá-lo.')
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        # Carga descartável: sem fsync a cada bloco
+        db.session.execute(db.text('PRAGMA synchronous = OFF'))
+    click.echo(f'Gerando base {scale} ({size}) em {dialect}...')
+    generate_dataset(size, seed=seed, password=password, chunk_size=chunk_size, as_of=as_of, echo=click.echo)
+    if dialect == 'sqlite':
+        db.session.execute(db.text('ANALYZE'))
+    db.session.commit()
+    click.echo(f'✅ Base gerada. Login: aluno1 (admin) ... aluno{size.users}, senha "{password}".')
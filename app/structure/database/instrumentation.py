@@ -0,0 +1,97 @@
+import logging
+import re
+import time
+from collections import Counter
+from flask import g, has_app_context, current_app, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SLOWEST_STATEMENTS = 3
+
+class NPlusOneError(AssertionError):
+    """A mesma consulta se repetiu mais vezes do que o permitido em uma requisição"""
+
+class QueryStats:
+    """Consultas executadas durante uma requisição"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes = Counter()
+        self.slowest = []  # (ms, statement)
+
+    def record(self, statement, elapsed_ms):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        shape = statement_shape(statement)
+        self.shapes[shape] += 1
+        self.slowest.append((elapsed_ms, shape))
+        self.slowest.sort(key=lambda item: item[0], reverse=True)
+        del self.slowest[SLOWEST_STATEMENTS:]
+        return shape, self.shapes[shape]
+
+    def server_timing(self):
+        return f'db;dur={self.total_ms:.1f};desc="{self.count} queries"'
+
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)|\(\s*%\(\w+\)s(?:\s*,\s*%\(\w+\)s)+\s*\)')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+def statement_shape(statement):
+    """Forma normalizada de um comando: sem literais e com listas IN de qualquer tamanho iguais"""
+    shape = _LITERAL.sub('?', ' '.join(statement.split()))
+    return _IN_LIST.sub('(?)', shape)
+
+def current_stats():
+    """Estatísticas da requisição corrente (None fora de requisições)"""
+    return g.get('_query_stats') if has_app_context() else None
+
+# O início fica no contexto de execução do próprio comando: um comando que
+# falha é descartado junto com ele, sem deixar sobras para o próximo
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_stats() is not None and context is not None:
+        context._query_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats()
+    start = getattr(context, '_query_start', None)
+    if stats is None or start is None:
+        return
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    shape, repeats = stats.record(statement, elapsed_ms)
+
+    limit = current_app.config.get('SQL_N_PLUS_ONE_LIMIT')
+    if limit and repeats > limit:
+        raise NPlusOneError(
+            f'{request.method} {request.path}: consulta repetida {repeats} vezes '
+            f'(limite {limit}), provável N+1:\n{shape}')
+
+def _start_request():
+    g._query_stats = QueryStats()
+
+def _finish_request(response):
+    stats = g.pop('_query_stats', None)
+    if stats is None:
+        return response
+    if current_app.config.get('SQL_SERVER_TIMING'):
+        response.headers.add('Server-Timing', stats.server_timing())
+    if logger.isEnabledFor(logging.DEBUG):
+        slowest = '; '.join(f'{ms:.1f}ms {shape[:120]}' for ms, shape in stats.slowest)
+        logger.debug('%s %s: %d queries em %.1fms | mais lentas: %s',
+                     request.method, request.path, stats.count, stats.total_ms, slowest)
+    return response
+
+def init_instrumentation(app):
+    """
+    Mede as consultas SQL de cada requisição: quantidade, tempo total e as
+    mais lentas, publicadas no cabeçalho Server-Timing (SQL_SERVER_TIMING) e
+    no log em nível DEBUG. Com SQL_N_PLUS_ONE_LIMIT, uma requisição que
+    repete a mesma forma de consulta mais vezes que o limite falha com
+    NPlusOneError (use nos testes).
+    """
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
@@ -0,0 +1,56 @@
+from sqlalchemy.orm import configure_mappers, defer, joinedload, load_only, selectinload, with_expression
+from app.structure.database.models import (
+    Topic, StudyMaterial, Question, StudySession, db
+)
+
+# Os backrefs (Topic.subject...) só existem depois de configurar os mapeamentos
+configure_mappers()
+
+PREVIEW_LENGTH = 100
+QUESTION_PREVIEWS = 6  # questões mostradas na página do tópico
+
+def _material_preview():
+    """Materiais em listas: sem o conteúdo completo, só o início para o resumo"""
+    return (defer(StudyMaterial.content),
+            with_expression(StudyMaterial.content_preview,
+                            db.func.substr(StudyMaterial.content, 1, PREVIEW_LENGTH + 1)))
+
+# Perfis de carregamento por tela: cada um lista os relacionamentos que o
+# template usa, carregados com um número fixo de consultas (selectinload para
+# coleções, joinedload para muitos-para-um). Assim a quantidade de consultas
+# não cresce com o número de linhas exibidas. Coleções das quais a tela só
+# mostra o tamanho não entram aqui: use count_by_topic().
+PROFILES = {
+    # Tópico: disciplina e materiais (resumidos); as questões vêm de question_previews()
+    'topic_detail': (
+        joinedload(Topic.subject),
+        selectinload(Topic.study_materials).options(*_material_preview()),
+    ),
+    # Material aberto para estudo: conteúdo completo com tópico e disciplina
+    'study_material': (
+        joinedload(StudyMaterial.topic).joinedload(Topic.subject),
+    ),
+    # Sessões recentes no dashboard e na página de progresso
+    'recent_sessions': (
+        joinedload(StudySession.subject),
+        joinedload(StudySession.topic).load_only(Topic.id, Topic.name),
+    ),
+}
+
+def profile(name):
+    """Opções de carregamento de uma tela, para usar em query.options(*profile(...))"""
+    return PROFILES[name]
+
+def count_by_topic(model, topic_ids):
+    """{topic_id: quantidade de linhas de `model`} com uma consulta agrupada, sem carregar as linhas"""
+    if not topic_ids:
+        return {}
+    return dict(db.session.query(model.topic_id, db.func.count(model.id))
+                .filter(model.topic_id.in_(topic_ids))
+                .group_by(model.topic_id))
+
+def question_previews(topic_id, limit=QUESTION_PREVIEWS):
+    """As primeiras questões do tópico, só com as colunas mostradas na página"""
+    return Question.query.options(load_only(
+        Question.id, Question.question_text, Question.question_type, Question.difficulty_level))\
+        .filter_by(topic_id=topic_id).order_by(Question.id).limit(limit).all()
@@ -1,11 +1,20 @@
 from datetime import datetime
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
-import bcrypt
 from app.structure.database import db
+from app.structure.auth.password_hasher import password_hasher
+
+# Índices parciais: só as linhas ativas, para contar/listar o catálogo ativo
+# sem ler as inativas
+ACTIVE_ONLY = {'sqlite_where': db.text('is_active = 1'), 'postgresql_where': db.text('is_active')}
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_last_login', 'last_login'),
+        db.Index('ix_users_admin', 'is_admin', sqlite_where=db.text('is_admin = 1'),
+                 postgresql_where=db.text('is_admin')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -17,20 +26,26 @@ class User(UserMixin, db.Model):
     is_admin = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime)
+    last_seen = db.Column(db.DateTime)  # última requisição, gravada em lote
     
     # Relacionamentos
     study_sessions = db.relationship('StudySession', backref='user', lazy=True, cascade='all, delete-orphan')
     progress_records = db.relationship('ProgressRecord', backref='user', lazy=True, cascade='all, delete-orphan')
     quiz_attempts = db.relationship('QuizAttempt', backref='user', lazy=True, cascade='all, delete-orphan')
+    progress_rollups = db.relationship('ProgressRollup', backref='user', lazy=True, cascade='all, delete-orphan')
+    material_completions = db.relationship('MaterialCompletion', backref='user', lazy=True, cascade='all, delete-orphan')
     
     def set_password(self, password):
-        """Hash da senha usando bcrypt"""
-        salt = bcrypt.gensalt()
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+        """Hash da senha usando bcrypt (no pool de processos, com o custo configurado)"""
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
         """Verifica se a senha está correta"""
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        return password_hasher.verify(password, self.password_hash)
+    
+    def password_needs_rehash(self):
+        """O hash foi gerado com um custo bcrypt diferente do atual"""
+        return password_hasher.needs_rehash(self.password_hash)
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -56,6 +71,10 @@ class Subject(db.Model):
 
 class Topic(db.Model):
     __tablename__ = 'topics'
+    __table_args__ = (
+        db.Index('ix_topics_subject_active', 'subject_id', 'is_active'),
+        db.Index('ix_topics_active', 'is_active', **ACTIVE_ONLY),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
@@ -75,6 +94,10 @@ class Topic(db.Model):
 
 class StudyMaterial(db.Model):
     __tablename__ = 'study_materials'
+    __table_args__ = (
+        db.Index('ix_study_materials_topic_active', 'topic_id', 'is_active'),
+        db.Index('ix_study_materials_active', 'is_active', **ACTIVE_ONLY),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -88,12 +111,19 @@ class StudyMaterial(db.Model):
     estimated_time = db.Column(db.Integer, default=15)  # em minutos
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # revisão (Last-Modified da página)
+    
+    # Início do conteúdo, preenchido pelos perfis de carregamento das listas
+    content_preview = db.query_expression()
     
     def __repr__(self):
         return f'<StudyMaterial {self.title}>'
 
 class Question(db.Model):
     __tablename__ = 'questions'
+    __table_args__ = (
+        db.Index('ix_questions_topic_active', 'topic_id', 'is_active', 'difficulty_level'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     question_text = db.Column(db.Text, nullable=False)
@@ -112,6 +142,9 @@ class Question(db.Model):
 
 class Answer(db.Model):
     __tablename__ = 'answers'
+    __table_args__ = (
+        db.Index('ix_answers_question', 'question_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     answer_text = db.Column(db.Text, nullable=False)
@@ -124,8 +157,14 @@ class Answer(db.Model):
 
 class StudySession(db.Model):
     __tablename__ = 'study_sessions'
+    __table_args__ = (
+        db.Index('ix_study_sessions_user_start', 'user_id', 'start_time'),
+        db.Index('ix_study_sessions_start', 'start_time'),
+        db.Index('uq_study_sessions_token', 'session_token', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
+    session_token = db.Column(db.String(32))  # identifica a sessão no formulário de conclusão
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     subject_id = db.Column(db.Integer, db.ForeignKey('subjects.id'), nullable=False)
     topic_id = db.Column(db.Integer, db.ForeignKey('topics.id'), nullable=False)
@@ -136,11 +175,20 @@ class StudySession(db.Model):
     completed = db.Column(db.Boolean, default=False)
     notes = db.Column(db.Text)
     
+    # Relacionamentos
+    subject = db.relationship('Subject', lazy=True)
+    topic = db.relationship('Topic', lazy=True)
+    material = db.relationship('StudyMaterial', lazy=True)
+    
     def __repr__(self):
         return f'<StudySession {self.id}>'
 
 class ProgressRecord(db.Model):
     __tablename__ = 'progress_records'
+    __table_args__ = (
+        db.Index('uq_progress_records_user_topic', 'user_id', 'topic_id', unique=True),
+        db.Index('ix_progress_records_user_subject_topic', 'user_id', 'subject_id', 'topic_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -155,8 +203,26 @@ class ProgressRecord(db.Model):
     def __repr__(self):
         return f'<ProgressRecord {self.id}>'
 
+class MaterialCompletion(db.Model):
+    __tablename__ = 'material_completions'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'material_id', name='uq_material_completions_user_material'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    material_id = db.Column(db.Integer, db.ForeignKey('study_materials.id'), nullable=False)
+    topic_id = db.Column(db.Integer, db.ForeignKey('topics.id'), nullable=False)
+    completed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<MaterialCompletion {self.user_id}:{self.material_id}>'
+
 class QuizAttempt(db.Model):
     __tablename__ = 'quiz_attempts'
+    __table_args__ = (
+        db.Index('ix_quiz_attempts_user_completed', 'user_id', 'completed'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -167,16 +233,24 @@ class QuizAttempt(db.Model):
     correct_answers = db.Column(db.Integer, default=0)
     time_taken = db.Column(db.Integer)  # em segundos
     completed = db.Column(db.Boolean, default=False)
+    question_ids = db.Column(db.Text)  # ids das questões sorteadas (JSON), validados na correção
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Relacionamentos
+    user_answers = db.relationship('UserAnswer', backref='quiz_attempt', lazy=True, cascade='all, delete-orphan')
+    
     def __repr__(self):
         return f'<QuizAttempt {self.id}>'
 
 class UserAnswer(db.Model):
     __tablename__ = 'user_answers'
+    __table_args__ = (
+        db.Index('ix_user_answers_attempt', 'quiz_attempt_id'),
+        db.Index('ix_user_answers_question', 'question_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    quiz_attempt_id = db.Column(db.Integer, db.ForeignKey('quiz_attempts.id'), nullable=False)
+    quiz_attempt_id = db.Column(db.Integer, db.ForeignKey('quiz_attempts.id', ondelete='CASCADE'), nullable=False)
     question_id = db.Column(db.Integer, db.ForeignKey('questions.id'), nullable=False)
     selected_answer_id = db.Column(db.Integer, db.ForeignKey('answers.id'), nullable=False)
     is_correct = db.Column(db.Boolean, default=False)
@@ -184,3 +258,74 @@ class UserAnswer(db.Model):
     
     def __repr__(self):
         return f'<UserAnswer {self.id}>'
+
+class ProgressRollup(db.Model):
+    __tablename__ = 'progress_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'subject_id', name='uq_progress_rollups_user_subject'),
+    )
+    
+    # subject_id = 0 guarda os totais gerais do usuário
+    TOTALS_SUBJECT_ID = 0
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    subject_id = db.Column(db.Integer, nullable=False, default=0)
+    topics_started = db.Column(db.Integer, nullable=False, default=0)
+    topics_completed = db.Column(db.Integer, nullable=False, default=0)
+    progress_sum = db.Column(db.Float, nullable=False, default=0.0)  # soma das porcentagens dos tópicos
+    materials_completed = db.Column(db.Integer, nullable=False, default=0)
+    total_materials = db.Column(db.Integer, nullable=False, default=0)
+    study_minutes = db.Column(db.Integer, nullable=False, default=0)
+    quizzes_completed = db.Column(db.Integer, nullable=False, default=0)
+    quiz_score_sum = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @property
+    def progress_percentage(self):
+        return self.progress_sum / self.topics_started if self.topics_started else 0.0
+    
+    @property
+    def average_quiz_score(self):
+        return self.quiz_score_sum / self.quizzes_completed if self.quizzes_completed else 0.0
+    
+    def __repr__(self):
+        return f'<ProgressRollup {self.user_id}:{self.subject_id}>'
+
+class SearchTerm(db.Model):
+    __tablename__ = 'search_terms'
+    __table_args__ = (
+        db.UniqueConstraint('doc_type', 'doc_id', name='uq_search_terms_doc'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    doc_type = db.Column(db.String(20), nullable=False)  # material, topic
+    doc_id = db.Column(db.Integer, nullable=False)
+    folded = db.Column(db.String(200), nullable=False)  # minúsculo e sem acentos
+    trigram_count = db.Column(db.Integer, nullable=False, default=0)
+    is_active = db.Column(db.Boolean, default=True)
+    
+    def __repr__(self):
+        return f'<SearchTerm {self.doc_type}:{self.doc_id}>'
+
+class SearchTrigram(db.Model):
+    __tablename__ = 'search_trigrams'
+    __table_args__ = (
+        db.Index('ix_search_trigrams_term_id', 'term_id'),
+    )
+    
+    trigram = db.Column(db.String(3), primary_key=True)
+    term_id = db.Column(db.Integer, db.ForeignKey('search_terms.id'), primary_key=True)
+    
+    def __repr__(self):
+        return f'<SearchTrigram {self.trigram}:{self.term_id}>'
+
+class Counter(db.Model):
+    __tablename__ = 'counters'
+    
+    # Ex.: materials (todos) e materials_active; mantidos por functions/counters.py
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)  # versões: milissegundos do relógio
+    
+    def __repr__(self):
+        return f'<Counter {self.name}={self.value}>'
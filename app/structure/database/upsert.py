@@ -0,0 +1,18 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from app.structure.database import db
+
+_DIALECTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+def insert(model):
+    """
+    INSERT com suporte a ON CONFLICT (on_conflict_do_nothing /
+    on_conflict_do_update) para o banco em uso: SQLite ou PostgreSQL.
+    """
+    dialect = db.session.get_bind().dialect.name
+    try:
+        return _DIALECTS[dialect](model)
+    except KeyError:
+        raise NotImplementedError(f'Upsert não suportado para o banco {dialect}')
@@ -0,0 +1,50 @@
+from datetime import datetime
+from flask import request
+from flask_login import current_user
+from sqlalchemy import bindparam
+from app.structure.database.models import User, db
+from app.structure.functions.write_behind import WriteBehindBuffer
+from app.structure.auth.user_cache import invalidate_user
+
+def _merge(old, new):
+    return {'user_id': new['user_id'],
+            'last_seen': max(old['last_seen'], new['last_seen']),
+            'last_login': new['last_login'] or old['last_login']}
+
+def _write_activity(rows):
+    users = User.__table__
+    # Um UPDATE por lote (executemany), igual no SQLite e no PostgreSQL
+    db.session.execute(
+        users.update().where(users.c.id == bindparam('user')).values(last_seen=bindparam('seen')),
+        [{'user': row['user_id'], 'seen': row['last_seen']} for row in rows])
+    logins = [{'user': row['user_id'], 'login': row['last_login']} for row in rows if row['last_login']]
+    if logins:
+        db.session.execute(
+            users.update().where(users.c.id == bindparam('user')).values(last_login=bindparam('login')),
+            logins)
+    db.session.commit()
+    # UPDATE em massa não passa pelos eventos do ORM
+    if logins:
+        invalidate_user(*(login['user'] for login in logins))
+
+# Último acesso e último login ficam em memória, um registro por usuário, e
+# são gravados juntos a cada ACTIVITY_FLUSH_INTERVAL: no máximo uma escrita
+# por usuário por intervalo, por mais requisições que ele faça.
+activity_buffer = WriteBehindBuffer('activity', _write_activity, interval=60, max_size=5000,
+                                    key=lambda row: row['user_id'], merge=_merge)
+
+def record_activity(user_id, login=False):
+    """Anota que o usuário está ativo agora (e, com login=True, que acabou de entrar)"""
+    now = datetime.utcnow()
+    activity_buffer.add({'user_id': user_id, 'last_seen': now, 'last_login': now if login else None})
+
+def _track_request():
+    if request.endpoint != 'static' and current_user.is_authenticated:
+        record_activity(current_user.id)
+
+def init_activity(app):
+    """Configura a fila de atividade (a coluna last_seen vem da migração do Alembic)"""
+    activity_buffer.init_app(app,
+                             interval=app.config.get('ACTIVITY_FLUSH_INTERVAL'),
+                             max_size=app.config.get('ACTIVITY_BUFFER_SIZE'))
+    app.before_request(_track_request)
@@ -0,0 +1,168 @@
+import click
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+from flask import current_app, request, send_file, url_for, abort
+from flask.cli import AppGroup
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Arquivos de app/assets que passam pelo build
+SOURCES = ('css/main.css', 'css/index.css', 'js/main.js', 'js/index.js')
+BUILD_DIR = 'build'
+MANIFEST = 'manifest.json'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Variantes pré-comprimidas, na ordem de preferência
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+assets_cli = AppGroup('assets', help='Build dos arquivos estáticos.')
+
+_manifest = {}
+
+_STRING = re.compile(r'''("(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')''')
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACE = re.compile(r'\s*([{};,])\s*')
+
+def minify_css(source):
+    """Remove comentários e espaços sem mexer no conteúdo das strings"""
+    parts = _STRING.split(_CSS_COMMENT.sub('', source))
+    for i in range(0, len(parts), 2):
+        code = re.sub(r'\s+', ' ', parts[i])
+        code = _CSS_SPACE.sub(r'\1', code)
+        parts[i] = re.sub(r':\s+', ':', code).replace(';}', '}')
+    return ''.join(parts).strip()
+
+def minify_js(source):
+    """
+    Minificação conservadora, sem parser: tira indentação, linhas vazias e
+    comentários de linha inteira. Linhas dentro de template strings (crase)
+    ficam intactas, e as quebras de linha são mantidas (ASI).
+    """
+    lines, in_template = [], False
+    for line in source.splitlines():
+        if in_template:
+            lines.append(line)
+        else:
+            stripped = line.strip()
+            if stripped and not stripped.startswith('//'):
+                lines.append(stripped)
+        if len(re.findall(r'(?<!\\)`', line)) % 2:
+            in_template = not in_template
+    return '\n'.join(lines)
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp = f'{path}.tmp'
+    with open(temp, 'wb') as file:
+        file.write(data)
+    os.replace(temp, path)
+
+def compressed_variants(data):
+    """{extensão: bytes} das variantes menores que o original (gzip e, se instalado, brotli)"""
+    variants = {'.gz': gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return {ext: body for ext, body in variants.items() if len(body) < len(data)}
+
+def build_assets(static_folder, sources=SOURCES, clean=False):
+    """
+    Minifica cada arquivo, grava como build/<nome>.<hash>.<ext> com as
+    variantes .gz/.br e escreve o manifest {original: gerado}. Arquivos de
+    builds anteriores ficam (páginas antigas ainda os pedem), salvo com clean.
+    Retorna [(original, gerado, bytes originais, bytes minificados, {ext: bytes})].
+    """
+    output = os.path.join(static_folder, BUILD_DIR)
+    manifest, report = {}, []
+    for source in sources:
+        with open(os.path.join(static_folder, source), encoding='utf-8') as file:
+            original = file.read()
+        base, ext = os.path.splitext(source)
+        data = MINIFIERS.get(ext, lambda text: text)(original).encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        built = f'{base}.{digest}{ext}'
+        _write(os.path.join(output, built), data)
+        variants = compressed_variants(data)
+        for suffix, body in variants.items():
+            _write(os.path.join(output, built + suffix), body)
+        manifest[source] = built
+        report.append((source, built, len(original.encode('utf-8')), len(data),
+                       {suffix: len(body) for suffix, body in variants.items()}))
+    _write(os.path.join(output, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode())
+
+    if clean:
+        keep = {os.path.join(output, MANIFEST)}
+        for built in manifest.values():
+            keep.update(os.path.join(output, built + suffix) for suffix in ('', '.gz', '.br'))
+        for root, _, files in os.walk(output):
+            for name in files:
+                path = os.path.join(root, name)
+                if path not in keep:
+                    os.remove(path)
+    return report
+
+def load_manifest(static_folder):
+    """Manifest do último build ({} se ainda não houve build)"""
+    try:
+        with open(os.path.join(static_folder, BUILD_DIR, MANIFEST), encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+def asset_url(filename):
+    """
+    URL do arquivo estático: a versão com hash do build (cache imutável) ou,
+    sem build, o arquivo original pelo handler padrão.
+    """
+    built = _manifest.get(filename)
+    if built is None:
+        return url_for('static', filename=filename)
+    return url_for('built_asset', filename=built)
+
+def serve_built_asset(filename):
+    """
+    Arquivo do build com cache imutável (o nome muda a cada alteração),
+    servindo a variante pré-comprimida aceita pelo navegador.
+    """
+    path = safe_join(current_app.static_folder, BUILD_DIR, filename)
+    if path is None or filename == MANIFEST or not os.path.isfile(path):
+        abort(404)
+    available = [name for name, suffix in ENCODINGS if os.path.isfile(path + suffix)]
+    encoding = request.accept_encodings.best_match(available) if available else None
+    suffix = dict(ENCODINGS).get(encoding, '')
+    response = send_file(path + suffix, mimetype=mimetypes.guess_type(path)[0],
+                         conditional=True, max_age=31536000)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if available:
+        response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = IMMUTABLE
+    return response
+
+@assets_cli.command('build')
+@click.option('--clean', is_flag=True, help='Apaga arquivos de builds anteriores.')
+def build_command(clean):
+    """Minifica, gera os nomes com hash e as variantes comprimidas."""
+    report = build_assets(current_app.static_folder, clean=clean)
+    for source, built, original, minified, variants in report:
+        sizes = ' '.join(f'{suffix} {size}B' for suffix, size in sorted(variants.items()))
+        click.echo(f'  {source} → {built}: {original}B → {minified}B {sizes}')
+    if brotli is None:
+        click.echo('⚠️  brotli não instalado: apenas variantes gzip.')
+    click.echo(f'✅ {len(report)} arquivos gerados. Reinicie a aplicação para usar o novo manifest.')
+
+def init_assets(app):
+    """Carrega o manifest, registra a rota dos arquivos do build e o asset_url dos templates"""
+    global _manifest
+    _manifest = load_manifest(app.static_folder)
+    app.add_url_rule(f'{app.static_url_path}/{BUILD_DIR}/<path:filename>',
+                     'built_asset', serve_built_asset)
+    app.jinja_env.globals['asset_url'] = asset_url
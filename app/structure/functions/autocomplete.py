@@ -0,0 +1,157 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from flask import current_app
+from sqlalchemy import event
+from app.structure.database.models import Subject, Topic, StudyMaterial, db
+from app.structure.functions.fuzzy_search import fold
+from app.structure.functions.fragments import catalog_version
+
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+DEFAULT_REFRESH_SECONDS = 300
+LOAD_CHUNK_SIZE = 10000
+
+# Tipos guardados como códigos de 1 byte
+KINDS = ('subject', 'topic', 'material')
+SOURCES = (
+    (Subject, Subject.name),
+    (Topic, Topic.name),
+    (StudyMaterial, StudyMaterial.title),
+)
+
+class _Snapshot:
+    """
+    Índice imutável ordenado pela chave normalizada. Chaves e rótulos ficam
+    concatenados em uma única string cada, com deslocamentos em arrays, para
+    caber em todos os workers mesmo com centenas de milhares de títulos.
+    """
+    __slots__ = ('keys', 'key_offsets', 'labels', 'label_offsets', 'kinds', 'ids', 'built_at', 'version')
+
+    def __init__(self, entries, version):
+        entries.sort()
+        self.key_offsets = array('I', [0])
+        self.label_offsets = array('I', [0])
+        self.kinds = array('b')
+        self.ids = array('I')
+        keys, labels = [], []
+        for key, kind, doc_id, label in entries:
+            keys.append(key)
+            labels.append(label)
+            self.key_offsets.append(self.key_offsets[-1] + len(key))
+            self.label_offsets.append(self.label_offsets[-1] + len(label))
+            self.kinds.append(kind)
+            self.ids.append(doc_id)
+        self.keys = ''.join(keys)
+        self.labels = ''.join(labels)
+        self.built_at = time.monotonic()
+        self.version = version
+
+    def __len__(self):
+        return len(self.ids)
+
+    def key(self, position):
+        return self.keys[self.key_offsets[position]:self.key_offsets[position + 1]]
+
+    def label(self, position):
+        return self.labels[self.label_offsets[position]:self.label_offsets[position + 1]]
+
+    def complete(self, prefix, limit):
+        position = bisect_left(range(len(self)), prefix, key=self.key)
+        matches = []
+        while position < len(self) and len(matches) < limit:
+            if not self.key(position).startswith(prefix):
+                break
+            matches.append({
+                'type': KINDS[self.kinds[position]],
+                'id': self.ids[position],
+                'label': self.label(position),
+            })
+            position += 1
+        return matches
+
+class AutocompleteIndex:
+    """
+    Índice de prefixos em memória para disciplinas, tópicos e materiais.
+    Carregado na primeira consulta; depois disso as consultas só leem a
+    versão do catálogo. Uma versão nova (alteração em qualquer worker) ou o
+    tempo de validade disparam uma reconstrução em segundo plano, servindo o
+    índice anterior até a nova versão ficar pronta.
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._rebuilding = False
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def complete(self, prefix, limit=DEFAULT_LIMIT):
+        folded = fold(prefix)
+        if not folded:
+            return []
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.load()
+        elif self._is_stale(snapshot):
+            self._refresh_in_background()
+        return snapshot.complete(folded, min(max(1, limit), MAX_LIMIT))
+
+    def load(self):
+        """Constrói o índice de forma síncrona (usado na primeira consulta)"""
+        with self._lock:
+            if self._snapshot is None or self._dirty:
+                self._dirty = False
+                self._snapshot = self._build()
+            return self._snapshot
+
+    def _is_stale(self, snapshot):
+        max_age = current_app.config.get('AUTOCOMPLETE_REFRESH_SECONDS', DEFAULT_REFRESH_SECONDS)
+        return (self._dirty or snapshot.version != catalog_version()
+                or time.monotonic() - snapshot.built_at > max_age)
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        app = current_app._get_current_object()
+
+        def rebuild():
+            try:
+                with app.app_context():
+                    self._dirty = False
+                    self._snapshot = self._build()
+                    db.session.remove()
+            finally:
+                self._rebuilding = False
+
+        threading.Thread(target=rebuild, name='autocomplete-refresh', daemon=True).start()
+
+    def _build(self):
+        # Versão lida antes das linhas: uma edição durante a carga gera outra reconstrução
+        version = catalog_version()
+        return _Snapshot(self._entries(), version)
+
+    def _entries(self):
+        entries = []
+        for kind, (model, column) in enumerate(SOURCES):
+            rows = db.session.query(model.id, column)\
+                .filter(model.is_active == True)\
+                .yield_per(LOAD_CHUNK_SIZE)
+            for doc_id, label in rows:
+                if label:
+                    entries.append((fold(label), kind, doc_id, label))
+        return entries
+
+autocomplete_index = AutocompleteIndex()
+
+def _mark_dirty(mapper, connection, target):
+    autocomplete_index.mark_dirty()
+
+for _model, _ in SOURCES:
+    for _event in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event, _mark_dirty)
@@ -1,52 +1,503 @@
-import redis
-from functools import wraps
+import fnmatch
 import json
-from datetime import timedelta
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+
+try:
+    import redis
+except ImportError:  # Redis is optional: without it only the in-process cache is available
+    redis = None
 
-# Initialize Redis connection
-redis_client = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
+logger = logging.getLogger(__name__)
 
-def cache_data(key_prefix, expire_time=300):  # 5 minutes default
+TAG_PREFIX = 'tag:'
+TAG_EXPIRE_TIME = 30 * 24 * 3600  # generation counters are long-lived
+LOCK_PREFIX = 'lock:'
+
+class NullCache:
     """
-    Decorator to cache function results in Redis.
+    Backend that never stores anything. Useful for tests.
+    """
+    shared = False
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, expire_time):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def delete_pattern(self, pattern):
+        pass
+
+    def add(self, key, value, expire_time):
+        return True
+
+    def incr(self, key, expire_time):
+        return 0
+
+    def release(self, key, token):
+        pass
+
+class LocalCache:
+    """
+    In-process LRU cache with per-entry TTL, bounded by entry count and/or
+    total stored bytes. Values are serialized strings, so callers always get
+    a fresh copy, just like with Redis. Each process has its own entries
+    and tag versions, so it is not `shared`.
+    """
+    shared = False
+
+    def __init__(self, max_entries=10000, max_bytes=None, max_ttl=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_ttl = max_ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expire_time):
+        if self.max_ttl is not None:
+            expire_time = min(expire_time, self.max_ttl)
+        size = len(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + expire_time, value)
+            self._bytes += size
+            while self._entries and (
+                    (self.max_entries is not None and len(self._entries) > self.max_entries) or
+                    (self.max_bytes is not None and self._bytes > self.max_bytes)):
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+
+    def delete_pattern(self, pattern):
+        with self._lock:
+            for key in [k for k in self._entries if fnmatch.fnmatchcase(k, pattern)]:
+                self._remove(key)
+
+    def add(self, key, value, expire_time):
+        """Set the key only if it is absent; returns True when it was set."""
+        with self._lock:
+            if self._alive(key):
+                return False
+        self.set(key, value, expire_time)
+        return True
+
+    def incr(self, key, expire_time):
+        with self._lock:
+            current = int(self._entries[key][1]) if self._alive(key) else 0
+            self._remove(key)
+            value = str(current + 1)
+            self._entries[key] = (time.monotonic() + expire_time, value)
+            self._bytes += len(value)
+            return current + 1
+
+    def release(self, key, token):
+        with self._lock:
+            if self._alive(key) and self._entries[key][1] == token:
+                self._remove(key)
+
+    def _alive(self, key):
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+    def __len__(self):
+        return len(self._entries)
+
+class RedisCache:
+    """
+    Redis backend. Connects lazily and degrades gracefully: when Redis is
+    unreachable, operations behave as cache misses and the backend stops
+    trying for `retry_interval` seconds.
+    """
+    shared = True
+
+    RELEASE_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('del', KEYS[1]) else return 0 end"
+    )
+
+    def __init__(self, url='redis://localhost:6379/0', retry_interval=30, socket_timeout=0.25,
+                 client=None):
+        if redis is None and client is None:
+            raise RuntimeError('The redis package is required for the Redis cache backend')
+        self.url = url
+        self.retry_interval = retry_interval
+        self.socket_timeout = socket_timeout
+        self._client = client  # any redis-py compatible client (e.g. a fake one in tests)
+        self._down_until = 0.0
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = redis.Redis.from_url(
+                self.url, decode_responses=True,
+                socket_timeout=self.socket_timeout,
+                socket_connect_timeout=self.socket_timeout)
+        return self._client
+
+    def _call(self, operation, *args, default=None):
+        if self._down_until > time.monotonic():
+            return default
+        try:
+            return getattr(self.client, operation)(*args)
+        except (getattr(redis, 'RedisError', OSError), OSError) as error:
+            self._down_until = time.monotonic() + self.retry_interval
+            logger.warning('Redis unavailable (%s); falling back for %ss', error, self.retry_interval)
+            return default
+
+    def get(self, key):
+        return self._call('get', key)
+
+    def set(self, key, value, expire_time):
+        self._call('setex', key, expire_time, value)
+
+    def delete(self, *keys):
+        if keys:
+            self._call('delete', *keys)
+
+    def delete_pattern(self, pattern):
+        """Incremental SCAN instead of KEYS, so Redis is never blocked."""
+        if self._down_until > time.monotonic():
+            return
+        try:
+            batch = []
+            for key in self.client.scan_iter(match=pattern, count=500):
+                batch.append(key)
+                if len(batch) >= 500:
+                    self.client.delete(*batch)
+                    batch = []
+            if batch:
+                self.client.delete(*batch)
+        except (getattr(redis, 'RedisError', OSError), OSError) as error:
+            self._down_until = time.monotonic() + self.retry_interval
+            logger.warning('Redis unavailable (%s); falling back for %ss', error, self.retry_interval)
+
+    def add(self, key, value, expire_time):
+        # When Redis is down nobody can coordinate, so let the caller proceed
+        return self._call('set', key, value, expire_time, None, True, default=True) is not None
+
+    def incr(self, key, expire_time):
+        value = self._call('incr', key)
+        if value is not None:
+            self._call('expire', key, expire_time)
+        return value
+
+    def release(self, key, token):
+        self._call('eval', self.RELEASE_SCRIPT, 1, key, token)
+
+class TieredCache:
+    """
+    Read-through L1 (in-process) -> L2 (shared) cache. Writes go to both
+    levels; L2 hits are copied into L1.
+    """
+    shared = True
+
+    def __init__(self, l1, l2):
+        self.l1 = l1
+        self.l2 = l2
+
+    def get(self, key):
+        # Generation counters must be seen by every process, so they skip L1
+        if key.startswith(TAG_PREFIX):
+            return self.l2.get(key)
+        value = self.l1.get(key)
+        if value is None:
+            value = self.l2.get(key)
+            if value is not None:
+                self.l1.set(key, value, self.l1.max_ttl or 60)
+        return value
+
+    def set(self, key, value, expire_time):
+        self.l1.set(key, value, expire_time)
+        self.l2.set(key, value, expire_time)
+
+    def delete(self, *keys):
+        self.l1.delete(*keys)
+        self.l2.delete(*keys)
+
+    def delete_pattern(self, pattern):
+        self.l1.delete_pattern(pattern)
+        self.l2.delete_pattern(pattern)
+
+    def add(self, key, value, expire_time):
+        return self.l2.add(key, value, expire_time)
+
+    def incr(self, key, expire_time):
+        value = self.l2.incr(key, expire_time)
+        return value if value is not None else self.l1.incr(key, expire_time)
+
+    def release(self, key, token):
+        self.l2.release(key, token)
+
+class Cache:
+    """
+    Facade used by the rest of the application. The backend can be swapped
+    at startup (init_cache) without changing the imported object.
+
+    Besides plain get/set it offers:
+    - tag (namespace) invalidation: keys built with tagged_key() embed the
+      current generation of each tag, and invalidate_tag() just increments
+      the generation, so no key scanning is needed;
+    - get_or_set() with single-flight recomputation (one computation per key
+      across threads and, through the backend lock, across processes) and
+      optional probabilistic early refresh.
+
+    Tag versions only reach other processes when the backend is `shared`;
+    code that relies on another process seeing an invalidation (HTTP
+    validators, per-user snapshots) must check `cache.shared` first.
+    """
+    def __init__(self, backend, tag_ttl=1.0, lock_timeout=10.0):
+        self.backend = backend
+        self.tag_ttl = tag_ttl
+        self.lock_timeout = lock_timeout
+        self._tag_memo = {}
+        self._key_locks = {}  # key -> [lock, holders]; only keys being computed
+        self._key_locks_guard = threading.Lock()
+
+    @property
+    def shared(self):
+        """True when every process sees the same entries and tag versions (Redis, tiered)."""
+        return self.backend.shared
+
+    def get(self, key):
+        value = self.backend.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, expire_time=300):
+        self.backend.set(key, json.dumps(value), int(expire_time))
+
+    def delete(self, *keys):
+        self.backend.delete(*keys)
+
+    def delete_pattern(self, pattern):
+        self.backend.delete_pattern(pattern)
+
+    # Tags -----------------------------------------------------------------
+
+    def tag_version(self, tag):
+        """
+        Current generation of a tag (memoized for `tag_ttl` seconds), or None
+        when the backend cannot keep counters (null backend, Redis down).
+        """
+        memo = self._tag_memo.get(tag)
+        now = time.monotonic()
+        if memo is not None and memo[1] > now:
+            return memo[0]
+        key = TAG_PREFIX + tag
+        version = self.backend.get(key)
+        if version is None:
+            # Start from the clock so an evicted counter never reuses old generations
+            self.backend.add(key, str(time.time_ns() // 1000), TAG_EXPIRE_TIME)
+            version = self.backend.get(key)
+            if version is None:
+                return None
+        self._tag_memo[tag] = (version, now + self.tag_ttl)
+        return version
+
+    def invalidate_tag(self, *tags):
+        """Logically drop every key built with any of these tags."""
+        for tag in tags:
+            self.tag_version(tag)  # make sure the counter exists before incrementing
+            version = self.backend.incr(TAG_PREFIX + tag, TAG_EXPIRE_TIME)
+            self._tag_memo.pop(tag, None)
+            if version is not None:
+                self._tag_memo[tag] = (str(version), time.monotonic() + self.tag_ttl)
+
+    def tagged_key(self, key, tags=()):
+        if not tags:
+            return key
+        versions = ','.join(f'{tag}={self.tag_version(tag)}' for tag in tags)
+        return f'{key}@{versions}'
+
+    # Single flight --------------------------------------------------------
+
+    def get_or_set(self, key, factory, expire_time=300, tags=(), early_refresh=None):
+        """
+        Return the cached value for `key`, computing it with `factory()` on a
+        miss. Only one caller recomputes a given key at a time; concurrent
+        callers wait for its result. With `early_refresh` (a beta such as 1.0)
+        entries may be recomputed shortly before they expire, with a
+        probability that grows as expiry approaches (XFetch), so hot keys
+        rarely expire under load.
+        """
+        key = self.tagged_key(key, tags)
+        envelope = self._read(key)
+        if envelope is not None and not self._should_refresh(envelope, early_refresh):
+            return envelope['v']
+
+        stale = envelope['v'] if envelope is not None else None
+        with self._key_lock(key):
+            # Someone in this process may have filled it while we waited
+            fresh = self._read(key)
+            if fresh is not None and (envelope is None or fresh['x'] != envelope['x']):
+                return fresh['v']
+
+            token = uuid.uuid4().hex
+            lock_key = LOCK_PREFIX + key
+            if not self.backend.add(lock_key, token, int(self.lock_timeout) + 1):
+                if envelope is not None:
+                    return stale  # another process is refreshing; serve the current value
+                waited = self._wait_for(key)
+                if waited is not None:
+                    return waited['v']
+            try:
+                start = time.monotonic()
+                value = factory()
+                self._write(key, value, expire_time, time.monotonic() - start)
+                return value
+            finally:
+                self.backend.release(lock_key, token)
+
+    @contextmanager
+    def _key_lock(self, key):
+        """
+        Per-key lock, so a slow factory() or a wait on another process only
+        blocks callers of the same key.
+        """
+        with self._key_locks_guard:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._key_locks_guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[key]
+
+    def _read(self, key):
+        raw = self.backend.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    def _write(self, key, value, expire_time, delta):
+        envelope = {'v': value, 'x': time.time() + expire_time, 'd': delta}
+        self.backend.set(key, json.dumps(envelope), int(expire_time))
+
+    def _should_refresh(self, envelope, beta):
+        if not beta:
+            return False
+        return time.time() - envelope['d'] * beta * math.log(random.random() or 1e-12) >= envelope['x']
+
+    def _wait_for(self, key):
+        deadline = time.monotonic() + self.lock_timeout
+        delay = 0.01
+        while time.monotonic() < deadline:
+            time.sleep(delay)
+            envelope = self._read(key)
+            if envelope is not None:
+                return envelope
+            delay = min(delay * 2, 0.2)
+        return None
+
+cache = Cache(LocalCache())
+
+def create_backend(settings):
+    """
+    Build a backend from configuration: CACHE_BACKEND is one of
+    'local', 'redis', 'tiered' or 'null'.
+    """
+    name = settings.get('CACHE_BACKEND', 'local')
+    if name == 'null':
+        return NullCache()
+
+    local = LocalCache(max_entries=settings.get('CACHE_LOCAL_MAX_ENTRIES', 10000),
+                       max_bytes=settings.get('CACHE_LOCAL_MAX_BYTES'),
+                       max_ttl=settings.get('CACHE_LOCAL_TTL'))
+    if name == 'local':
+        return local
+    if redis is None:
+        logger.warning('CACHE_BACKEND=%s but redis is not installed; using the local cache', name)
+        return local
+
+    shared = RedisCache(settings.get('CACHE_REDIS_URL', 'redis://localhost:6379/0'))
+    if name == 'redis':
+        return shared
+    if name == 'tiered':
+        return TieredCache(local, shared)
+    raise ValueError(f'Unknown cache backend: {name}')
+
+def init_cache(app):
+    cache.backend = create_backend(app.config)
+    cache.tag_ttl = app.config.get('CACHE_TAG_TTL', cache.tag_ttl)
+
+def cache_data(key_prefix, expire_time=300, tags=(), early_refresh=None):  # 5 minutes default
+    """
+    Decorator to cache function results. Concurrent misses for the same
+    arguments are coalesced into a single call.
     """
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
             # Create a unique cache key based on the function arguments
             cache_key = f"{key_prefix}:{json.dumps(args)}:{json.dumps(kwargs)}"
-            
-            # Try to get the cached result
-            cached_result = redis_client.get(cache_key)
-            if cached_result:
-                return json.loads(cached_result)
-            
-            # If not cached, execute the function and cache the result
-            result = f(*args, **kwargs)
-            redis_client.setex(cache_key, timedelta(seconds=expire_time), json.dumps(result))
-            return result
+            return cache.get_or_set(cache_key, lambda: f(*args, **kwargs), expire_time,
+                                    tags=tags, early_refresh=early_refresh)
         return decorated_function
     return decorator
 
 def clear_cache(key_pattern):
     """
-    Clear cache entries matching a pattern.
+    Clear cache entries matching a pattern. Prefer invalidate_tag() for
+    groups of keys: pattern deletion has to iterate over the keyspace.
     """
-    keys = redis_client.keys(key_pattern)
-    if keys:
-        redis_client.delete(*keys)
+    cache.delete_pattern(key_pattern)
+
+def invalidate_tag(*tags):
+    """
+    Invalidate every entry cached under these tags (O(1) per tag).
+    """
+    cache.invalidate_tag(*tags)
 
 def cache_user_progress(user_id, subject, data, expire_time=3600):  # 1 hour default
     """
     Cache user study progress.
     """
-    cache_key = f"user_progress:{user_id}:{subject}"
-    redis_client.setex(cache_key, timedelta(seconds=expire_time), json.dumps(data))
+    cache_key = cache.tagged_key(f"user_progress:{user_id}:{subject}", (f"user:{user_id}",))
+    cache.set(cache_key, data, expire_time)
 
 def get_cached_user_progress(user_id, subject):
     """
     Get cached user study progress.
     """
-    cache_key = f"user_progress:{user_id}:{subject}"
-    data = redis_client.get(cache_key)
-    return json.loads(data) if data else None
+    cache_key = cache.tagged_key(f"user_progress:{user_id}:{subject}", (f"user:{user_id}",))
+    return cache.get(cache_key)
+
+def clear_user_progress(user_id):
+    """
+    Invalidate all cached progress of a user.
+    """
+    cache.invalidate_tag(f"user:{user_id}")
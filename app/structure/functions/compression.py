@@ -0,0 +1,159 @@
+import zlib
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header, parse_options_header
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = frozenset({
+    'text/html', 'text/css', 'text/plain', 'text/xml', 'text/javascript', 'text/csv',
+    'application/javascript', 'application/json', 'application/xml', 'image/svg+xml',
+})
+# Status sem corpo ou com corpo parcial, que nunca são comprimidos
+SKIP_STATUS = frozenset({204, 206, 304})
+
+class _Gzip:
+    name = 'gzip'
+
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def process(self, chunk, flush):
+        data = self._compressor.compress(chunk)
+        return data + self._compressor.flush(zlib.Z_SYNC_FLUSH) if flush else data
+
+    def finish(self):
+        return self._compressor.flush()
+
+class _Brotli:
+    name = 'br'
+
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def process(self, chunk, flush):
+        data = self._compressor.process(chunk)
+        return data + self._compressor.flush() if flush else data
+
+    def finish(self):
+        return self._compressor.finish()
+
+class CompressionMiddleware:
+    """
+    Comprime as respostas de texto (HTML, JSON, CSS...) com brotli, se
+    instalado, ou gzip, conforme o Accept-Encoding. Respostas com
+    Content-Length menor que min_size passam direto; as sem Content-Length
+    (streaming) são comprimidas pedaço a pedaço, com flush a cada pedaço
+    para o navegador receber o que já foi gerado.
+    """
+
+    def __init__(self, app, level=6, brotli_quality=4, min_size=500, mimetypes=COMPRESSIBLE_TYPES):
+        self.app = app
+        self.level = level
+        self.brotli_quality = brotli_quality if brotli is not None else None
+        self.min_size = min_size
+        self.mimetypes = frozenset(mimetypes)
+
+    def _compressor(self, environ):
+        offered = ['gzip']
+        if self.brotli_quality is not None:
+            offered.insert(0, 'br')
+        encoding = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING')).best_match(offered)
+        if encoding == 'br':
+            return _Brotli(self.brotli_quality)
+        if encoding == 'gzip':
+            return _Gzip(self.level)
+        return None
+
+    def _compressible(self, status, headers):
+        """None se a resposta não pode ser comprimida; senão se ela tem tamanho conhecido"""
+        mimetype = parse_options_header(headers.get('Content-Type', ''))[0]
+        if int(status.split(None, 1)[0]) in SKIP_STATUS or mimetype not in self.mimetypes:
+            return None
+        if 'Content-Encoding' in headers or 'no-transform' in headers.get('Cache-Control', ''):
+            return None
+        length = headers.get('Content-Length', type=int)
+        if length is not None and length < self.min_size:
+            return None
+        return length is not None
+
+    def __call__(self, environ, start_response):
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return self.app(environ, start_response)
+        compressor = self._compressor(environ)
+        captured, late = [], False
+
+        def capture(status, headers, exc_info=None):
+            if late or exc_info is not None:
+                return start_response(status, headers, exc_info)
+            captured.append((status, Headers(headers)))
+            return _unsupported_write
+
+        app_iter = self.app(environ, capture)
+        if not captured:
+            # start_response só na iteração (não acontece com o Flask): repassa sem comprimir
+            late = True
+            return app_iter
+        status, headers = captured[0]
+        sized = self._compressible(status, headers)
+        if sized is not None:
+            headers['Vary'] = _add_vary(headers.get('Vary', ''))
+        if sized is None or compressor is None:
+            start_response(status, headers.to_wsgi_list())
+            return app_iter
+
+        headers['Content-Encoding'] = compressor.name
+        etag = headers.get('ETag')
+        if etag and not etag.startswith('W/'):
+            headers['ETag'] = f'W/{etag}'  # outra representação do mesmo conteúdo
+        if sized:
+            try:
+                body = b''.join(compressor.process(chunk, False) for chunk in app_iter) + compressor.finish()
+            finally:
+                _close(app_iter)
+            headers['Content-Length'] = str(len(body))
+            start_response(status, headers.to_wsgi_list())
+            return [body]
+        headers.remove('Content-Length')
+        start_response(status, headers.to_wsgi_list())
+        return self._stream(app_iter, compressor)
+
+    @staticmethod
+    def _stream(app_iter, compressor):
+        try:
+            for chunk in app_iter:
+                if chunk:
+                    yield compressor.process(chunk, True)
+            yield compressor.finish()
+        finally:
+            _close(app_iter)
+
+def _unsupported_write(data):
+    raise RuntimeError('CompressionMiddleware não suporta o write() do WSGI 1.0')
+
+def _add_vary(vary):
+    values = [value.strip() for value in vary.split(',') if value.strip()]
+    if 'accept-encoding' in (value.lower() for value in values):
+        return vary
+    return ', '.join(values + ['Accept-Encoding'])
+
+def _close(app_iter):
+    if hasattr(app_iter, 'close'):
+        app_iter.close()
+
+def init_compression(app):
+    """
+    Comprime as respostas dinâmicas na camada WSGI. COMPRESSION_LEVEL (gzip,
+    1-9) e COMPRESSION_BROTLI_QUALITY (0-11) trocam CPU por tamanho;
+    COMPRESSION_LEVEL = 0 desliga a compressão.
+    """
+    level = app.config.get('COMPRESSION_LEVEL', 6)
+    if not level:
+        return
+    app.wsgi_app = CompressionMiddleware(
+        app.wsgi_app, level=level,
+        brotli_quality=app.config.get('COMPRESSION_BROTLI_QUALITY', 4),
+        min_size=app.config.get('COMPRESSION_MIN_SIZE', 500),
+    )
@@ -0,0 +1,200 @@
+import click
+import time
+from collections import Counter as Deltas
+from flask.cli import AppGroup
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.structure.database.models import (
+    Counter, User, Subject, Topic, StudyMaterial, Question, db
+)
+from app.structure.database import upsert
+
+REFRESH_SECONDS = 5
+
+# Cada modelo tem dois contadores: <nome> (todas as linhas) e <nome>_active
+COUNTED = {
+    'users': User,
+    'subjects': Subject,
+    'topics': Topic,
+    'materials': StudyMaterial,
+    'questions': Question,
+}
+
+# Versão do catálogo: avançada a cada alteração de disciplina, tópico,
+# material ou questão; chaveia os fragmentos de HTML em cache
+CATALOG_VERSION = 'catalog_version'
+
+# Versões (catálogo, quiz_topic:<id>...) partem dos milissegundos do relógio
+# e só avançam: um banco recriado não repete as de antes, que podem ainda
+# estar em chaves do Redis
+CATALOG_MODELS = (Subject, Topic, StudyMaterial, Question)
+
+counter_cli = AppGroup('counters', help='Manutenção dos contadores de linhas.')
+
+# (momento da leitura, {nome: valor}); trocado inteiro, sem lock
+_snapshot = (None, {})
+
+def get_counters():
+    """
+    Contadores {nome: valor} da memória do processo, relidos do banco (uma
+    consulta) a cada COUNTER_REFRESH segundos ou após um commit que os altere.
+    """
+    global _snapshot
+    loaded_at, values = _snapshot
+    now = time.monotonic()
+    if loaded_at is None or now - loaded_at >= REFRESH_SECONDS:
+        values = dict(db.session.query(Counter.name, Counter.value).all())
+        _snapshot = (now, values)
+    return values
+
+def get_counter(name):
+    return get_counters().get(name, 0)
+
+def _expire():
+    global _snapshot
+    _snapshot = (None, {})
+
+# Os eventos anotam os incrementos na sessão; eles são gravados no fim do
+# flush, na mesma transação, com um UPDATE que soma no próprio banco.
+
+def _add(target, **deltas):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault('counter_deltas', Deltas()).update(deltas)
+
+def increment(target, *names):
+    """Avança as versões `names` (por tópico etc.) no fim do flush que grava `target`"""
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault('counter_versions', set()).update(names)
+
+def _record(target, name, total, active):
+    if total or active:
+        _add(target, **{name: total, f'{name}_active': active})
+
+def _was_active(target):
+    """is_active como está no banco (antes das alterações pendentes)"""
+    history = inspect(target).attrs.is_active.history
+    return bool((history.deleted or history.unchanged or [target.is_active])[0])
+
+def _register_listeners(name, model):
+    # Carrega o valor antigo de is_active ao alterá-lo, para saber se mudou
+    event.listen(model.is_active, 'set', lambda *args: None, active_history=True)
+
+    @event.listens_for(model, 'after_insert')
+    def after_insert(mapper, connection, target):
+        _record(target, name, 1, int(bool(target.is_active)))
+
+    @event.listens_for(model, 'after_update')
+    def after_update(mapper, connection, target):
+        history = inspect(target).attrs.is_active.history
+        if history.has_changes() and history.deleted:
+            _record(target, name, 0, int(bool(target.is_active)) - int(bool(history.deleted[0])))
+
+    @event.listens_for(model, 'after_delete')
+    def after_delete(mapper, connection, target):
+        _record(target, name, -1, -int(_was_active(target)))
+
+for _name, _model in COUNTED.items():
+    _register_listeners(_name, _model)
+
+def _catalog_changed(mapper, connection, target):
+    increment(target, CATALOG_VERSION)
+
+def _catalog_updated(mapper, connection, target):
+    # after_update também é chamado para objetos sem nenhuma coluna alterada
+    state = inspect(target)
+    if any(state.attrs[attr.key].history.has_changes() for attr in mapper.column_attrs):
+        _catalog_changed(mapper, connection, target)
+
+for _model in CATALOG_MODELS:
+    event.listen(_model, 'after_insert', _catalog_changed)
+    event.listen(_model, 'after_update', _catalog_updated)
+    event.listen(_model, 'after_delete', _catalog_changed)
+
+def version_seed():
+    return time.time_ns() // 1_000_000
+
+def _advance(connection, names):
+    """Leva cada versão ao relógio em milissegundos ou, se já passou dele, à seguinte"""
+    table = Counter.__table__
+    statement = upsert.insert(table)
+    new_value = db.case((table.c.value >= statement.excluded.value, table.c.value + 1),
+                        else_=statement.excluded.value)
+    statement = statement.on_conflict_do_update(index_elements=['name'], set_={'value': new_value})
+    seed = version_seed()
+    connection.execute(statement, [{'name': name, 'value': seed} for name in sorted(names)])
+
+def _write(connection, values, increment):
+    table = Counter.__table__
+    statement = upsert.insert(table)
+    new_value = table.c.value + statement.excluded.value if increment else statement.excluded.value
+    statement = statement.on_conflict_do_update(index_elements=['name'], set_={'value': new_value})
+    connection.execute(statement, [{'name': name, 'value': value} for name, value in values.items()])
+
+@event.listens_for(Session, 'after_flush')
+def _apply_deltas(session, flush_context):
+    deltas = {name: value for name, value in session.info.pop('counter_deltas', {}).items() if value}
+    versions = session.info.pop('counter_versions', None)
+    if deltas:
+        _write(session.connection(), deltas, increment=True)
+    if versions:
+        _advance(session.connection(), versions)
+    if deltas or versions:
+        session.info['counters_changed'] = True
+
+@event.listens_for(Session, 'after_commit')
+def _counters_committed(session):
+    if session.info.pop('counters_changed', None):
+        _expire()
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_deltas(session):
+    session.info.pop('counter_deltas', None)
+    session.info.pop('counter_versions', None)
+    session.info.pop('counters_changed', None)
+
+def count_rows():
+    """Valor correto de cada contador, por COUNT nas tabelas de origem"""
+    values = {}
+    for name, model in COUNTED.items():
+        active = db.func.sum(db.case((model.is_active == True, 1), else_=0))
+        total, active = db.session.query(db.func.count(model.id), active).one()
+        values[name], values[f'{name}_active'] = total, active or 0
+    return values
+
+def reconcile_counters():
+    """
+    Corrige a tabela counters a partir das tabelas de origem. Necessário após
+    INSERT/UPDATE/DELETE em massa (que não disparam os eventos do ORM); por
+    isso também avança todas as versões (as linhas que não são contagens).
+    Retorna {nome: (antes, depois)} dos contadores que divergiam.
+    """
+    stored = dict(db.session.query(Counter.name, Counter.value).all())
+    counts = count_rows()
+    drift = {name: (stored.get(name), value)
+             for name, value in counts.items() if stored.get(name) != value}
+    connection = db.session.connection()
+    if drift:
+        _write(connection, {name: value for name, (_, value) in drift.items()}, increment=False)
+    _advance(connection, {name for name in stored if name not in counts} | {CATALOG_VERSION})
+    db.session.commit()
+    _expire()
+    return drift
+
+@counter_cli.command('reconcile')
+def reconcile_command():
+    """Recalcula os contadores e corrige os que divergirem."""
+    drift = reconcile_counters()
+    for name, (before, after) in sorted(drift.items()):
+        click.echo(f'  {name}: {before} → {after}')
+    click.echo(f'✅ {len(drift)} contadores corrigidos.')
+
+def init_counters(app):
+    """Configura a releitura e preenche os contadores em bancos que ainda não os têm"""
+    global REFRESH_SECONDS
+    REFRESH_SECONDS = app.config.get('COUNTER_REFRESH', REFRESH_SECONDS)
+    _expire()
+    with app.app_context():
+        if Counter.query.first() is None:
+            reconcile_counters()
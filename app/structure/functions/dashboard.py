@@ -0,0 +1,98 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from app.structure.database.models import Subject, StudySession, db
+from app.structure.database.loading import profile
+from app.structure.functions.progress_rollup import get_user_rollups
+
+RECENT_SESSIONS_LIMIT = 5
+ACTIVITY_DAYS = 7
+
+@dataclass
+class SubjectProgress:
+    """Progresso agregado do usuário em uma disciplina"""
+    subject: Subject
+    percentage: float = 0.0
+    topics_started: int = 0
+    topics_completed: int = 0
+    materials_completed: int = 0
+    total_materials: int = 0
+
+    @property
+    def name(self):
+        return self.subject.name
+
+@dataclass
+class DashboardData:
+    """Dados consolidados do dashboard e da página de progresso"""
+    subjects: list
+    subject_progress: list
+    total_study_time: int = 0
+    total_quizzes: int = 0
+    average_quiz_score: float = 0.0
+    completed_materials: int = 0
+    topics_started: int = 0
+    recent_sessions: list = field(default_factory=list)
+    activity: list = field(default_factory=list)
+
+    @property
+    def overall_progress(self):
+        """Média do progresso das disciplinas já iniciadas"""
+        started = [p.percentage for p in self.subject_progress if p.topics_started]
+        return round(sum(started) / len(started), 1) if started else 0.0
+
+    def progress_by_name(self):
+        """Mapa nome da disciplina -> porcentagem, no formato usado pelos templates"""
+        return {p.name: p.percentage for p in self.subject_progress}
+
+def _activity(user_id, days=ACTIVITY_DAYS):
+    """Minutos estudados por dia nos últimos dias"""
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    day = db.func.date(StudySession.start_time)
+    rows = db.session.query(day, db.func.sum(StudySession.duration_minutes))\
+        .filter(StudySession.user_id == user_id,
+                StudySession.start_time >= datetime.combine(since, datetime.min.time()))\
+        .group_by(day).all()
+    minutes = {str(d): m or 0 for d, m in rows}
+    dates = [since + timedelta(days=i) for i in range(days)]
+    return [(d.strftime('%d/%m'), minutes.get(d.isoformat(), 0)) for d in dates]
+
+def get_dashboard_data(user_id, include_activity=False):
+    """
+    Carrega todos os dados do dashboard com um número fixo de consultas,
+    independente da quantidade de disciplinas. Os totais vêm de progress_rollups.
+    """
+    subjects = Subject.query.filter_by(is_active=True).order_by(Subject.id).all()
+    totals, rollups = get_user_rollups(user_id)
+
+    subject_progress = []
+    for subject in subjects:
+        rollup = rollups.get(subject.id)
+        if not rollup:
+            subject_progress.append(SubjectProgress(subject=subject))
+            continue
+        subject_progress.append(SubjectProgress(
+            subject=subject,
+            percentage=round(rollup.progress_percentage, 1),
+            topics_started=rollup.topics_started,
+            topics_completed=rollup.topics_completed,
+            materials_completed=rollup.materials_completed,
+            total_materials=rollup.total_materials,
+        ))
+
+    recent_sessions = StudySession.query\
+        .options(*profile('recent_sessions'))\
+        .filter(StudySession.user_id == user_id)\
+        .order_by(StudySession.start_time.desc())\
+        .limit(RECENT_SESSIONS_LIMIT).all()
+
+    return DashboardData(
+        subjects=subjects,
+        subject_progress=subject_progress,
+        total_study_time=totals.study_minutes,
+        total_quizzes=totals.quizzes_completed,
+        average_quiz_score=round(totals.average_quiz_score, 1),
+        completed_materials=totals.materials_completed,
+        topics_started=totals.topics_started,
+        recent_sessions=recent_sessions,
+        activity=_activity(user_id) if include_activity else [],
+    )
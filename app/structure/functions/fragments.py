@@ -0,0 +1,118 @@
+import hashlib
+import os
+import re
+from functools import wraps
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from markupsafe import Markup
+from app.structure.auth.user_cache import SNAPSHOT_FIELDS
+from app.structure.functions.cache import cache
+from app.structure.functions.counters import get_counter, CATALOG_VERSION
+from app.structure.functions.progress_rollup import progress_tag, progress_version, ALL_PROGRESS_TAG
+
+FRAGMENT_EXPIRE_TIME = 3600
+TEMPLATE_VERSION = ''
+
+_SLOT = re.compile(r'<!--slot:(\w+):(\d+)-->')
+
+def catalog_version():
+    """Versão do catálogo (muda a cada alteração de disciplina, tópico, material ou questão)"""
+    return get_counter(CATALOG_VERSION)
+
+def fragment(name, key, render, expire_time=FRAGMENT_EXPIRE_TIME):
+    """
+    Resultado de render() (HTML de um trecho igual para todos os usuários)
+    guardado no cache. A chave inclui a versão do catálogo e dos templates,
+    então uma edição gera chaves novas e as antigas simplesmente expiram.
+    render() só roda em caso de falta: as consultas ficam dentro dele.
+    """
+    key = f'fragment:{name}:{key}:{TEMPLATE_VERSION}:{catalog_version()}'
+    return cache.get_or_set(key, render, expire_time)
+
+def fragment_slot(name, key):
+    """Marca, dentro de um fragmento, onde entra um trecho do usuário (ver fill_slots)"""
+    return Markup(f'<!--slot:{name}:{int(key)}-->')
+
+def fill_slots(html, **fillers):
+    """Troca cada fragment_slot(nome, chave) do HTML por fillers[nome](chave)"""
+    return Markup(_SLOT.sub(lambda match: str(fillers[match.group(1)](int(match.group(2)))), html))
+
+def page_etag(*versions):
+    """
+    ETag forte da página para o usuário logado: muda com a URL, os
+    templates, os dados da conta (os de current_user, já carregados) e
+    `versions` (o que mais a página mostra). None se não dá para validar:
+    versão indisponível ou mensagens flash pendentes, que só aparecem
+    renderizando.
+    """
+    if '_flashes' in session or None in versions:
+        return None
+    account = [getattr(current_user, name) for name in SNAPSHOT_FIELDS]
+    parts = [request.full_path, TEMPLATE_VERSION, *account, *versions]
+    return hashlib.sha1(':'.join(map(str, parts)).encode()).hexdigest()
+
+def not_modified(etag, last_modified=None):
+    """Resposta 304 se o navegador já tem esta versão da página; senão None"""
+    if etag is None:
+        return None
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)  # a compressão marca a ETag como fraca
+    else:
+        since = request.if_modified_since
+        fresh = last_modified is not None and since is not None and \
+            last_modified.replace(microsecond=0) <= since.replace(tzinfo=None)
+    if not fresh:
+        return None
+    return add_validators(current_app.response_class(status=304), etag, last_modified)
+
+def add_validators(response, etag, last_modified=None):
+    """ETag e Last-Modified: o navegador guarda a página e a revalida a cada acesso"""
+    if etag is None or response.status_code not in (200, 304):
+        return response
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def catalog_versions():
+    """
+    Versões que mudam as páginas do catálogo: o catálogo e o progresso do
+    usuário. O progresso vem das tags quando o cache é compartilhado; com o
+    cache local (ou null) as tags de cada worker não veem as alterações dos
+    outros, então vem do banco (uma consulta).
+    """
+    if not cache.shared:
+        return catalog_version(), progress_version(current_user.id)
+    return (catalog_version(), cache.tag_version(progress_tag(current_user.id)),
+            cache.tag_version(ALL_PROGRESS_TAG))
+
+def conditional(view):
+    """
+    Páginas do catálogo: responde 304 sem chamar a view quando o
+    If-None-Match ainda vale e marca as respostas com a ETag. Use depois de
+    login_required.
+    """
+    @wraps(view)
+    def decorated(*args, **kwargs):
+        etag = page_etag(*catalog_versions())
+        response = not_modified(etag)
+        if response is None:
+            response = add_validators(make_response(view(*args, **kwargs)), etag)
+        return response
+    return decorated
+
+def _template_version(app):
+    digest = hashlib.sha1()
+    for root, _, files in sorted(os.walk(os.path.join(app.root_path, app.template_folder))):
+        for name in sorted(files):
+            if name.endswith('.html'):
+                with open(os.path.join(root, name), 'rb') as file:
+                    digest.update(file.read())
+    return digest.hexdigest()[:12]
+
+def init_fragments(app):
+    """Versão dos templates (muda a cada deploy que os altere) e funções para os templates"""
+    global TEMPLATE_VERSION
+    TEMPLATE_VERSION = _template_version(app)
+    app.jinja_env.globals['fragment_slot'] = fragment_slot
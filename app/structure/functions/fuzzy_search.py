@@ -0,0 +1,185 @@
+import click
+import re
+import unicodedata
+from sqlalchemy import event, inspect
+from app.structure.database.models import (
+    StudyMaterial, Topic, Subject, SearchTerm, SearchTrigram, db
+)
+from app.structure.functions.search import SearchHit, SearchPage, search_cli
+
+SIMILARITY_THRESHOLD = 0.3
+DEFAULT_LIMIT = 10
+REBUILD_CHUNK_SIZE = 5000
+
+# Origem de cada tipo de documento: modelo e coluna indexada
+SOURCES = {
+    'material': (StudyMaterial, 'title'),
+    'topic': (Topic, 'name'),
+}
+
+def fold(text):
+    """Texto em minúsculas, sem acentos e só com letras, números e espaços"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'\w+', stripped.lower()))
+
+def trigrams(folded):
+    """Trigramas no estilo do pg_trgm: cada palavra com dois espaços antes e um depois"""
+    grams = set()
+    for word in folded.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def _index_document(connection, doc_type, doc_id, text, is_active=True):
+    """(Re)indexa um documento usando a conexão da transação corrente"""
+    terms, grams_table = SearchTerm.__table__, SearchTrigram.__table__
+    term_id = connection.execute(
+        db.select(terms.c.id).where(terms.c.doc_type == doc_type, terms.c.doc_id == doc_id)
+    ).scalar()
+    if term_id is not None:
+        connection.execute(db.delete(grams_table).where(grams_table.c.term_id == term_id))
+
+    if text is None:
+        if term_id is not None:
+            connection.execute(db.delete(terms).where(terms.c.id == term_id))
+        return
+
+    folded = fold(text)
+    grams = trigrams(folded)
+    values = {'folded': folded[:200], 'trigram_count': len(grams), 'is_active': bool(is_active)}
+    if term_id is None:
+        term_id = connection.execute(
+            db.insert(terms).values(doc_type=doc_type, doc_id=doc_id, **values)
+        ).inserted_primary_key[0]
+    else:
+        connection.execute(db.update(terms).where(terms.c.id == term_id).values(**values))
+    if grams:
+        connection.execute(db.insert(grams_table),
+                           [{'trigram': gram, 'term_id': term_id} for gram in grams])
+
+def _register_listeners(doc_type, model, column):
+    @event.listens_for(model, 'after_insert')
+    def after_insert(mapper, connection, target):
+        _index_document(connection, doc_type, target.id, getattr(target, column), target.is_active)
+
+    @event.listens_for(model, 'after_update')
+    def after_update(mapper, connection, target):
+        state = inspect(target)
+        if state.attrs[column].history.has_changes():
+            _index_document(connection, doc_type, target.id, getattr(target, column), target.is_active)
+        elif state.attrs.is_active.history.has_changes():
+            terms = SearchTerm.__table__
+            connection.execute(db.update(terms)
+                               .where(terms.c.doc_type == doc_type, terms.c.doc_id == target.id)
+                               .values(is_active=bool(target.is_active)))
+
+    @event.listens_for(model, 'after_delete')
+    def after_delete(mapper, connection, target):
+        _index_document(connection, doc_type, target.id, None)
+
+for _doc_type, (_model, _column) in SOURCES.items():
+    _register_listeners(_doc_type, _model, _column)
+
+def fuzzy_matches(query, limit=DEFAULT_LIMIT, threshold=SIMILARITY_THRESHOLD):
+    """
+    Títulos de materiais e nomes de tópicos parecidos com a busca. A nota
+    (0 a 1) é a fração dos trigramas da busca encontrados no título, como o
+    word_similarity do pg_trgm; empates favorecem títulos mais curtos.
+    Não lê o conteúdo dos materiais.
+    """
+    grams = trigrams(fold(query))
+    if not grams:
+        return []
+
+    shared = db.session.query(SearchTrigram.term_id, db.func.count().label('shared'))\
+        .filter(SearchTrigram.trigram.in_(grams))\
+        .group_by(SearchTrigram.term_id)\
+        .having(db.func.count() >= threshold * len(grams)).subquery()
+    similarity = (shared.c.shared * 1.0) / len(grams)
+    jaccard = (shared.c.shared * 1.0) / (len(grams) + SearchTerm.trigram_count - shared.c.shared)
+    rows = db.session.query(SearchTerm.doc_type, SearchTerm.doc_id, similarity.label('similarity'))\
+        .join(shared, shared.c.term_id == SearchTerm.id)\
+        .filter(SearchTerm.is_active == True)\
+        .order_by(similarity.desc(), jaccard.desc(), SearchTerm.id)\
+        .limit(limit).all()
+    return [(row.doc_type, row.doc_id, row.similarity) for row in rows]
+
+def fuzzy_search(query, limit=DEFAULT_LIMIT, threshold=SIMILARITY_THRESHOLD):
+    """Resultados aproximados no mesmo formato da busca textual"""
+    matches = fuzzy_matches(query, limit, threshold)
+
+    details = {}
+    for doc_type, (model, column) in SOURCES.items():
+        ids = [doc_id for kind, doc_id, _ in matches if kind == doc_type]
+        if not ids:
+            continue
+        rows = db.session.query(model.id, getattr(model, column), model.difficulty_level,
+                                Subject.name, Subject.area)\
+            .join(Subject, Subject.id == model.subject_id)\
+            .filter(model.id.in_(ids)).all()
+        details.update({(doc_type, row[0]): row[1:] for row in rows})
+
+    results = []
+    for doc_type, doc_id, similarity in matches:
+        if (doc_type, doc_id) not in details:
+            continue
+        title, difficulty, subject, area = details[(doc_type, doc_id)]
+        results.append(SearchHit(type=doc_type, id=doc_id, title=title, snippet='',
+                                 subject=subject, area=area, difficulty_level=difficulty,
+                                 score=round(similarity, 3)))
+    return SearchPage(query, results, len(results), 1, max(limit, 1))
+
+def rebuild_trigram_index(chunk_size=REBUILD_CHUNK_SIZE):
+    """Reconstrói todo o índice de trigramas (use após cargas em lote)"""
+    db.session.execute(db.delete(SearchTrigram))
+    db.session.execute(db.delete(SearchTerm))
+
+    count = 0
+    for doc_type, (model, column) in SOURCES.items():
+        rows = db.session.query(model.id, getattr(model, column), model.is_active)\
+            .order_by(model.id).yield_per(chunk_size)
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                _index_chunk(doc_type, chunk)
+                count += len(chunk)
+                chunk = []
+        _index_chunk(doc_type, chunk)
+        count += len(chunk)
+    db.session.commit()
+    return count
+
+def _index_chunk(doc_type, rows):
+    """Insere em lote os termos e trigramas de um bloco de documentos"""
+    if not rows:
+        return
+    folded = {doc_id: fold(text) for doc_id, text, _ in rows}
+    grams = {doc_id: trigrams(text) for doc_id, text in folded.items()}
+    db.session.execute(db.insert(SearchTerm), [
+        {'doc_type': doc_type, 'doc_id': doc_id, 'folded': folded[doc_id][:200],
+         'trigram_count': len(grams[doc_id]), 'is_active': bool(is_active)}
+        for doc_id, _, is_active in rows
+    ])
+    term_ids = db.session.query(SearchTerm.doc_id, SearchTerm.id)\
+        .filter(SearchTerm.doc_type == doc_type, SearchTerm.doc_id.in_(list(folded))).all()
+    trigram_rows = [{'trigram': gram, 'term_id': term_id}
+                    for doc_id, term_id in term_ids for gram in grams[doc_id]]
+    if trigram_rows:
+        db.session.execute(SearchTrigram.__table__.insert(), trigram_rows)
+
+def init_fuzzy_search(app):
+    """Constrói o índice na primeira inicialização com catálogo já existente"""
+    with app.app_context():
+        # Só ids: o banco pode ainda não ter as colunas mais novas (antes do `flask db upgrade`)
+        if db.session.query(SearchTerm.id).first() is None and (
+                db.session.query(StudyMaterial.id).first() is not None or
+                db.session.query(Topic.id).first() is not None):
+            rebuild_trigram_index()
+
+@search_cli.command('rebuild-trigrams')
+def rebuild_trigrams_command():
+    """Reconstrói o índice de trigramas de títulos e tópicos."""
+    count = rebuild_trigram_index()
+    click.echo(f'✅ {count} títulos indexados.')
@@ -0,0 +1,71 @@
+from datetime import datetime
+from app.structure.database import upsert
+from app.structure.database.models import MaterialCompletion, ProgressRecord, StudyMaterial, db
+from app.structure.functions.progress_rollup import progress_deltas, update_rollups
+
+def record_completion(user_id, material, study_minutes=0):
+    """
+    Registra a conclusão de um material de forma atômica e idempotente.
+
+    A primeira conclusão de cada (usuário, material) é marcada com um INSERT
+    ... ON CONFLICT DO NOTHING; só ela incrementa o ProgressRecord do tópico,
+    em um único upsert que soma no próprio banco. Conclusões repetidas (duas
+    abas, clique duplo) apenas somam o tempo de estudo. Não faz commit.
+    Retorna True na primeira conclusão.
+    """
+    now = datetime.utcnow()
+    inserted = db.session.execute(
+        upsert.insert(MaterialCompletion)
+        .values(user_id=user_id, material_id=material.id, topic_id=material.topic_id, completed_at=now)
+        .on_conflict_do_nothing(index_elements=['user_id', 'material_id'])
+        .returning(MaterialCompletion.id)
+    ).scalar()
+
+    if inserted is None:
+        update_rollups(user_id, material.subject_id, study_minutes=study_minutes)
+        return False
+
+    total = db.session.query(db.func.count(StudyMaterial.id))\
+        .filter(StudyMaterial.topic_id == material.topic_id, StudyMaterial.is_active == True)\
+        .scalar() or 1
+    table = ProgressRecord.__table__
+    # Estado anterior da linha, para os agregados. FOR UPDATE trava a linha no
+    # PostgreSQL; no SQLite o INSERT acima já deu à transação o lock de escrita
+    old = db.session.execute(
+        db.select(table.c.progress_percentage, table.c.materials_completed, table.c.total_materials)
+        .where(table.c.user_id == user_id, table.c.topic_id == material.topic_id)
+        .with_for_update()
+    ).first()
+    # PostgreSQL usa LEAST; no SQLite min() com dois argumentos tem o mesmo papel
+    least = db.func.least if db.session.get_bind().dialect.name == 'postgresql' else db.func.min
+
+    statement = upsert.insert(ProgressRecord).values(
+        user_id=user_id, subject_id=material.subject_id, topic_id=material.topic_id,
+        materials_completed=1, total_materials=total,
+        progress_percentage=min(100.0, 100.0 / total), last_studied=now, updated_at=now)
+    statement = statement.on_conflict_do_update(
+        index_elements=['user_id', 'topic_id'],
+        set_={
+            'materials_completed': table.c.materials_completed + 1,
+            'total_materials': total,
+            'progress_percentage': least((table.c.materials_completed + 1) * 100.0 / total, 100.0),
+            'last_studied': now,
+            'updated_at': now,
+        },
+    ).returning(table.c.materials_completed, table.c.total_materials, table.c.progress_percentage)
+    completed, total_materials, progress_percentage = db.session.execute(statement).one()
+
+    previous = completed - 1
+    if old is not None and (old.materials_completed or 0) == previous:
+        before = (old.progress_percentage or 0.0, previous, old.total_materials or 0)
+    elif previous == 0:
+        before = None
+    else:
+        # Outra conclusão criou a linha entre a leitura e o upsert (não havia
+        # linha para travar): estima com o total de materiais atual
+        before = (min(100.0, previous * 100.0 / total_materials), previous, total_materials)
+    after = ProgressRecord(progress_percentage=progress_percentage,
+                           materials_completed=completed, total_materials=total_materials)
+    update_rollups(user_id, material.subject_id, study_minutes=study_minutes,
+                   **progress_deltas(before, after))
+    return True
@@ -0,0 +1,174 @@
+import click
+from collections import defaultdict
+from datetime import datetime
+from flask.cli import AppGroup
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.structure.database.models import (
+    ProgressRollup, ProgressRecord, StudySession, QuizAttempt, db
+)
+from app.structure.database import upsert
+from app.structure.functions.cache import cache
+
+TOTALS = ProgressRollup.TOTALS_SUBJECT_ID
+COUNTERS = (
+    'topics_started', 'topics_completed', 'progress_sum', 'materials_completed',
+    'total_materials', 'study_minutes', 'quizzes_completed', 'quiz_score_sum'
+)
+REBUILD_CHUNK_SIZE = 5000
+ALL_PROGRESS_TAG = 'user_progress'
+
+rollup_cli = AppGroup('rollups', help='Manutenção dos agregados de progresso.')
+
+def snapshot_progress(record):
+    """Estado de um ProgressRecord antes de uma alteração (None = ainda não existe)"""
+    if record is None:
+        return None
+    return (record.progress_percentage or 0.0,
+            record.materials_completed or 0,
+            record.total_materials or 0)
+
+def progress_deltas(before, record):
+    """Diferenças a aplicar nos agregados após alterar um ProgressRecord"""
+    percentage, materials, total = before or (0.0, 0, 0)
+    new_percentage = record.progress_percentage or 0.0
+    return {
+        'topics_started': 0 if before else 1,
+        'topics_completed': int(new_percentage >= 100) - int(bool(before) and percentage >= 100),
+        'progress_sum': new_percentage - percentage,
+        'materials_completed': (record.materials_completed or 0) - materials,
+        'total_materials': (record.total_materials or 0) - total,
+    }
+
+def progress_tag(user_id):
+    """Tag invalidada após cada commit que altera o progresso do usuário (ETags das páginas)"""
+    return f'user_progress:{user_id}'
+
+def update_rollups(user_id, subject_id, **deltas):
+    """
+    Aplica incrementos na linha da disciplina e na linha de totais do usuário,
+    dentro da transação corrente. Cada linha é gravada com um único
+    INSERT ... ON CONFLICT DO UPDATE que soma o incremento no próprio banco,
+    então atualizações concorrentes não se perdem nem colidem na criação.
+    """
+    unknown = set(deltas) - set(COUNTERS)
+    if unknown:
+        raise ValueError(f'Campos de agregado desconhecidos: {", ".join(sorted(unknown))}')
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not deltas:
+        return
+
+    table = ProgressRollup.__table__
+    now = datetime.utcnow()
+    for target in (subject_id, TOTALS):
+        statement = upsert.insert(ProgressRollup).values(
+            user_id=user_id, subject_id=target, updated_at=now,
+            **{name: deltas.get(name, 0) for name in COUNTERS})
+        # O ON CONFLICT não aplica o onupdate da coluna: updated_at vai explícito
+        statement = statement.on_conflict_do_update(
+            index_elements=['user_id', 'subject_id'],
+            set_={'updated_at': now, **{name: table.c[name] + statement.excluded[name] for name in deltas}})
+        db.session.execute(statement)
+    db.session.info.setdefault('progress_users', set()).add(user_id)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_progress(session):
+    user_ids = session.info.pop('progress_users', None)
+    if user_ids:
+        cache.invalidate_tag(*(progress_tag(user_id) for user_id in user_ids))
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_progress_changes(session):
+    session.info.pop('progress_users', None)
+
+def progress_version(user_id):
+    """
+    Versão do progresso do usuário lida do banco (updated_at da linha de
+    totais), para quando as tags do cache não são vistas por todos os workers
+    """
+    updated_at = db.session.query(ProgressRollup.updated_at)\
+        .filter_by(user_id=user_id, subject_id=TOTALS).scalar()
+    return updated_at.isoformat() if updated_at else 0
+
+def get_user_rollups(user_id):
+    """Retorna (totais, {subject_id: rollup}) do usuário com uma consulta"""
+    rows = ProgressRollup.query.filter_by(user_id=user_id).all()
+    by_subject = {row.subject_id: row for row in rows}
+    totals = by_subject.pop(TOTALS, None) or ProgressRollup(
+        user_id=user_id, subject_id=TOTALS, **{name: 0 for name in COUNTERS})
+    return totals, by_subject
+
+def _aggregate(user_ids=None):
+    """Recalcula os agregados em lote a partir das tabelas de origem"""
+    rollups = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+
+    def scoped(query, model):
+        if user_ids is not None:
+            query = query.filter(model.user_id.in_(user_ids))
+        return query.group_by(model.user_id, model.subject_id)
+
+    completed = db.case((ProgressRecord.progress_percentage >= 100, 1), else_=0)
+    progress_rows = scoped(db.session.query(
+        ProgressRecord.user_id, ProgressRecord.subject_id,
+        db.func.count(ProgressRecord.id),
+        db.func.sum(completed),
+        db.func.sum(ProgressRecord.progress_percentage),
+        db.func.sum(ProgressRecord.materials_completed),
+        db.func.sum(ProgressRecord.total_materials),
+    ), ProgressRecord)
+    for user_id, subject_id, started, done, percentage, materials, total in progress_rows:
+        row = rollups[(user_id, subject_id)]
+        row.update(topics_started=started, topics_completed=done or 0,
+                   progress_sum=percentage or 0.0, materials_completed=materials or 0,
+                   total_materials=total or 0)
+
+    session_rows = scoped(db.session.query(
+        StudySession.user_id, StudySession.subject_id,
+        db.func.sum(StudySession.duration_minutes),
+    ), StudySession)
+    for user_id, subject_id, minutes in session_rows:
+        rollups[(user_id, subject_id)]['study_minutes'] = minutes or 0
+
+    quiz_rows = scoped(db.session.query(
+        QuizAttempt.user_id, QuizAttempt.subject_id,
+        db.func.count(QuizAttempt.id),
+        db.func.sum(QuizAttempt.score),
+    ).filter(QuizAttempt.completed == True), QuizAttempt)
+    for user_id, subject_id, quizzes, score in quiz_rows:
+        row = rollups[(user_id, subject_id)]
+        row.update(quizzes_completed=quizzes, quiz_score_sum=score or 0.0)
+
+    totals = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for (user_id, _), values in rollups.items():
+        for name, value in values.items():
+            totals[user_id][name] += value
+    for user_id, values in totals.items():
+        rollups[(user_id, TOTALS)] = values
+    return rollups
+
+def rebuild_rollups(user_ids=None, chunk_size=REBUILD_CHUNK_SIZE):
+    """
+    Reconstrói os agregados de progresso (todos ou só dos usuários informados).
+    Use após migrações ou quando houver divergência com ProgressRecord/StudySession.
+    """
+    rollups = _aggregate(user_ids)
+
+    delete = db.delete(ProgressRollup)
+    if user_ids is not None:
+        delete = delete.where(ProgressRollup.user_id.in_(user_ids))
+    db.session.execute(delete)
+
+    rows = [dict(values, user_id=user_id, subject_id=subject_id)
+            for (user_id, subject_id), values in rollups.items()]
+    for start in range(0, len(rows), chunk_size):
+        db.session.execute(db.insert(ProgressRollup), rows[start:start + chunk_size])
+    db.session.commit()
+    cache.invalidate_tag(ALL_PROGRESS_TAG)
+    return len(rows)
+
+@rollup_cli.command('rebuild')
+@click.option('--user-id', 'user_ids', type=int, multiple=True, help='Reconstrói apenas estes usuários.')
+def rebuild_command(user_ids):
+    """Recalcula progress_rollups a partir das tabelas de progresso."""
+    count = rebuild_rollups(list(user_ids) or None)
+    click.echo(f'✅ {count} linhas de agregados reconstruídas.')
@@ -0,0 +1,290 @@
+import click
+import logging
+import random
+import threading
+from array import array
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from flask.cli import AppGroup
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+from app.structure.database.models import Topic, Subject, Question, Answer, db
+from app.structure.functions.cache import cache
+from app.structure.functions.counters import get_counter, increment, CATALOG_VERSION
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_EXPIRE_TIME = 24 * 3600  # a versão do tópico já invalida o pacote quando algo muda
+QUESTIONS_PER_QUIZ = 10
+COMPILED_BUNDLES = 64  # índices (ids por dificuldade) mantidos por processo
+RECENT_QUESTIONS = 30  # questões vistas recentemente que não devem se repetir
+RECENT_EXPIRE_TIME = 7 * 24 * 3600
+WARM_MIN_QUESTIONS = 2000  # tópicos a partir deste tamanho são compilados fora das requisições
+
+_compiled = OrderedDict()  # topic_id -> (chave versionada, índice compacto)
+_compiled_lock = threading.Lock()
+_refreshing = set()  # tópicos sendo recompilados em segundo plano
+
+quiz_cli = AppGroup('quiz', help='Pacotes compilados dos quizzes.')
+
+def bundle_version_name(topic_id):
+    """Contador (tabela counters) incrementado a cada alteração de questão do tópico"""
+    return f'quiz_topic:{topic_id}'
+
+def bundle_key(topic_id):
+    """
+    Chave do pacote na versão atual do tópico. A versão fica no banco, como a
+    do catálogo, e não em uma tag do cache: assim todos os workers a veem
+    (em até COUNTER_REFRESH segundos) mesmo com o cache local. Tópicos ainda
+    sem versão (questões inseridas em massa) usam a do catálogo, que
+    reconcile_counters avança.
+    """
+    version = get_counter(bundle_version_name(topic_id)) or get_counter(CATALOG_VERSION)
+    return f'quiz_strata:{topic_id}:{version}'
+
+def get_quiz_bundle(topic_id, stale_ok=False):
+    """
+    Pacote compilado do quiz de um tópico: dados do tópico e os ids das
+    questões ativas agrupados por dificuldade, o suficiente para o sorteio.
+    Textos e alternativas das questões sorteadas são lidos pela chave
+    primária (load_questions), e o gabarito só na correção. Fica no cache até
+    alguma questão do tópico mudar. Retorna None se o tópico não existir.
+
+    A chave inclui a versão do tópico, então a cópia mantida em memória (ids
+    em arrays compactos) é descartada naturalmente quando o tópico muda. Com
+    `stale_ok`, a cópia anterior continua servindo enquanto a nova é
+    compilada em segundo plano: tópicos grandes não devem ser compilados
+    dentro da requisição.
+    """
+    key = bundle_key(topic_id)
+    with _compiled_lock:
+        entry = _compiled.get(topic_id)
+        if entry is not None:
+            _compiled.move_to_end(topic_id)
+    if entry is not None and (entry[0] == key or stale_ok):
+        if entry[0] != key:
+            _refresh_in_background(topic_id)
+        return entry[1]
+    return _compile(topic_id, key)
+
+def _compile(topic_id, key):
+    """Pacote do cache (ou compilado agora) guardado na memória do processo"""
+    bundle = cache.get_or_set(key, lambda: build_quiz_bundle(topic_id), BUNDLE_EXPIRE_TIME)
+    if bundle is not None:
+        bundle = dict(bundle, strata={stratum: array('I', ids) for stratum, ids in bundle['strata'].items()})
+        with _compiled_lock:
+            _compiled[topic_id] = (key, bundle)
+            _compiled.move_to_end(topic_id)
+            while len(_compiled) > COMPILED_BUNDLES:
+                _compiled.popitem(last=False)
+    return bundle
+
+def warm_quiz_bundle(topic_id):
+    """Compila (ou lê do cache) o pacote atual do tópico para a memória do processo"""
+    return _compile(topic_id, bundle_key(topic_id))
+
+def _refresh_in_background(*topic_ids, app=None):
+    """Recompila os pacotes em uma thread, um tópico de cada vez"""
+    with _compiled_lock:
+        topic_ids = [topic_id for topic_id in topic_ids if topic_id not in _refreshing]
+        _refreshing.update(topic_ids)
+    if not topic_ids:
+        return
+    app = app or current_app._get_current_object()
+
+    def rebuild():
+        try:
+            with app.app_context():
+                for topic_id in topic_ids:
+                    try:
+                        warm_quiz_bundle(topic_id)
+                    except Exception:
+                        logger.exception('Falha ao compilar o pacote do quiz do tópico %s', topic_id)
+                db.session.remove()
+        finally:
+            with _compiled_lock:
+                _refreshing.difference_update(topic_ids)
+
+    threading.Thread(target=rebuild, name='quiz-bundle-refresh', daemon=True).start()
+
+def large_topics(min_questions=None):
+    """Ids dos tópicos com pelo menos `min_questions` questões ativas"""
+    if min_questions is None:
+        min_questions = WARM_MIN_QUESTIONS
+    return [topic_id for topic_id, in db.session.query(Question.topic_id)
+            .filter(Question.is_active == True)
+            .group_by(Question.topic_id)
+            .having(func.count(Question.id) >= min_questions)]
+
+def build_quiz_bundle(topic_id):
+    """Monta o pacote com duas consultas (tópico e ids das questões)"""
+    topic = db.session.query(Topic.id, Topic.name, Topic.subject_id, Subject.name, Subject.color)\
+        .join(Subject, Subject.id == Topic.subject_id)\
+        .filter(Topic.id == topic_id).first()
+    if topic is None:
+        return None
+
+    # Ids agrupados por dificuldade, para o sorteio estratificado
+    strata = {}
+    for question_id, difficulty in db.session.query(Question.id, Question.difficulty_level)\
+            .filter(Question.topic_id == topic_id, Question.is_active == True)\
+            .order_by(Question.id):
+        strata.setdefault(str(difficulty or 1), []).append(question_id)
+
+    return {
+        'topic': {
+            'id': topic[0],
+            'name': topic[1],
+            'subject_id': topic[2],
+            'subject': {'name': topic[3], 'color': topic[4] or '#007bff'},
+        },
+        'strata': strata,
+    }
+
+def load_questions(question_ids):
+    """
+    Questões com alternativas (sem o gabarito) em uma consulta pela chave
+    primária, na ordem de `question_ids`. Questões desativadas depois da
+    compilação do pacote ficam de fora.
+    """
+    if not question_ids:
+        return []
+    rows = db.session.query(Question.id, Question.question_text, Question.question_type,
+                            Question.difficulty_level, Answer.id, Answer.answer_text)\
+        .outerjoin(Answer, Answer.question_id == Question.id)\
+        .filter(Question.id.in_(question_ids), Question.is_active == True)\
+        .order_by(Question.id, Answer.id).all()
+
+    questions = {}
+    for question_id, text, question_type, difficulty, answer_id, answer_text in rows:
+        question = questions.get(question_id)
+        if question is None:
+            question = questions[question_id] = {
+                'id': question_id,
+                'question_text': text,
+                'question_type': question_type,
+                'difficulty_level': difficulty or 1,
+                'answers': [],
+            }
+        if answer_id is not None:
+            question['answers'].append({'id': answer_id, 'answer_text': answer_text})
+    return [questions[question_id] for question_id in question_ids if question_id in questions]
+
+def _quotas(sizes, count):
+    """Divide `count` entre os estratos proporcionalmente ao tamanho (maiores restos)"""
+    total = sum(sizes.values())
+    exact = {stratum: count * size / total for stratum, size in sizes.items()}
+    quotas = {stratum: int(value) for stratum, value in exact.items()}
+    remaining = count - sum(quotas.values())
+    for stratum in sorted(exact, key=lambda s: exact[s] - quotas[s], reverse=True)[:remaining]:
+        quotas[stratum] += 1
+    return quotas
+
+def _draw(question_ids, quota, exclude, rng):
+    """Sorteia `quota` ids evitando os excluídos quando possível"""
+    if quota <= 0:
+        return []
+    candidates = rng.sample(question_ids, min(len(question_ids), quota + len(exclude)))
+    fresh = [question_id for question_id in candidates if question_id not in exclude]
+    if len(fresh) >= quota:
+        return fresh[:quota]
+    seen = [question_id for question_id in candidates if question_id in exclude]
+    return fresh + seen[:quota - len(fresh)]
+
+def sample_questions(bundle, count=QUESTIONS_PER_QUIZ, exclude=(), rng=random):
+    """
+    Sorteia os ids de `count` questões do pacote, estratificadas por
+    dificuldade na mesma proporção do tópico, evitando as de `exclude`. Custa
+    O(count + len(exclude)), independente do total de questões do tópico.
+    """
+    strata = bundle['strata']
+    sizes = {stratum: len(question_ids) for stratum, question_ids in strata.items()}
+    if sum(sizes.values()) <= count:
+        chosen = [question_id for question_ids in strata.values() for question_id in question_ids]
+    else:
+        exclude = set(exclude)
+        chosen = []
+        for stratum, quota in _quotas(sizes, count).items():
+            chosen.extend(_draw(strata[stratum], quota, exclude, rng))
+    rng.shuffle(chosen)
+    return chosen
+
+def quiz_questions(bundle, user_id, limit=QUESTIONS_PER_QUIZ):
+    """Questões de uma nova tentativa, evitando as vistas recentemente pelo usuário"""
+    recent_key = f"quiz_recent:{user_id}:{bundle['topic']['id']}"
+    recent = cache.get(recent_key) or []
+    questions = load_questions(sample_questions(bundle, limit, exclude=recent))
+    recent = ([question['id'] for question in questions] + recent)[:RECENT_QUESTIONS]
+    cache.set(recent_key, recent, RECENT_EXPIRE_TIME)
+    return questions
+
+# Invalidação: a versão de cada tópico alterado é incrementada na tabela
+# counters, na mesma transação da alteração, então ninguém compila o pacote
+# novo a partir de dados ainda não confirmados. Os tópicos também são
+# anotados na sessão, para a recompilação em segundo plano após o commit.
+
+def _touch(target, *topic_ids):
+    session = Session.object_session(target)
+    topic_ids = {topic_id for topic_id in topic_ids if topic_id is not None}
+    if session is not None and topic_ids:
+        increment(target, *(bundle_version_name(topic_id) for topic_id in topic_ids))
+        session.info.setdefault('quiz_topics', set()).update(topic_ids)
+
+def _question_changed(mapper, connection, target):
+    history = inspect(target).attrs.topic_id.history
+    _touch(target, target.topic_id, *(history.deleted or ()))
+
+# Alternativas não entram no pacote: são lidas junto com as questões sorteadas
+for _event in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Question, _event, _question_changed)
+
+@event.listens_for(Session, 'after_commit')
+def _refresh_bundles(session):
+    topic_ids = session.info.pop('quiz_topics', None)
+    if topic_ids:
+        # Os tópicos que este processo já tinha compilados são recompilados
+        # agora, antes que uma requisição precise deles
+        with _compiled_lock:
+            compiled = [topic_id for topic_id in topic_ids if topic_id in _compiled]
+        if compiled and has_app_context():
+            _refresh_in_background(*compiled)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_bundle_changes(session):
+    session.info.pop('quiz_topics', None)
+
+@quiz_cli.command('warm')
+@click.option('--topic', 'topic_ids', type=int, multiple=True, help='Tópico a compilar (repetível).')
+@click.option('--min-questions', type=int, default=None,
+              help='Sem --topic: compila os tópicos com pelo menos esta quantidade de questões.')
+def warm_command(topic_ids, min_questions):
+    """Compila os pacotes e os grava no cache (útil com Redis, antes de abrir o tráfego)"""
+    for topic_id in topic_ids or large_topics(min_questions):
+        click.echo(f'Tópico {topic_id}: {"ok" if warm_quiz_bundle(topic_id) else "não encontrado"}')
+
+def init_quiz_bundles(app):
+    """
+    Compila em segundo plano, na primeira requisição de cada processo, os
+    pacotes dos tópicos com pelo menos QUIZ_WARM_MIN_QUESTIONS questões (None
+    desliga), que demorariam segundos para compilar dentro de uma requisição.
+    """
+    min_questions = app.config.get('QUIZ_WARM_MIN_QUESTIONS', WARM_MIN_QUESTIONS)
+    # As versões são do banco da aplicação: outro banco recomeça a numeração
+    with _compiled_lock:
+        _compiled.clear()
+    if min_questions is None:
+        return
+    started = []
+
+    @app.before_request
+    def warm_large_topics():
+        if started:
+            return
+        started.append(True)
+        try:
+            topic_ids = large_topics(min_questions)
+        except Exception:
+            logger.exception('Falha ao listar os tópicos para compilar os pacotes de quiz')
+            return
+        if topic_ids:
+            _refresh_in_background(*topic_ids)
@@ -0,0 +1,72 @@
+import json
+from app.structure.database.models import Answer, UserAnswer, db
+
+class GradingError(ValueError):
+    """Envio de respostas inválido para a tentativa"""
+
+def parse_submission(payload):
+    """
+    Converte o corpo enviado pelo quiz em {question_id: answer_id}.
+    Aceita {"answers": {...}} ou diretamente o dicionário de respostas.
+    """
+    if not isinstance(payload, dict):
+        raise GradingError('Formato de respostas inválido.')
+    answers = payload.get('answers', payload)
+    if not isinstance(answers, dict):
+        raise GradingError('Formato de respostas inválido.')
+    try:
+        return {int(question_id): int(answer_id) for question_id, answer_id in answers.items()}
+    except (TypeError, ValueError):
+        raise GradingError('Identificadores de questão/resposta inválidos.')
+
+def attempt_question_ids(quiz_attempt):
+    """Ids das questões sorteadas para a tentativa, gravados ao iniciar o quiz"""
+    if not quiz_attempt.question_ids:
+        raise GradingError('Tentativa sem questões registradas; inicie o quiz novamente.')
+    return json.loads(quiz_attempt.question_ids)
+
+def load_answer_key(question_ids):
+    """
+    Gabarito (answer_id -> [question_id, is_correct]) e explicações
+    ({question_id: texto}) só das questões da tentativa, em uma consulta.
+    """
+    answer_key, explanations = {}, {}
+    if not question_ids:
+        return answer_key, explanations
+    rows = db.session.query(Answer.id, Answer.question_id, Answer.is_correct, Answer.explanation)\
+        .filter(Answer.question_id.in_(question_ids)).all()
+    for answer_id, question_id, is_correct, explanation in rows:
+        answer_key[str(answer_id)] = [question_id, bool(is_correct)]
+        if is_correct and explanation:
+            explanations[str(question_id)] = explanation
+    return answer_key, explanations
+
+def grade_attempt(quiz_attempt, submitted, answer_key, question_ids):
+    """
+    Corrige as respostas de uma tentativa usando o gabarito das questões da
+    tentativa (answer_id -> [question_id, is_correct]) e grava um UserAnswer por
+    questão em um único INSERT. Respostas que não pertencem à questão
+    informada e questões que não foram sorteadas para a tentativa
+    (`question_ids`) são ignoradas. Retorna o número de acertos.
+    """
+    if len(submitted) > quiz_attempt.total_questions:
+        raise GradingError('Mais respostas do que questões na tentativa.')
+
+    allowed = set(question_ids)
+    rows = []
+    for question_id, answer_id in submitted.items():
+        key = answer_key.get(str(answer_id))
+        if key is None or key[0] != question_id:
+            continue
+        if question_id not in allowed:
+            continue
+        rows.append({
+            'quiz_attempt_id': quiz_attempt.id,
+            'question_id': question_id,
+            'selected_answer_id': answer_id,
+            'is_correct': key[1],
+        })
+
+    if rows:
+        db.session.execute(db.insert(UserAnswer), rows)
+    return sum(1 for row in rows if row['is_correct'])
@@ -0,0 +1,361 @@
+import click
+import html
+import re
+from dataclasses import dataclass
+from flask import url_for
+from flask.cli import AppGroup
+from markupsafe import Markup
+from sqlalchemy import DDL, event
+from app.structure.database.models import StudyMaterial, Topic, Subject, db
+
+DEFAULT_PER_PAGE = 10
+MAX_PER_PAGE = 50
+SNIPPET_TOKENS = 24
+MARK_OPEN, MARK_CLOSE = '\x02', '\x03'
+DIFFICULTY_LABELS = {1: 'facil', 2: 'facil', 3: 'medio', 4: 'dificil', 5: 'dificil'}
+
+search_cli = AppGroup('search', help='Manutenção do índice de busca.')
+
+@dataclass
+class SearchHit:
+    """Um resultado de busca (material ou tópico)"""
+    type: str
+    id: int
+    title: str
+    snippet: str
+    subject: str
+    area: str
+    difficulty_level: int
+    score: float
+
+    @property
+    def difficulty(self):
+        return DIFFICULTY_LABELS.get(self.difficulty_level, '')
+
+    @property
+    def description(self):
+        return self.snippet
+
+    @property
+    def url(self):
+        if self.type == 'material':
+            return url_for('main.study_material', material_id=self.id)
+        return url_for('main.topic_detail', topic_id=self.id)
+
+@dataclass
+class SearchPage:
+    """Uma página de resultados ordenados por relevância"""
+    query: str
+    results: list
+    total: int
+    page: int
+    per_page: int
+
+    @property
+    def pages(self):
+        return max(1, -(-self.total // self.per_page))
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def has_next(self):
+        return self.page < self.pages
+
+    def __len__(self):
+        return len(self.results)
+
+    def __iter__(self):
+        return iter(self.results)
+
+@dataclass
+class _Row:
+    """Linha intermediária devolvida pelos motores"""
+    doc_type: str
+    id: int
+    title: str
+    snippet: str
+    difficulty: int
+    subject: str
+    area: str
+    score: float
+
+def highlight(text):
+    """Converte os marcadores de destaque em <mark>, escapando o restante"""
+    escaped = html.escape(text or '')
+    return Markup(escaped.replace(MARK_OPEN, '<mark>').replace(MARK_CLOSE, '</mark>'))
+
+def highlight_terms(text, query):
+    """Destaca os termos buscados em um texto comum (textos já destacados ficam iguais)"""
+    if isinstance(text, Markup):
+        return text
+    escaped = html.escape(text or '')
+    terms = [re.escape(html.escape(term)) for term in search_terms(query)]
+    if not terms:
+        return Markup(escaped)
+    pattern = re.compile('(' + '|'.join(terms) + ')', re.IGNORECASE)
+    return Markup(pattern.sub(r'<mark>\1</mark>', escaped))
+
+def search_terms(query):
+    """Termos da busca, sem operadores da sintaxe do índice"""
+    return re.findall(r'\w+', query or '')[:16]
+
+class SearchEngine:
+    """Busca por materiais e tópicos; cada banco tem sua implementação"""
+
+    def rebuild(self):
+        """Reconstrói o índice a partir das tabelas de origem"""
+
+    def search(self, query, page=1, per_page=DEFAULT_PER_PAGE):
+        terms = search_terms(query)
+        page = max(1, page)
+        per_page = min(max(1, per_page), MAX_PER_PAGE)
+        if not terms:
+            return SearchPage(query, [], 0, page, per_page)
+        rows, total = self._search(terms, per_page, (page - 1) * per_page)
+        results = [SearchHit(type=row.doc_type, id=row.id, title=highlight(row.title),
+                             snippet=highlight(row.snippet), subject=row.subject,
+                             area=row.area, difficulty_level=row.difficulty,
+                             score=row.score)
+                   for row in rows]
+        return SearchPage(query, results, total, page, per_page)
+
+    def _search(self, terms, limit, offset):
+        raise NotImplementedError
+
+    def _execute(self, sql, **params):
+        return db.session.execute(db.text(sql), params).all()
+
+class SQLiteSearchEngine(SearchEngine):
+    """FTS5 com tabelas de conteúdo externo mantidas por gatilhos"""
+
+    INDEXES = {
+        'study_materials_fts': ('study_materials', 'title', 'content'),
+        'topics_fts': ('topics', 'name', 'description'),
+    }
+
+    # CROSS JOIN fixa a ordem: o SQLite percorreria o índice de is_active e
+    # repetiria o MATCH para cada linha ativa (segundos com milhares de materiais)
+    RANKED_SQL = """
+        SELECT doc_type, id, score, COUNT(*) OVER () AS total FROM (
+            SELECT 'material' AS doc_type, m.id AS id,
+                   bm25(study_materials_fts, 10.0, 1.0) AS score
+            FROM study_materials_fts
+            CROSS JOIN study_materials m ON m.id = study_materials_fts.rowid
+            WHERE study_materials_fts MATCH :match AND m.is_active = 1
+            UNION ALL
+            SELECT 'topic', t.id, bm25(topics_fts, 10.0, 2.0)
+            FROM topics_fts
+            CROSS JOIN topics t ON t.id = topics_fts.rowid
+            WHERE topics_fts MATCH :match AND t.is_active = 1
+        )
+        ORDER BY score LIMIT :limit OFFSET :offset
+    """
+
+    # Snippets só são gerados para os itens da página atual
+    DETAIL_SQL = {
+        'material': """
+            SELECT m.id AS id,
+                   highlight(study_materials_fts, 0, :open, :close) AS title,
+                   snippet(study_materials_fts, 1, :open, :close, '…', :tokens) AS snippet,
+                   m.difficulty_level AS difficulty, s.name AS subject, s.area AS area
+            FROM study_materials_fts
+            JOIN study_materials m ON m.id = study_materials_fts.rowid
+            JOIN subjects s ON s.id = m.subject_id
+            WHERE study_materials_fts MATCH :match AND study_materials_fts.rowid IN ({ids})
+        """,
+        'topic': """
+            SELECT t.id AS id,
+                   highlight(topics_fts, 0, :open, :close) AS title,
+                   snippet(topics_fts, 1, :open, :close, '…', :tokens) AS snippet,
+                   t.difficulty_level AS difficulty, s.name AS subject, s.area AS area
+            FROM topics_fts
+            JOIN topics t ON t.id = topics_fts.rowid
+            JOIN subjects s ON s.id = t.subject_id
+            WHERE topics_fts MATCH :match AND topics_fts.rowid IN ({ids})
+        """,
+    }
+
+    def rebuild(self):
+        for index in self.INDEXES:
+            db.session.execute(db.text(f"INSERT INTO {index}({index}) VALUES ('rebuild')"))
+        db.session.commit()
+
+    @classmethod
+    def ddl(cls, index):
+        """Tabela FTS5 e gatilhos de um índice"""
+        table, title, body = cls.INDEXES[index]
+        return [
+            f"""CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5(
+                    {title}, {body}, content='{table}', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2')""",
+            f"""CREATE TRIGGER IF NOT EXISTS {index}_ai AFTER INSERT ON {table} BEGIN
+                    INSERT INTO {index}(rowid, {title}, {body}) VALUES (new.id, new.{title}, new.{body});
+                END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {index}_ad AFTER DELETE ON {table} BEGIN
+                    INSERT INTO {index}({index}, rowid, {title}, {body})
+                    VALUES ('delete', old.id, old.{title}, old.{body});
+                END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {index}_au AFTER UPDATE OF {title}, {body} ON {table} BEGIN
+                    INSERT INTO {index}({index}, rowid, {title}, {body})
+                    VALUES ('delete', old.id, old.{title}, old.{body});
+                    INSERT INTO {index}(rowid, {title}, {body}) VALUES (new.id, new.{title}, new.{body});
+                END""",
+        ]
+
+    def _match(self, terms):
+        # Cada termo entre aspas; o último aceita prefixo ("revol" encontra "revolução")
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += '*'
+        return ' '.join(quoted)
+
+    def _search(self, terms, limit, offset):
+        match = self._match(terms)
+        ranked = self._execute(self.RANKED_SQL, match=match, limit=limit, offset=offset)
+        if not ranked:
+            return [], 0
+
+        details = {}
+        for doc_type, sql in self.DETAIL_SQL.items():
+            ids = [row.id for row in ranked if row.doc_type == doc_type]
+            if ids:
+                rows = self._execute(sql.format(ids=', '.join(str(int(i)) for i in ids)),
+                                     match=match, open=MARK_OPEN, close=MARK_CLOSE,
+                                     tokens=SNIPPET_TOKENS)
+                details.update({(doc_type, row.id): row for row in rows})
+
+        rows = []
+        for row in ranked:
+            detail = details[(row.doc_type, row.id)]
+            rows.append(_Row(row.doc_type, row.id, detail.title, detail.snippet,
+                             detail.difficulty, detail.subject, detail.area, -row.score))
+        return rows, ranked[0].total
+
+class PostgresSearchEngine(SearchEngine):
+    """tsvector com índices GIN de expressão, sempre em sincronia com as tabelas"""
+
+    MATERIAL_VECTOR = "to_tsvector('portuguese', coalesce(m.title, '') || ' ' || coalesce(m.content, ''))"
+    TOPIC_VECTOR = "to_tsvector('portuguese', coalesce(t.name, '') || ' ' || coalesce(t.description, ''))"
+
+    SETUP_SQL = {
+        'study_materials': "CREATE INDEX IF NOT EXISTS ix_study_materials_search ON study_materials USING GIN "
+                           "(to_tsvector('portuguese', coalesce(title, '') || ' ' || coalesce(content, '')))",
+        'topics': "CREATE INDEX IF NOT EXISTS ix_topics_search ON topics USING GIN "
+                  "(to_tsvector('portuguese', coalesce(name, '') || ' ' || coalesce(description, '')))",
+    }
+
+    HEADLINE_OPTIONS = f'StartSel={MARK_OPEN}, StopSel={MARK_CLOSE}, MaxWords=35, MinWords=15'
+
+    def rebuild(self):
+        db.session.execute(db.text('REINDEX INDEX ix_study_materials_search'))
+        db.session.execute(db.text('REINDEX INDEX ix_topics_search'))
+        db.session.commit()
+
+    def _search(self, terms, limit, offset):
+        sql = f"""
+            WITH q AS (SELECT to_tsquery('portuguese', :tsquery) AS query),
+            ranked AS (
+                SELECT 'material' AS doc_type, m.id AS id,
+                       ts_rank({self.MATERIAL_VECTOR}, q.query) AS score
+                FROM study_materials m, q
+                WHERE {self.MATERIAL_VECTOR} @@ q.query AND m.is_active
+                UNION ALL
+                SELECT 'topic', t.id, ts_rank({self.TOPIC_VECTOR}, q.query) * 2
+                FROM topics t, q
+                WHERE {self.TOPIC_VECTOR} @@ q.query AND t.is_active
+            ),
+            page AS (
+                SELECT doc_type, id, score, COUNT(*) OVER () AS total
+                FROM ranked ORDER BY score DESC LIMIT :limit OFFSET :offset
+            )
+            SELECT p.doc_type, p.id, p.score, p.total,
+                   ts_headline('portuguese', coalesce(m.title, t.name), q.query, :options) AS title,
+                   ts_headline('portuguese', coalesce(m.content, t.description, ''), q.query, :options) AS snippet,
+                   coalesce(m.difficulty_level, t.difficulty_level) AS difficulty,
+                   s.name AS subject, s.area AS area
+            FROM page p
+            CROSS JOIN q
+            LEFT JOIN study_materials m ON p.doc_type = 'material' AND m.id = p.id
+            LEFT JOIN topics t ON p.doc_type = 'topic' AND t.id = p.id
+            JOIN subjects s ON s.id = coalesce(m.subject_id, t.subject_id)
+            ORDER BY p.score DESC
+        """
+        tsquery = ' & '.join(terms[:-1] + [terms[-1] + ':*'])
+        rows = self._execute(sql, tsquery=tsquery, limit=limit, offset=offset,
+                             options=self.HEADLINE_OPTIONS)
+        if not rows:
+            return [], 0
+        return ([_Row(r.doc_type, r.id, r.title, r.snippet, r.difficulty, r.subject, r.area, r.score)
+                 for r in rows], rows[0].total)
+
+class LikeSearchEngine(SearchEngine):
+    """Busca por substring (LIKE '%q%'); usada em bancos sem índice textual"""
+
+    def _search(self, terms, limit, offset):
+        query = ' '.join(terms)
+        materials = db.session.query(StudyMaterial, Subject)\
+            .join(Subject, Subject.id == StudyMaterial.subject_id)\
+            .filter(StudyMaterial.title.contains(query) | StudyMaterial.content.contains(query))\
+            .filter(StudyMaterial.is_active == True)
+        topics = db.session.query(Topic, Subject)\
+            .join(Subject, Subject.id == Topic.subject_id)\
+            .filter(Topic.name.contains(query) | Topic.description.contains(query))\
+            .filter(Topic.is_active == True)
+        material_total = materials.count()
+        total = material_total + topics.count()
+
+        rows = []
+        for material, subject in materials.order_by(StudyMaterial.id).offset(offset).limit(limit):
+            rows.append(_Row('material', material.id, material.title, _excerpt(material.content, query),
+                             material.difficulty_level, subject.name, subject.area, 0.0))
+        remaining = limit - len(rows)
+        if remaining > 0:
+            skip = max(0, offset - material_total)
+            for topic, subject in topics.order_by(Topic.id).offset(skip).limit(remaining):
+                rows.append(_Row('topic', topic.id, topic.name, _excerpt(topic.description, query),
+                                 topic.difficulty_level, subject.name, subject.area, 0.0))
+        return rows, total
+
+def _excerpt(text, query, width=120):
+    """Trecho ao redor da primeira ocorrência, com o termo marcado"""
+    text = text or ''
+    position = text.lower().find(query.lower())
+    if position < 0:
+        return text[:width]
+    start = max(0, position - width // 2)
+    end = position + len(query)
+    return (text[start:position] + MARK_OPEN + text[position:end] + MARK_CLOSE
+            + text[end:end + width // 2])
+
+ENGINES = {
+    'sqlite': SQLiteSearchEngine,
+    'postgresql': PostgresSearchEngine,
+}
+
+def get_search_engine():
+    """Motor de busca adequado ao banco configurado"""
+    return ENGINES.get(db.engine.dialect.name, LikeSearchEngine)()
+
+def _register_ddl():
+    """
+    Índices textuais criados e removidos junto com as tabelas de origem
+    (create_all/drop_all); bancos existentes os recebem pela migração.
+    """
+    tables = {'study_materials': StudyMaterial.__table__, 'topics': Topic.__table__}
+    for index, (table, _, _) in SQLiteSearchEngine.INDEXES.items():
+        for statement in SQLiteSearchEngine.ddl(index):
+            event.listen(tables[table], 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+        # A tabela FTS não depende da de origem e sobreviveria ao drop_all com entradas antigas
+        event.listen(tables[table], 'before_drop',
+                     DDL(f'DROP TABLE IF EXISTS {index}').execute_if(dialect='sqlite'))
+    for table, statement in PostgresSearchEngine.SETUP_SQL.items():
+        event.listen(tables[table], 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+
+_register_ddl()
+
+@search_cli.command('rebuild')
+def rebuild_command():
+    """Reconstrói o índice de busca textual."""
+    get_search_engine().rebuild()
+    click.echo('✅ Índice de busca reconstruído.')
@@ -0,0 +1,53 @@
+import uuid
+from datetime import datetime
+from app.structure.database.models import StudySession, db
+from app.structure.functions.write_behind import WriteBehindBuffer
+
+def _write_sessions(rows):
+    db.session.execute(db.insert(StudySession), rows)
+    db.session.commit()
+
+# Abrir um material não grava nada na requisição: o início da sessão vai para
+# esta fila e é inserido em lote (um INSERT com várias linhas)
+session_buffer = WriteBehindBuffer('study_sessions', _write_sessions,
+                                   key=lambda row: row['session_token'])
+
+def start_session(user_id, material):
+    """
+    Registra o início de uma sessão de estudo e retorna o token que a
+    identifica no formulário de conclusão (aleatório, não dá para adivinhar
+    o de outro usuário). A linha é gravada em segundo plano.
+    """
+    token = uuid.uuid4().hex
+    session_buffer.add({
+        'session_token': token,
+        'user_id': user_id,
+        'subject_id': material.subject_id,
+        'topic_id': material.topic_id,
+        'material_id': material.id,
+        'start_time': datetime.utcnow(),
+        'completed': False,
+    })
+    return token
+
+def get_session(token):
+    """
+    Sessão de estudo pelo token; se ela ainda estiver na fila, grava a fila
+    antes. A fila é de cada processo: se a conclusão cair em outro worker
+    antes do próximo flush (até STUDY_SESSION_FLUSH_INTERVAL segundos), a
+    sessão ainda não existe no banco e o tempo de estudo não é contado.
+    """
+    if not token:
+        return None
+    if session_buffer.pending(token) is not None:
+        session_buffer.flush()
+    # Páginas abertas antes do token ainda enviam o id numérico
+    if token.isdigit():
+        return db.session.get(StudySession, int(token))
+    return StudySession.query.filter_by(session_token=token).first()
+
+def init_study_sessions(app):
+    """Configura a fila de sessões (a coluna session_token vem da migração do Alembic)"""
+    session_buffer.init_app(app,
+                            interval=app.config.get('STUDY_SESSION_FLUSH_INTERVAL'),
+                            max_size=app.config.get('STUDY_SESSION_BUFFER_SIZE'))
@@ -0,0 +1,143 @@
+import atexit
+import logging
+import os
+import threading
+from sqlalchemy.exc import DataError, IntegrityError
+
+logger = logging.getLogger(__name__)
+
+class WriteBehindBuffer:
+    """
+    Fila em memória gravada em lote por uma thread de fundo: a cada
+    `interval` segundos ou assim que acumular `max_size` itens. Se a thread
+    não der conta e a fila chegar ao dobro disso, quem chega grava o lote na
+    própria thread, então a memória usada é limitada. `write(items)` recebe
+    a lista de itens e roda dentro do app context. Com `interval=0` cada
+    item é gravado na hora (testes).
+
+    `key` permite coalescer itens: um novo item com a mesma chave substitui
+    o anterior ainda não gravado, ou é combinado com ele por `merge(old, new)`.
+
+    Se o lote falhar, os itens são gravados um a um: um item inválido
+    (IntegrityError/DataError) é descartado sem segurar os outros; qualquer
+    outro erro (banco fora do ar) devolve o restante à fila.
+    """
+
+    def __init__(self, name, write, interval=5.0, max_size=500, key=None, merge=None):
+        self.name = name
+        self.write = write
+        self.interval = interval
+        self.max_size = max_size
+        self.key = key
+        self.merge = merge
+        self.app = None
+        self._items = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._thread_pid = None
+
+    def init_app(self, app, interval=None, max_size=None):
+        if self.app is None:
+            atexit.register(self.stop)
+        else:
+            self.flush()
+        self.app = app
+        if interval is not None:
+            self.interval = interval
+        if max_size is not None:
+            self.max_size = max_size
+
+    def _key(self, item):
+        return self.key(item) if self.key else id(item)
+
+    def add(self, item):
+        key = self._key(item)
+        with self._lock:
+            previous = self._items.get(key)
+            self._items[key] = item if previous is None or self.merge is None else self.merge(previous, item)
+            size = len(self._items)
+        if self.interval <= 0 or size >= 2 * self.max_size:
+            self.flush()
+            return
+        self._ensure_thread()
+        if size >= self.max_size:
+            self._wake.set()
+
+    def pending(self, key):
+        """Item com esta chave ainda não gravado (ou None)"""
+        with self._lock:
+            return self._items.get(key)
+
+    def flush(self):
+        """Grava tudo o que está na fila; retorna a quantidade de itens gravados"""
+        with self._write_lock:
+            with self._lock:
+                items, self._items = list(self._items.values()), {}
+            if not items:
+                return 0
+            if len(items) > 1:
+                try:
+                    with self.app.app_context():
+                        self.write(items)
+                    return len(items)
+                except Exception:
+                    logger.warning('%s: falha ao gravar lote de %d itens; gravando um a um',
+                                   self.name, len(items), exc_info=True)
+            return self._write_each(items)
+
+    def _write_each(self, items):
+        written = 0
+        for position, item in enumerate(items):
+            try:
+                with self.app.app_context():
+                    self.write([item])
+                written += 1
+            except (IntegrityError, DataError):
+                logger.exception('%s: item inválido descartado: %r', self.name, item)
+            except Exception:
+                logger.exception('%s: falha ao gravar %d itens', self.name, len(items) - position)
+                self._requeue(items[position:])
+                break
+        return written
+
+    def _requeue(self, items):
+        with self._lock:
+            # Devolve à fila sem sobrescrever itens mais novos; se o banco
+            # continuar fora, os mais antigos são descartados
+            for item in items:
+                key = self._key(item)
+                newer = self._items.get(key)
+                if newer is None:
+                    self._items[key] = item
+                elif self.merge is not None:
+                    self._items[key] = self.merge(item, newer)
+            for key in list(self._items)[:max(0, len(self._items) - 2 * self.max_size)]:
+                del self._items[key]
+
+    def _ensure_thread(self):
+        # Depois de um fork a thread do processo pai não existe no filho
+        if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name=f'write-behind-{self.name}', daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def stop(self):
+        """Para a thread e grava o que restou (chamado também na saída do processo)"""
+        self._stopped.set()
+        self._wake.set()
+        if self.app is not None:
+            self.flush()
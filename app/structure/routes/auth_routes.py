@@ -5,11 +5,17 @@ from app.structure.forms.auth_forms import (
     ResetPasswordRequestForm, ResetPasswordForm, ProfileForm
 )
 from app.structure.auth.auth_manager import authenticate_user, create_user
+from app.structure.auth.password_hasher import HasherBusyError
+from app.structure.auth.user_cache import editable_user
 from app.structure.database.models import User, db
 from urllib.parse import urlparse
 
 auth = Blueprint('auth', __name__)
 
+# Pool de hashing cheio (pico de logins): recusa rápido em vez de segurar o worker na fila
+BUSY_MESSAGE = 'Muitos acessos neste momento. Tente novamente em alguns segundos.'
+BUSY_HEADERS = {'Retry-After': '5'}
+
 @auth.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
@@ -17,7 +23,11 @@ def login():
     
     form = LoginForm()
     if form.validate_on_submit():
-        user = authenticate_user(form.username.data, form.password.data)
+        try:
+            user = authenticate_user(form.username.data, form.password.data)
+        except HasherBusyError:
+            flash(BUSY_MESSAGE, 'warning')
+            return render_template('auth/login.html', title='Login', form=form), 503, BUSY_HEADERS
         if user:
             login_user(user, remember=form.remember_me.data)
             next_page = request.args.get('next')
@@ -49,6 +59,9 @@ def register():
             return redirect(url_for('auth.login'))
         except ValueError as e:
             flash(str(e), 'danger')
+        except HasherBusyError:
+            flash(BUSY_MESSAGE, 'warning')
+            return render_template('auth/register.html', title='Registro', form=form), 503, BUSY_HEADERS
     
     return render_template('auth/register.html', title='Registro', form=form)
 
@@ -75,9 +88,10 @@ def profile():
         if existing_user and existing_user.id != current_user.id:
             flash('Este email já está em uso por outro usuário.', 'danger')
         else:
-            current_user.first_name = form.first_name.data
-            current_user.last_name = form.last_name.data
-            current_user.email = form.email.data
+            user = editable_user(current_user)
+            user.first_name = form.first_name.data
+            user.last_name = form.last_name.data
+            user.email = form.email.data
             db.session.commit()
             flash('Perfil atualizado com sucesso!', 'success')
             return redirect(url_for('auth.profile'))
@@ -90,13 +104,19 @@ def change_password():
     form = ChangePasswordForm()
     
     if form.validate_on_submit():
-        if current_user.check_password(form.current_password.data):
-            current_user.set_password(form.new_password.data)
-            db.session.commit()
-            flash('Senha alterada com sucesso!', 'success')
+        user = editable_user(current_user)
+        try:
+            if user.check_password(form.current_password.data):
+                user.set_password(form.new_password.data)
+                db.session.commit()
+                flash('Senha alterada com sucesso!', 'success')
+                return redirect(url_for('auth.profile'))
+            else:
+                flash('Senha atual incorreta.', 'danger')
+        except HasherBusyError:
+            db.session.rollback()
+            flash(BUSY_MESSAGE, 'warning')
             return redirect(url_for('auth.profile'))
-        else:
-            flash('Senha atual incorreta.', 'danger')
     
     return render_template('auth/change_password.html', title='Alterar Senha', form=form)
 
@@ -139,8 +159,14 @@ def reset_password(token):
 def delete_account():
     # Implementar confirmação de senha antes de deletar
     password = request.form.get('password')
-    if current_user.check_password(password):
-        db.session.delete(current_user)
+    user = editable_user(current_user)
+    try:
+        correct = user.check_password(password)
+    except HasherBusyError:
+        flash(BUSY_MESSAGE, 'warning')
+        return redirect(url_for('auth.profile'))
+    if correct:
+        db.session.delete(user)
         db.session.commit()
         logout_user()
         flash('Sua conta foi deletada com sucesso.', 'success')
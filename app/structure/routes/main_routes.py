@@ -1,10 +1,30 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import (
+    Blueprint, render_template, redirect, url_for, flash, request, jsonify, abort,
+    get_template_attribute, make_response
+)
 from flask_login import login_required, current_user
+from flask_wtf.csrf import generate_csrf
+from markupsafe import Markup
 from app.structure.database.models import (
-    Subject, Topic, StudyMaterial, ProgressRecord, StudySession, 
-    QuizAttempt, Question, Answer, db
+    User, Subject, Topic, StudyMaterial, Question, ProgressRecord, StudySession, QuizAttempt, db
 )
+from app.structure.database.loading import profile, count_by_topic, question_previews
 from app.structure.auth.auth_manager import admin_required
+from app.structure.functions.dashboard import get_dashboard_data
+from app.structure.functions.search import get_search_engine, highlight_terms
+from app.structure.functions.fuzzy_search import fuzzy_search
+from app.structure.functions.autocomplete import autocomplete_index
+from app.structure.functions.progress_rollup import update_rollups
+from app.structure.functions.counters import get_counters
+from app.structure.functions.fragments import (
+    fragment, fill_slots, conditional, catalog_version, page_etag, not_modified, add_validators
+)
+from app.structure.functions.material_completion import record_completion
+from app.structure.functions.study_sessions import start_session, get_session
+from app.structure.functions.quiz_grading import (
+    GradingError, parse_submission, attempt_question_ids, load_answer_key, grade_attempt
+)
+from app.structure.functions.quiz_bundle import get_quiz_bundle, quiz_questions
 from datetime import datetime, timedelta
 import json
 
@@ -16,90 +36,92 @@ def index():
     if current_user.is_authenticated:
         return redirect(url_for('main.dashboard'))
     
-    # Estatísticas gerais para mostrar na página inicial
-    total_subjects = Subject.query.filter_by(is_active=True).count()
-    total_topics = Topic.query.filter_by(is_active=True).count()
-    total_materials = StudyMaterial.query.filter_by(is_active=True).count()
+    # Estatísticas gerais para mostrar na página inicial (contadores em memória)
+    counters = get_counters()
     
     return render_template('main/index.html', 
-                         total_subjects=total_subjects,
-                         total_topics=total_topics,
-                         total_materials=total_materials)
+                         total_subjects=counters.get('subjects_active', 0),
+                         total_topics=counters.get('topics_active', 0),
+                         total_materials=counters.get('materials_active', 0))
 
 @main.route('/dashboard')
 @login_required
 def dashboard():
     """Dashboard principal do usuário"""
-    # Buscar progresso do usuário
-    user_progress = ProgressRecord.query.filter_by(user_id=current_user.id).all()
-    
-    # Estatísticas do usuário
-    total_study_time = db.session.query(db.func.sum(StudySession.duration_minutes))\
-        .filter_by(user_id=current_user.id).scalar() or 0
-    
-    total_quizzes = QuizAttempt.query.filter_by(user_id=current_user.id).count()
-    completed_materials = db.session.query(db.func.sum(ProgressRecord.materials_completed))\
-        .filter_by(user_id=current_user.id).scalar() or 0
-    
-    # Sessões de estudo recentes
-    recent_sessions = StudySession.query.filter_by(user_id=current_user.id)\
-        .order_by(StudySession.start_time.desc()).limit(5).all()
-    
-    # Progresso por área do conhecimento
-    subjects = Subject.query.filter_by(is_active=True).all()
-    subject_progress = {}
-    
-    for subject in subjects:
-        progress = ProgressRecord.query.filter_by(
-            user_id=current_user.id, 
-            subject_id=subject.id
-        ).first()
-        
-        if progress:
-            subject_progress[subject.name] = progress.progress_percentage
-        else:
-            subject_progress[subject.name] = 0.0
+    data = get_dashboard_data(current_user.id)
     
     return render_template('main/dashboard.html',
-                         user_progress=user_progress,
-                         total_study_time=total_study_time,
-                         total_quizzes=total_quizzes,
-                         completed_materials=completed_materials,
-                         recent_sessions=recent_sessions,
-                         subject_progress=subject_progress,
-                         subjects=subjects)
+                         overall_progress=data.overall_progress,
+                         total_study_time=data.total_study_time,
+                         total_quizzes=data.total_quizzes,
+                         completed_materials=data.completed_materials,
+                         recent_sessions=data.recent_sessions,
+                         subject_progress=data.progress_by_name(),
+                         subjects=data.subjects)
 
 @main.route('/subjects')
 @login_required
+@conditional
 def subjects():
     """Lista todas as disciplinas disponíveis"""
-    subjects = Subject.query.filter_by(is_active=True).all()
-    return render_template('main/subjects.html', subjects=subjects)
+    subjects_html = fragment('subjects', 'active', lambda: render_template(
+        'main/fragments/subjects.html', subjects=Subject.query.filter_by(is_active=True).all()))
+    return render_template('main/subjects.html', subjects_html=Markup(subjects_html))
+
+# As partes das páginas do catálogo que não dependem do usuário ficam em
+# fragmentos no cache (dicionários serializáveis); o progresso do usuário
+# entra nos slots depois.
+
+def _render_subject(subject_id):
+    subject = db.session.get(Subject, subject_id)
+    if subject is None:
+        return None
+    topics = Topic.query.filter_by(subject_id=subject_id, is_active=True).all()
+    topic_ids = [topic.id for topic in topics]
+    return {'subject': {'name': subject.name, 'color': subject.color},
+            'html': render_template('main/fragments/subject_detail.html', subject=subject, topics=topics,
+                                    material_counts=count_by_topic(StudyMaterial, topic_ids),
+                                    question_counts=count_by_topic(Question, topic_ids))}
+
+def _render_topic(topic_id):
+    topic = Topic.query.options(*profile('topic_detail')).filter_by(id=topic_id).first()
+    if topic is None:
+        return None
+    return {'topic': {'name': topic.name, 'subject': {'color': topic.subject.color}},
+            'html': render_template('main/fragments/topic_detail.html', topic=topic,
+                                    questions=question_previews(topic_id),
+                                    question_count=count_by_topic(Question, [topic_id]).get(topic_id, 0))}
 
 @main.route('/subject/<int:subject_id>')
 @login_required
+@conditional
 def subject_detail(subject_id):
     """Detalhes de uma disciplina específica"""
-    subject = Subject.query.get_or_404(subject_id)
-    topics = Topic.query.filter_by(subject_id=subject_id, is_active=True).all()
+    page = fragment('subject_detail', subject_id, lambda: _render_subject(subject_id))
+    if page is None:
+        abort(404)
     
     # Progresso do usuário nesta disciplina
-    user_progress = ProgressRecord.query.filter_by(
-        user_id=current_user.id, 
-        subject_id=subject_id
-    ).all()
-    
-    return render_template('main/subject_detail.html', 
-                         subject=subject, 
-                         topics=topics,
-                         user_progress=user_progress)
+    user_progress = dict(db.session.query(ProgressRecord.topic_id, ProgressRecord.progress_percentage)
+                         .filter_by(user_id=current_user.id, subject_id=subject_id))
+    average = round(sum(user_progress.values()) / len(user_progress), 1) if user_progress else 0
+    topic_progress = get_template_attribute('main/fragments/progress.html', 'topic_progress')
+    color = page['subject']['color']
+    
+    content = fill_slots(page['html'],
+                         subject_progress=lambda _: average,
+                         topic_progress=lambda topic_id: topic_progress(
+                             topic_id, user_progress.get(topic_id, 0), color))
+    return render_template('main/subject_detail.html', subject=page['subject'], content=content)
 
 @main.route('/topic/<int:topic_id>')
 @login_required
+@conditional
 def topic_detail(topic_id):
     """Detalhes de um tópico específico"""
-    topic = Topic.query.get_or_404(topic_id)
-    materials = StudyMaterial.query.filter_by(topic_id=topic_id, is_active=True).all()
+    page = fragment('topic_detail', topic_id, lambda: _render_topic(topic_id))
+    if page is None:
+        abort(404)
     
     # Progresso do usuário neste tópico
     progress = ProgressRecord.query.filter_by(
@@ -107,76 +129,75 @@ def topic_detail(topic_id):
         topic_id=topic_id
     ).first()
     
-    return render_template('main/topic_detail.html', 
-                         topic=topic, 
-                         materials=materials,
-                         progress=progress)
+    content = fill_slots(page['html'],
+                         topic_progress=lambda _: progress.progress_percentage if progress else 0,
+                         completed_materials=lambda _: progress.materials_completed if progress else 0)
+    return render_template('main/topic_detail.html', topic=page['topic'], content=content)
 
 @main.route('/material/<int:material_id>')
 @login_required
 def study_material(material_id):
     """Visualizar material de estudo"""
-    material = StudyMaterial.query.get_or_404(material_id)
-    
-    # Iniciar sessão de estudo
-    session = StudySession(
-        user_id=current_user.id,
-        subject_id=material.subject_id,
-        topic_id=material.topic_id,
-        material_id=material.id,
-        start_time=datetime.utcnow()
-    )
-    db.session.add(session)
-    db.session.commit()
-    
-    return render_template('main/study_material.html', 
-                         material=material, 
-                         session_id=session.id)
+    # Primeiro só a revisão: se o navegador já tem esta versão, 304 sem ler o conteúdo
+    revision = db.session.query(StudyMaterial.updated_at, StudyMaterial.created_at)\
+        .filter_by(id=material_id).first_or_404()
+    last_modified = revision.updated_at or revision.created_at
+    # Validador do banco (revisão do material e versão do catálogo, que cobre os
+    # nomes do tópico e da disciplina no cabeçalho): vale com qualquer cache. Só a
+    # ETag valida: o Last-Modified não muda quando o tópico é renomeado
+    etag = page_etag(last_modified, catalog_version())
+    response = not_modified(etag)
+    if response is not None:
+        return response
+    
+    material = StudyMaterial.query.options(*profile('study_material'))\
+        .filter_by(id=material_id).first_or_404()
+    
+    # A sessão de estudo é iniciada pela página (start_material_session), então
+    # o HTML é o mesmo a cada visita e pode ficar no cache do navegador
+    response = make_response(render_template('main/study_material.html', material=material))
+    return add_validators(response, etag, last_modified)
+
+@main.route('/material/<int:material_id>/session', methods=['POST'])
+@login_required
+def start_material_session(material_id):
+    """Inicia a sessão de estudo do material (chamada pela página ao abrir)"""
+    material = db.session.query(StudyMaterial.id, StudyMaterial.subject_id, StudyMaterial.topic_id)\
+        .filter_by(id=material_id).first_or_404()
+    
+    # Sessão gravada em lote, fora da requisição; o token CSRF vai junto
+    # porque a página em cache não pode trazer um
+    return jsonify({'session_id': start_session(current_user.id, material),
+                    'csrf_token': generate_csrf()})
 
 @main.route('/material/<int:material_id>/complete', methods=['POST'])
 @login_required
 def complete_material(material_id):
     """Marcar material como concluído"""
     material = StudyMaterial.query.get_or_404(material_id)
-    session_id = request.form.get('session_id')
+    data = request.get_json(silent=True) or request.form
     
     # Finalizar sessão de estudo
-    if session_id:
-        study_session = StudySession.query.get(session_id)
-        if study_session and study_session.user_id == current_user.id:
-            study_session.end_time = datetime.utcnow()
-            study_session.duration_minutes = int((study_session.end_time - study_session.start_time).total_seconds() / 60)
-            study_session.completed = True
-            study_session.notes = request.form.get('notes', '')
-    
-    # Atualizar progresso
-    progress = ProgressRecord.query.filter_by(
-        user_id=current_user.id,
-        subject_id=material.subject_id,
-        topic_id=material.topic_id
-    ).first()
-    
-    if not progress:
-        progress = ProgressRecord(
-            user_id=current_user.id,
-            subject_id=material.subject_id,
-            topic_id=material.topic_id,
-            materials_completed=1,
-            total_materials=StudyMaterial.query.filter_by(topic_id=material.topic_id, is_active=True).count(),
-            last_studied=datetime.utcnow()
-        )
-        db.session.add(progress)
-    else:
-        progress.materials_completed += 1
-        progress.last_studied = datetime.utcnow()
-    
-    # Calcular porcentagem de progresso
-    total_materials = StudyMaterial.query.filter_by(topic_id=material.topic_id, is_active=True).count()
-    progress.progress_percentage = (progress.materials_completed / total_materials) * 100
-    progress.total_materials = total_materials
+    study_minutes = 0
+    study_session = get_session(str(data.get('session_id') or ''))
+    if study_session and study_session.user_id == current_user.id and not study_session.completed:
+        end_time = datetime.utcnow()
+        duration = int((end_time - study_session.start_time).total_seconds() / 60)
+        # UPDATE condicional: com duas abas só uma encerra a sessão
+        closed = StudySession.query\
+            .filter_by(id=study_session.id, completed=False)\
+            .update({'end_time': end_time, 'duration_minutes': duration, 'completed': True,
+                     'notes': data.get('notes', '')}, synchronize_session=False)
+        study_minutes = duration if closed else 0
+    
+    # Progresso e agregados: upsert atômico, só a primeira conclusão conta
+    record_completion(current_user.id, material, study_minutes)
     
     db.session.commit()
     
+    if request.is_json:
+        return jsonify({'success': True,
+                        'redirect_url': url_for('main.topic_detail', topic_id=material.topic_id)})
     flash('Material concluído com sucesso!', 'success')
     return redirect(url_for('main.topic_detail', topic_id=material.topic_id))
 
@@ -184,8 +205,13 @@ def complete_material(material_id):
 @login_required
 def start_quiz(topic_id):
     """Iniciar um quiz sobre um tópico"""
-    topic = Topic.query.get_or_404(topic_id)
-    questions = Question.query.filter_by(topic_id=topic_id, is_active=True).limit(10).all()
+    # O sorteio usa os ids do pacote em cache (a versão anterior serve enquanto
+    # a nova é compilada em segundo plano); só as sorteadas são lidas do banco
+    bundle = get_quiz_bundle(topic_id, stale_ok=True)
+    if bundle is None:
+        abort(404)
+    topic = bundle['topic']
+    questions = quiz_questions(bundle, current_user.id)
     
     if not questions:
         flash('Não há questões disponíveis para este tópico.', 'warning')
@@ -194,10 +220,10 @@ def start_quiz(topic_id):
     # Criar tentativa de quiz
     quiz_attempt = QuizAttempt(
         user_id=current_user.id,
-        subject_id=topic.subject_id,
+        subject_id=topic['subject_id'],
         topic_id=topic_id,
         total_questions=len(questions),
-        start_time=datetime.utcnow()
+        question_ids=json.dumps([question['id'] for question in questions])
     )
     db.session.add(quiz_attempt)
     db.session.commit()
@@ -205,7 +231,7 @@ def start_quiz(topic_id):
     return render_template('main/quiz.html', 
                          topic=topic, 
                          questions=questions,
-                         quiz_attempt_id=quiz_attempt.id)
+                         quiz_attempt=quiz_attempt)
 
 @main.route('/quiz/<int:quiz_attempt_id>/submit', methods=['POST'])
 @login_required
@@ -214,101 +240,126 @@ def submit_quiz(quiz_attempt_id):
     quiz_attempt = QuizAttempt.query.get_or_404(quiz_attempt_id)
     
     if quiz_attempt.user_id != current_user.id:
-        flash('Acesso negado.', 'danger')
-        return redirect(url_for('main.dashboard'))
-    
-    answers_data = request.get_json()
-    correct_answers = 0
-    
-    for question_id, answer_id in answers_data.items():
-        answer = Answer.query.get(answer_id)
-        if answer and answer.is_correct:
-            correct_answers += 1
+        return jsonify({'success': False, 'message': 'Acesso negado.'}), 403
+    
+    if quiz_attempt.completed:
+        return jsonify({'success': False, 'message': 'Este quiz já foi enviado.'}), 400
+    
+    # Correção em lote: um SELECT para o gabarito das questões sorteadas e um
+    # INSERT para as respostas (sem depender do pacote do tópico)
+    try:
+        submitted = parse_submission(request.get_json(silent=True))
+        question_ids = attempt_question_ids(quiz_attempt)
+        answer_key, explanations = load_answer_key(question_ids)
+        correct_answers = grade_attempt(quiz_attempt, submitted, answer_key, question_ids)
+    except GradingError as error:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(error)}), 400
     
     # Calcular pontuação
     score = (correct_answers / quiz_attempt.total_questions) * 100
     
-    # Atualizar tentativa de quiz
-    quiz_attempt.score = score
-    quiz_attempt.correct_answers = correct_answers
-    quiz_attempt.completed = True
-    quiz_attempt.end_time = datetime.utcnow()
-    quiz_attempt.time_taken = int((quiz_attempt.end_time - quiz_attempt.start_time).total_seconds())
+    # UPDATE condicional: com dois envios simultâneos só um fecha a tentativa;
+    # o outro desfaz as respostas que gravou
+    closed = QuizAttempt.query\
+        .filter_by(id=quiz_attempt.id, completed=False)\
+        .update({'score': score, 'correct_answers': correct_answers, 'completed': True,
+                 'time_taken': int((datetime.utcnow() - quiz_attempt.created_at).total_seconds())},
+                synchronize_session=False)
+    if not closed:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Este quiz já foi enviado.'}), 400
+    
+    update_rollups(current_user.id, quiz_attempt.subject_id,
+                   quizzes_completed=1, quiz_score_sum=score)
     
     db.session.commit()
     
+    flash(f'Quiz concluído: {correct_answers} de {quiz_attempt.total_questions} acertos ({score:.0f}%).', 'success')
     return jsonify({
+        'success': True,
         'score': score,
         'correct_answers': correct_answers,
-        'total_questions': quiz_attempt.total_questions
+        'total_questions': quiz_attempt.total_questions,
+        # Explicações só depois da correção: elas revelam a resposta certa
+        'explanations': {question_id: explanations.get(str(question_id))
+                         for question_id in question_ids},
+        'redirect_url': url_for('main.topic_detail', topic_id=quiz_attempt.topic_id)
     })
 
 @main.route('/progress')
 @login_required
 def progress():
     """Página de progresso detalhado"""
+    data = get_dashboard_data(current_user.id, include_activity=True)
+    
     # Progresso por disciplina
-    subjects = Subject.query.filter_by(is_active=True).all()
-    progress_data = {}
-    
-    for subject in subjects:
-        progress = ProgressRecord.query.filter_by(
-            user_id=current_user.id, 
-            subject_id=subject.id
-        ).all()
-        
-        if progress:
-            total_progress = sum(p.progress_percentage for p in progress) / len(progress)
-            progress_data[subject.name] = {
-                'progress': total_progress,
-                'topics': progress
-            }
-        else:
-            progress_data[subject.name] = {
-                'progress': 0.0,
-                'topics': []
-            }
-    
-    # Estatísticas gerais
-    total_study_time = db.session.query(db.func.sum(StudySession.duration_minutes))\
-        .filter_by(user_id=current_user.id).scalar() or 0
-    
-    total_quizzes = QuizAttempt.query.filter_by(user_id=current_user.id).count()
-    average_quiz_score = db.session.query(db.func.avg(QuizAttempt.score))\
-        .filter_by(user_id=current_user.id, completed=True).scalar() or 0
+    subject_progress = {
+        p.name: {
+            'percentage': p.percentage,
+            'topics_completed': p.topics_completed,
+            'materials_completed': p.materials_completed,
+            'total_materials': p.total_materials
+        }
+        for p in data.subject_progress
+    }
     
     return render_template('main/progress.html',
-                         progress_data=progress_data,
-                         total_study_time=total_study_time,
-                         total_quizzes=total_quizzes,
-                         average_quiz_score=average_quiz_score)
+                         subject_progress=subject_progress,
+                         overall_progress=data.overall_progress,
+                         total_study_time=data.total_study_time,
+                         total_quizzes=data.total_quizzes,
+                         completed_materials=data.completed_materials,
+                         average_score=data.average_quiz_score,
+                         recent_sessions=data.recent_sessions,
+                         achievements=[],
+                         subject_names=[p.name for p in data.subject_progress],
+                         subject_scores=[p.percentage for p in data.subject_progress],
+                         activity_dates=[day for day, _ in data.activity],
+                         activity_minutes=[minutes for _, minutes in data.activity])
 
 @main.route('/search')
 @login_required
 def search():
     """Busca por materiais e tópicos"""
-    query = request.args.get('q', '')
+    query = request.args.get('q', '').strip()
     if not query:
         return render_template('main/search.html', results=[])
     
-    # Buscar em materiais
-    materials = StudyMaterial.query.filter(
-        StudyMaterial.title.contains(query) | 
-        StudyMaterial.content.contains(query)
-    ).filter_by(is_active=True).limit(10).all()
-    
-    # Buscar em tópicos
-    topics = Topic.query.filter(
-        Topic.name.contains(query) | 
-        Topic.description.contains(query)
-    ).filter_by(is_active=True).limit(10).all()
-    
-    results = {
-        'materials': materials,
-        'topics': topics
+    page = request.args.get('page', 1, type=int)
+    results = get_search_engine().search(query, page=page)
+    
+    # Sem resultados exatos: sugestões aproximadas (sem acento / com erro de digitação)
+    fuzzy = False
+    if not results.total and page == 1:
+        results = fuzzy_search(query)
+        fuzzy = bool(results.total)
+    
+    return render_template('main/search.html', results=results, query=query, fuzzy=fuzzy)
+
+@main.route('/search/autocomplete')
+@login_required
+def autocomplete():
+    """Sugestões por prefixo para o campo de busca (JSON, sem acessar o banco)"""
+    prefix = request.args.get('q', '')
+    limit = request.args.get('limit', 8, type=int)
+    suggestions = autocomplete_index.complete(prefix, limit)
+    
+    endpoints = {
+        'subject': ('main.subject_detail', 'subject_id'),
+        'topic': ('main.topic_detail', 'topic_id'),
+        'material': ('main.study_material', 'material_id')
     }
+    for suggestion in suggestions:
+        endpoint, argument = endpoints[suggestion['type']]
+        suggestion['url'] = url_for(endpoint, **{argument: suggestion['id']})
     
-    return render_template('main/search.html', results=results, query=query)
+    return jsonify({'query': prefix, 'suggestions': suggestions})
+
+@main.app_template_filter('highlight_search')
+def highlight_search(text, query):
+    """Filtro de template que destaca os termos buscados"""
+    return highlight_terms(text, query)
 
 # Rotas administrativas
 @main.route('/admin')
@@ -316,13 +367,30 @@ def search():
 @admin_required
 def admin_dashboard():
     """Dashboard administrativo"""
-    total_users = User.query.count()
-    total_subjects = Subject.query.count()
-    total_materials = StudyMaterial.query.count()
-    total_questions = Question.query.count()
-    
-    return render_template('admin/dashboard.html',
+    counters = get_counters()
+    total_users = counters.get('users', 0)
+    active_users = counters.get('users_active', 0)
+    
+    # Usuários por dia do último login e sessões de estudo por dia de início,
+    # nos últimos 7 dias (faixas dos índices ix_users_last_login e ix_study_sessions_start)
+    days = [(datetime.utcnow() - timedelta(days=offset)).date() for offset in range(6, -1, -1)]
+    since = datetime.combine(days[0], datetime.min.time())
+    per_day = {}
+    for column in (User.last_login, StudySession.start_time):
+        day = db.func.date(column)
+        rows = db.session.query(day, db.func.count()).filter(column >= since).group_by(day)
+        per_day[column] = {str(date): count for date, count in rows}
+    
+    return render_template('main/admin_dashboard.html',
                          total_users=total_users,
-                         total_subjects=total_subjects,
-                         total_materials=total_materials,
-                         total_questions=total_questions)
+                         total_subjects=counters.get('subjects', 0),
+                         total_materials=counters.get('materials', 0),
+                         total_questions=counters.get('questions', 0),
+                         active_users=active_users,
+                         inactive_users=total_users - active_users,
+                         admin_users=User.query.filter_by(is_admin=True).count(),
+                         recent_users=User.query.order_by(User.id.desc()).limit(10).all(),
+                         system_logs=[],
+                         activity_dates=[day.strftime('%d/%m') for day in days],
+                         login_counts=[per_day[User.last_login].get(str(day), 0) for day in days],
+                         study_sessions=[per_day[StudySession.start_time].get(str(day), 0) for day in days])
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark do cache: recomputações durante um "stampede" (muitas requisições
+para a mesma chave expirada) e custo da invalidação por tag x por padrão.
+
+Uso:
+    python benchmarks/bench_cache_stampede.py --threads 50 --keys 100000
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.structure.functions.cache import Cache, LocalCache
+
+def stampede(cache, threads, compute_seconds, single_flight):
+    """Dispara `threads` leituras simultâneas de uma chave vazia e conta as recomputações"""
+    calls = []
+    barrier = threading.Barrier(threads)
+
+    def factory():
+        calls.append(1)
+        time.sleep(compute_seconds)
+        return {'value': 42}
+
+    def naive():
+        value = cache.get('hot')
+        if value is None:
+            value = factory()
+            cache.set('hot', value, 60)
+        return value
+
+    def worker():
+        barrier.wait()
+        if single_flight:
+            cache.get_or_set('hot', factory, 60)
+        else:
+            naive()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return len(calls), (time.perf_counter() - start) * 1000
+
+def invalidation(keys):
+    """Invalida um grupo de chaves por padrão (varre tudo) e por tag (um incremento)"""
+    cache = Cache(LocalCache(max_entries=None))
+    for i in range(keys):
+        cache.set(f'user_progress:{i % 1000}:{i}', i, 600)
+        cache.set(cache.tagged_key(f'bundle:{i}', ('catalog',)), i, 600)
+
+    start = time.perf_counter()
+    cache.delete_pattern('user_progress:7:*')
+    pattern_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    cache.invalidate_tag('catalog')
+    tag_ms = (time.perf_counter() - start) * 1000
+    assert cache.get(cache.tagged_key('bundle:1', ('catalog',))) is None
+    return pattern_ms, tag_ms
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=50)
+    parser.add_argument('--compute-ms', type=float, default=50)
+    parser.add_argument('--keys', type=int, default=100000)
+    args = parser.parse_args()
+
+    for name, single_flight in (('get/set ingênuo', False), ('get_or_set', True)):
+        calls, elapsed = stampede(Cache(LocalCache()), args.threads, args.compute_ms / 1000, single_flight)
+        print(f'{name:16} recomputações={calls:4d}  tempo={elapsed:8.1f}ms')
+
+    pattern_ms, tag_ms = invalidation(args.keys)
+    print(f'Invalidação com {args.keys} chaves: padrão={pattern_ms:.2f}ms  tag={tag_ms:.3f}ms')
+
+if __name__ == '__main__':
+    main()
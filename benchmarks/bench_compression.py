@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark da compressão das respostas: captura as páginas reais (dashboard,
+progresso, busca, catálogo, quiz) e o JSON do submit_quiz sem compressão e
+mede, para cada nível de gzip (e de brotli, se instalado), o tamanho
+transferido, a CPU gasta por resposta e o tempo de download estimado numa
+conexão móvel lenta.
+
+Uso:
+    python benchmarks/bench_compression.py --scale small --repeat 50
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import config, TestingConfig
+from main import create_app
+from app.structure.database import db
+from app.structure.database.dataset import SCALES, DEFAULT_PASSWORD, generate_dataset
+from app.structure.database.models import Question
+from app.structure.functions.compression import brotli, _Gzip, _Brotli
+
+# Enlace de referência: 3G lento (~1,6 Mbit/s)
+LINK_BYTES_PER_SECOND = 200_000
+
+def capture_pages(scale, seed):
+    """Corpo (sem compressão) de cada página medida, com o usuário aluno2 logado"""
+    with tempfile.TemporaryDirectory() as directory:
+        class BenchConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.join(directory, "compression.db")}'
+            SQL_N_PLUS_ONE_LIMIT = None
+            COMPRESSION_LEVEL = 0
+        config['bench_compression'] = BenchConfig
+        app = create_app('bench_compression')
+        with app.app_context():
+            generate_dataset(SCALES[scale], seed=seed)
+            topic_id = db.session.query(Question.topic_id).filter(Question.is_active == True).first()[0]
+            db.session.remove()
+
+        client = app.test_client()
+        client.post('/auth/login', data={'username': 'aluno2', 'password': DEFAULT_PASSWORD})
+        client.get('/dashboard')  # consome a mensagem de login
+        pages = {}
+        for label, path in (('/dashboard', '/dashboard'), ('/progress', '/progress'),
+                            ('/search', '/search?q=Material'), ('/subjects', '/subjects'),
+                            ('/topic/<id>', f'/topic/{topic_id}'), ('/quiz/<id>', f'/quiz/{topic_id}')):
+            response = client.get(path)
+            assert response.status_code == 200, (path, response.status_code)
+            pages[label] = response.get_data()
+
+        html = pages['/quiz/<id>'].decode()
+        attempt = re.search(r'/quiz/(\d+)/submit', html).group(1)
+        answers = dict(zip(re.findall(r'data-question-id="(\d+)"', html),
+                           re.findall(r'data-answer-id="(\d+)"', html)[::5]))
+        pages['submit_quiz (JSON)'] = client.post(f'/quiz/{attempt}/submit', json={'answers': answers}).get_data()
+        with app.app_context():
+            db.engine.dispose()
+        return pages
+
+def settings():
+    """(rótulo, fábrica do compressor) de cada configuração medida"""
+    result = [(f'gzip {level}', lambda level=level: _Gzip(level)) for level in (1, 6, 9)]
+    if brotli is not None:
+        result += [(f'br {quality}', lambda quality=quality: _Brotli(quality)) for quality in (1, 4, 11)]
+    return result
+
+def measure(body, factory, repeat):
+    """(bytes comprimidos, ms de CPU por resposta)"""
+    start = time.process_time()
+    for _ in range(repeat):
+        compressor = factory()
+        size = len(compressor.process(body, False) + compressor.finish())
+    return size, (time.process_time() - start) * 1000 / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=list(SCALES), default='tiny')
+    parser.add_argument('--repeat', type=int, default=50, help='Compressões de cada resposta por configuração.')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    pages = capture_pages(args.scale, args.seed)
+    columns = settings()
+    print(f'Base {args.scale}; download estimado a {LINK_BYTES_PER_SECOND * 8 / 1e6:.1f} Mbit/s'
+          + ('' if brotli is not None else ' (brotli não instalado)'))
+    print(f'{"resposta":20}{"original":>16}' + ''.join(f'{label:>24}' for label, _ in columns))
+    totals = {label: [0, 0.0] for label, _ in columns}
+    raw_total = 0
+    for page, body in pages.items():
+        raw_total += len(body)
+        cells = []
+        for label, factory in columns:
+            size, cpu_ms = measure(body, factory, args.repeat)
+            totals[label][0] += size
+            totals[label][1] += cpu_ms
+            cells.append(f'{size:6d}B {len(body) / size:4.1f}x {cpu_ms:5.2f}ms')
+        print(f'{page:20}{len(body):>15}B' + ''.join(f'{cell:>24}' for cell in cells))
+
+    raw_ms = raw_total * 1000 / LINK_BYTES_PER_SECOND
+    print(f'\nTotal das {len(pages)} respostas: {raw_total}B, {raw_ms:.0f}ms de download sem compressão')
+    for label, (size, cpu_ms) in totals.items():
+        download_ms = size * 1000 / LINK_BYTES_PER_SECOND
+        print(f'  {label:8} {size:8d}B ({raw_total / size:4.1f}x)  CPU {cpu_ms:6.2f}ms  '
+              f'download {download_ms:5.0f}ms  economia {raw_ms - download_ms - cpu_ms:5.0f}ms')
+
+if __name__ == '__main__':
+    main()
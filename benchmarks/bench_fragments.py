@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark das páginas do catálogo (/subjects, /subject/<id>, /topic/<id>):
+requisições por segundo renderizando tudo (cache null, como antes dos
+fragmentos), com os fragmentos em cache e com GET condicional (304).
+
+Uso:
+    python benchmarks/bench_fragments.py --scale small --requests 300
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import config, TestingConfig
+from main import create_app
+from app.structure.database import db
+from app.structure.database.dataset import SCALES, DEFAULT_PASSWORD, generate_dataset
+from app.structure.database.models import Topic
+
+MODES = (
+    ('sem cache', 'null', False),
+    ('fragmentos', 'local', False),
+    ('304', 'local', True),
+)
+
+def measure(client, paths, requests, conditional):
+    etags = {}
+    if conditional:
+        for path in paths:
+            etags[path] = client.get(path).headers['ETag']
+    queries = 0
+    start = time.perf_counter()
+    for i in range(requests):
+        path = paths[i % len(paths)]
+        headers = {'If-None-Match': etags[path]} if conditional else {}
+        response = client.get(path, headers=headers)
+        assert response.status_code == (304 if conditional else 200), (path, response.status_code)
+        match = re.search(r'desc="(\d+) queries"', response.headers.get('Server-Timing', ''))
+        queries += int(match.group(1)) if match else 0
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, queries / requests
+
+def run(scale, requests, seed):
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'fragments.db')
+        results = {}
+        for label, backend, conditional in MODES:
+            class BenchConfig(TestingConfig):
+                SQLALCHEMY_DATABASE_URI = f'sqlite:///{database}'
+                CACHE_BACKEND = backend
+                SQL_N_PLUS_ONE_LIMIT = None
+            config['bench_fragments'] = BenchConfig
+            app = create_app('bench_fragments')
+            with app.app_context():
+                if not results:
+                    start = time.perf_counter()
+                    generate_dataset(SCALES[scale], seed=seed)
+                    print(f'Base {scale} gerada em {time.perf_counter() - start:.1f}s')
+                topics = db.session.query(Topic.id, Topic.subject_id)\
+                    .filter(Topic.is_active == True).order_by(Topic.id).limit(20).all()
+                db.session.remove()
+
+            client = app.test_client()
+            client.post('/auth/login', data={'username': 'aluno2', 'password': DEFAULT_PASSWORD})
+            client.get('/dashboard')  # consome a mensagem de login
+
+            pages = {
+                '/subjects': ['/subjects'],
+                '/subject/<id>': sorted({f'/subject/{subject_id}' for _, subject_id in topics}),
+                '/topic/<id>': [f'/topic/{topic_id}' for topic_id, _ in topics],
+            }
+            for page, paths in pages.items():
+                for path in paths:
+                    client.get(path)  # aquecimento: preenche os fragmentos
+                results[(page, label)] = measure(client, paths, requests, conditional)
+            with app.app_context():
+                db.engine.dispose()
+        return pages, results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=list(SCALES), default='tiny')
+    parser.add_argument('--requests', type=int, default=300, help='Requisições por página e modo.')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    pages, results = run(args.scale, args.requests, args.seed)
+    print(f'{"página":16}' + ''.join(f'{label:>22}' for label, _, _ in MODES))
+    for page in pages:
+        cells = [f'{rate:8.0f} req/s {count:4.1f} q' for rate, count in
+                 (results[(page, label)] for label, _, _ in MODES)]
+        print(f'{page:16}' + ''.join(f'{cell:>22}' for cell in cells))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark de login: vazão de logins simultâneos (abertura da prova) e a
+latência de uma rota leve atendida ao mesmo tempo, com o bcrypt na thread
+da requisição (--workers 0) e no pool de processos. Também confere que
+hashes gravados com outro custo são regravados no primeiro login.
+
+Uso:
+    python benchmarks/bench_login.py --clients 16 --logins 4 --rounds 12
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bcrypt
+from config import config, TestingConfig
+from main import create_app
+from app.structure.database import db
+from app.structure.database.models import User
+from app.structure.auth.password_hasher import hash_rounds, password_hasher
+
+PASSWORD = 'login123'
+
+def seed(users, rounds):
+    """Usuários com o mesmo hash (gerar um por usuário só atrasaria o benchmark)"""
+    password_hash = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+    db.session.add_all([User(username=f'login{i}', email=f'login{i}@example.com', password_hash=password_hash,
+                             first_name='Login', last_name=str(i)) for i in range(users)])
+    db.session.commit()
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else 0.0
+
+def run(app, clients, logins):
+    """`clients` threads fazem login em paralelo enquanto outra mede GET /auth/login"""
+    login_ms, probe_ms, statuses = [], [], []
+    done = threading.Event()
+    barrier = threading.Barrier(clients + 1)
+
+    def login_worker(n):
+        client = app.test_client()
+        barrier.wait()
+        for i in range(logins):
+            start = time.perf_counter()
+            response = client.post('/auth/login', data={'username': f'login{n * logins + i}', 'password': PASSWORD})
+            login_ms.append((time.perf_counter() - start) * 1000)
+            statuses.append(response.status_code)
+            client.get('/auth/logout')
+
+    def probe():
+        client = app.test_client()
+        barrier.wait()
+        while not done.is_set():
+            start = time.perf_counter()
+            client.get('/auth/login')
+            probe_ms.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.01)
+
+    workers = [threading.Thread(target=login_worker, args=(n,)) for n in range(clients)]
+    prober = threading.Thread(target=probe)
+    prober.start()
+    for thread in workers:
+        thread.start()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    prober.join()
+    return elapsed, login_ms, probe_ms, statuses
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--logins', type=int, default=4)
+    parser.add_argument('--rounds', type=int, default=12)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    users = args.clients * args.logins
+
+    print(f'{args.clients} clientes x {args.logins} logins, bcrypt custo {args.rounds}, {os.cpu_count()} núcleos')
+    print(f'{"modo":12} {"logins/s":>9} {"login p50":>10} {"login p95":>10} {"rota leve p50":>14} {"p95":>8}')
+    for name, workers in (('na thread', 0), (f'pool de {args.workers}', args.workers)):
+        with tempfile.TemporaryDirectory() as directory:
+            class BenchConfig(TestingConfig):
+                SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.join(directory, "login.db")}'
+                BCRYPT_ROUNDS = args.rounds
+                BCRYPT_WORKERS = workers
+                BCRYPT_MAX_PENDING = None
+                BCRYPT_TIMEOUT = None
+                SQL_N_PLUS_ONE_LIMIT = None
+            config['bench_login'] = BenchConfig
+            app = create_app('bench_login')
+            with app.app_context():
+                # Hashes com custo menor: o primeiro login de cada usuário regrava
+                seed(users, max(4, args.rounds - 2))
+
+            elapsed, login_ms, probe_ms, statuses = run(app, args.clients, args.logins)
+            print(f'{name:12} {len(login_ms) / elapsed:9.1f} {statistics.median(login_ms):8.0f}ms '
+                  f'{percentile(login_ms, 0.95):8.0f}ms {statistics.median(probe_ms):12.1f}ms '
+                  f'{percentile(probe_ms, 0.95):6.1f}ms')
+
+            with app.app_context():
+                rehashed = sum(hash_rounds(user.password_hash) == args.rounds for user in User.query)
+                failed = sum(status != 302 for status in statuses)
+                if failed or rehashed != users:
+                    print(f'   ❌ {failed} logins falharam, {rehashed}/{users} hashes regravados')
+                db.session.remove()
+                db.engine.dispose()
+            password_hasher.shutdown()
+
+if __name__ == '__main__':
+    main()
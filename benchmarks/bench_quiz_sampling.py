@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark do sorteio de questões: ORDER BY RANDOM() x sorteio estratificado
+sobre os ids do pacote do tópico em memória, seguido da leitura das
+questões sorteadas pela chave primária. Usa as configurações padrão do
+cache (local, limitado a CACHE_LOCAL_MAX_BYTES) e mede também a compilação
+do pacote, que acontece em segundo plano: na primeira requisição do
+processo e após cada alteração de questão do tópico.
+
+Uso:
+    python benchmarks/bench_quiz_sampling.py --questions 200000 --repeat 200
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import config, Config, TestingConfig
+from main import create_app
+from app.structure.database import db
+from app.structure.database.models import Subject, Topic, Question, Answer
+from app.structure.functions.cache import cache
+from app.structure.functions.quiz_bundle import get_quiz_bundle, sample_questions, load_questions, bundle_key
+
+def build_questions(total, seed):
+    """Popula um único tópico com `total` questões de 4 alternativas (pior caso)"""
+    rng = random.Random(seed)
+    subject = Subject(name='Benchmark', area='Benchmark')
+    db.session.add(subject)
+    db.session.flush()
+    topic = Topic(name='Tópico do benchmark', subject_id=subject.id)
+    db.session.add(topic)
+    db.session.flush()
+
+    for start in range(0, total, 5000):
+        size = min(5000, total - start)
+        db.session.execute(db.insert(Question), [{
+            'question_text': f'Questão {start + i}',
+            'question_type': 'multiple_choice',
+            'difficulty_level': rng.choices((1, 2, 3), weights=(5, 3, 2))[0],
+            'topic_id': topic.id,
+            'subject_id': subject.id,
+            'is_active': True,
+        } for i in range(size)])
+    question_ids = [row[0] for row in db.session.query(Question.id).filter_by(topic_id=topic.id)]
+    for start in range(0, len(question_ids), 5000):
+        db.session.execute(db.insert(Answer), [
+            {'answer_text': f'Alternativa {j}', 'is_correct': j == 0, 'question_id': question_id}
+            for question_id in question_ids[start:start + 5000] for j in range(4)
+        ])
+    db.session.commit()
+    return topic.id
+
+def wait_for_refresh():
+    while any(thread.name == 'quiz-bundle-refresh' for thread in threading.enumerate()):
+        time.sleep(0.05)
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--count', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        class BenchmarkConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.join(directory, "bench.db")}'
+            CACHE_BACKEND = Config.CACHE_BACKEND
+            QUIZ_WARM_MIN_QUESTIONS = Config.QUIZ_WARM_MIN_QUESTIONS
+        config['benchmark'] = BenchmarkConfig
+        app = create_app('benchmark')
+
+        with app.app_context():
+            print(f'📚 Gerando {args.questions} questões...')
+            topic_id = build_questions(args.questions, args.seed)
+
+            # Primeira requisição do processo: dispara a compilação em segundo plano
+            start = time.perf_counter()
+            with app.test_request_context('/'):
+                app.preprocess_request()
+                app.process_response(app.response_class())
+            print(f'🚀 Primeira requisição liberada em {(time.perf_counter() - start) * 1000:.1f}ms')
+            wait_for_refresh()
+            print(f'📦 Pacote compilado em segundo plano em {(time.perf_counter() - start) * 1000:.0f}ms')
+            stored = cache.backend.get(bundle_key(topic_id))
+            print(f'   no cache local: {"sim" if stored is not None else "não (maior que CACHE_LOCAL_MAX_BYTES)"}; '
+                  'fica na memória do processo')
+            strata = get_quiz_bundle(topic_id)['strata']
+            print(f'   na memória do processo: {sum(ids.itemsize * len(ids) for ids in strata.values()) / 1024:.0f}KB '
+                  f'de ids em {len(strata)} estratos')
+
+            start = time.perf_counter()
+            bundle = get_quiz_bundle(topic_id)
+            print(f'📦 Pacote já compilado em {(time.perf_counter() - start) * 1000:.3f}ms')
+
+            # Alteração de uma questão: o sorteio usa o pacote anterior até o novo ficar pronto
+            question = db.session.get(Question, next(iter(bundle['strata'].values()))[0])
+            question.question_text += ' (editada)'
+            db.session.commit()
+            start = time.perf_counter()
+            get_quiz_bundle(topic_id, stale_ok=True)
+            print(f'✏️  Sorteio logo após uma alteração em {(time.perf_counter() - start) * 1000:.3f}ms')
+            wait_for_refresh()
+            print(f'📦 Pacote recompilado em segundo plano em {(time.perf_counter() - start) * 1000:.0f}ms')
+            bundle = get_quiz_bundle(topic_id)
+
+            def order_by_random():
+                db.session.query(Question).filter_by(topic_id=topic_id, is_active=True)\
+                    .order_by(db.func.random()).limit(args.count).all()
+
+            recent = [question_id for ids in bundle['strata'].values() for question_id in ids[:10]]
+            def stratified():
+                load_questions(sample_questions(get_quiz_bundle(topic_id), args.count, exclude=recent))
+
+            for name, function in (('ORDER BY RANDOM()', order_by_random), ('Estratificado', stratified)):
+                p50, p95 = timed(function, args.repeat)
+                print(f'{name:18} p50={p50:8.3f}ms  p95={p95:8.3f}ms')
+
+            difficulty = {question_id: stratum for stratum, ids in bundle['strata'].items() for question_id in ids}
+            drawn = Counter()
+            for _ in range(1000):
+                drawn.update(difficulty[question_id] for question_id in sample_questions(bundle, args.count))
+            total = len(difficulty)
+            for level, ids in sorted(bundle['strata'].items()):
+                print(f'Dificuldade {level}: {len(ids) / total:.1%} do tópico, '
+                      f'{drawn[level] / sum(drawn.values()):.1%} dos sorteios')
+            db.session.remove()
+            db.engine.dispose()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Benchmark das rotas principais: gera bases sintéticas em várias escalas
+(flask dataset generate) e percorre cada rota com o cliente de teste,
+medindo latência (p50/p95/p99) e consultas por requisição (Server-Timing).
+
+Tempos absolutos dependem da máquina, então a linha de base não guarda
+milissegundos: guarda as consultas de cada rota e o p95 dela dividido pelo
+p95 da página inicial anônima (REFERENCE_ROUTE), medida no mesmo laço e
+portanto nas mesmas condições. Falha (código 1) se alguma rota passar a
+fazer mais consultas ou se a sua razão crescer mais que --threshold (e a
+diferença passar de --min-delta-ms).
+
+Uso:
+    python benchmarks/bench_routes.py --scales tiny small --update-baseline
+    python benchmarks/bench_routes.py --scales tiny small --threshold 1.0
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import config, Config, TestingConfig
+from main import create_app
+from app.structure.database import db
+from app.structure.database.dataset import SCALES, DEFAULT_PASSWORD, generate_dataset
+from app.structure.database.models import Question
+from app.structure.functions.activity import activity_buffer
+from app.structure.functions.study_sessions import session_buffer
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline_routes.json')
+# Rota barata (template e contadores em memória) que serve de régua da máquina
+REFERENCE_ROUTE = 'main.index'
+SEARCH_TERMS = ('energia', 'revolução', 'função', 'célula', 'clima', 'ética', 'gráfico', 'onda')
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def queries(response):
+    timing = response.headers.get('Server-Timing', '')
+    match = re.search(r'desc="(\d+) queries"', timing)
+    return int(match.group(1)) if match else None
+
+class RouteTimer:
+    """Acumula latência e consultas de cada rota"""
+
+    def __init__(self):
+        self.samples = {}
+
+    def call(self, route, client, method, path, **kwargs):
+        start = time.perf_counter()
+        response = client.open(path, method=method, **kwargs)
+        elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code >= 400:
+            raise RuntimeError(f'{route}: {method} {path} respondeu {response.status_code}')
+        self.samples.setdefault(route, []).append((elapsed, queries(response)))
+        return response
+
+    def summary(self, warmup):
+        result = {}
+        for route, samples in self.samples.items():
+            samples = samples[warmup:] or samples
+            latencies = [ms for ms, _ in samples]
+            counts = [count for _, count in samples if count is not None]
+            result[route] = {
+                'requests': len(samples),
+                'p50_ms': round(percentile(latencies, 0.50), 2),
+                'p95_ms': round(percentile(latencies, 0.95), 2),
+                'p99_ms': round(percentile(latencies, 0.99), 2),
+                'queries': max(counts) if counts else None,
+            }
+        reference = result.get(REFERENCE_ROUTE, {}).get('p95_ms')
+        for stats in result.values():
+            stats['p95_ratio'] = round(stats['p95_ms'] / reference, 2) if reference else None
+        return result
+
+def run_scale(name, requests, warmup, seed):
+    """Gera a base da escala e mede cada rota `requests` vezes (+ aquecimento)"""
+    size = SCALES[name]
+    with tempfile.TemporaryDirectory() as directory:
+        class BenchConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.join(directory, "routes.db")}'
+            CACHE_BACKEND = 'local'
+            SQL_SERVER_TIMING = True
+            SQL_N_PLUS_ONE_LIMIT = None
+            # Gravações em lote como em produção (os testes gravam na hora)
+            STUDY_SESSION_FLUSH_INTERVAL = Config.STUDY_SESSION_FLUSH_INTERVAL
+            ACTIVITY_FLUSH_INTERVAL = Config.ACTIVITY_FLUSH_INTERVAL
+        config['bench_routes'] = BenchConfig
+        app = create_app('bench_routes')
+
+        with app.app_context():
+            start = time.perf_counter()
+            generate_dataset(size, seed=seed)
+            print(f'  base {name} gerada em {time.perf_counter() - start:.1f}s')
+            # Tópicos ativos com questões, para o quiz
+            topics = [row[0] for row in db.session.query(Question.topic_id)
+                      .filter(Question.is_active == True).distinct().limit(50)]
+            db.session.remove()
+
+        timer = RouteTimer()
+        total = requests + warmup
+        client, anonymous = app.test_client(), app.test_client()
+        client.post('/auth/login', data={'username': 'aluno2', 'password': DEFAULT_PASSWORD})
+
+        for i in range(total):
+            timer.call(REFERENCE_ROUTE, anonymous, 'GET', '/')
+            timer.call('main.dashboard', client, 'GET', '/dashboard')
+            timer.call('main.progress', client, 'GET', '/progress')
+            timer.call('main.search', client, 'GET', f'/search?q={SEARCH_TERMS[i % len(SEARCH_TERMS)]}')
+
+            page = timer.call('main.start_quiz', client, 'GET', f'/quiz/{topics[i % len(topics)]}')
+            html = page.get_data(as_text=True)
+            attempt = re.search(r'/quiz/(\d+)/submit', html).group(1)
+            answers = dict(zip(re.findall(r'data-question-id="(\d+)"', html),
+                               re.findall(r'data-answer-id="(\d+)"', html)[::5]))
+            timer.call('main.submit_quiz', client, 'POST', f'/quiz/{attempt}/submit', json={'answers': answers})
+
+            visitor = app.test_client()
+            user = 2 + i % (size.users - 1)
+            timer.call('auth.login', visitor, 'POST', '/auth/login',
+                       data={'username': f'aluno{user}', 'password': DEFAULT_PASSWORD})
+
+        # Grava o que ficou nas filas antes de apagar o banco temporário
+        activity_buffer.flush()
+        session_buffer.flush()
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        return timer.summary(warmup)
+
+def baseline_entry(stats):
+    """O que vai para a linha de base: nada que dependa da velocidade da máquina"""
+    return {'queries': stats['queries'], 'p95_ratio': stats['p95_ratio']}
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Rotas que pioraram em relação à linha de base: [(escala, rota, motivo)]"""
+    regressions = []
+    for scale, routes in results.items():
+        reference = routes.get(REFERENCE_ROUTE, {}).get('p95_ms')
+        for route, current in routes.items():
+            previous = baseline.get(scale, {}).get(route)
+            if previous is None:
+                continue
+            ratio = previous.get('p95_ratio')
+            if route != REFERENCE_ROUTE and ratio and reference and current['p95_ratio']:
+                # p95 que a rota teria hoje se mantivesse a razão da linha de base
+                expected_ms = ratio * reference
+                if current['p95_ratio'] > ratio * (1 + threshold) and \
+                        current['p95_ms'] - expected_ms > min_delta_ms:
+                    regressions.append((scale, route, f'p95 {ratio}x → {current["p95_ratio"]}x a página inicial '
+                                                      f'({current["p95_ms"]}ms)'))
+            if previous['queries'] is not None and (current['queries'] or 0) > previous['queries']:
+                regressions.append((scale, route, f'consultas {previous["queries"]} → {current["queries"]}'))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', nargs='+', choices=list(SCALES), default=['tiny', 'small'])
+    parser.add_argument('--requests', type=int, default=50, help='Requisições medidas por rota.')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--threshold', type=float, default=1.0,
+                        help='Crescimento da razão p95/página inicial que conta como regressão (1.0 = dobrar).')
+    parser.add_argument('--min-delta-ms', type=float, default=5.0,
+                        help='Piora absoluta mínima do p95 nesta execução, para não acusar ruído em rotas rápidas.')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--update-baseline', action='store_true', help='Grava os resultados como nova linha de base.')
+    parser.add_argument('--output', help='Arquivo JSON para os resultados desta execução.')
+    args = parser.parse_args()
+
+    results = {}
+    for scale in args.scales:
+        print(f'Escala {scale}:')
+        results[scale] = run_scale(scale, args.requests, args.warmup, args.seed)
+        print(f'  {"rota":18} {"p50":>8} {"p95":>8} {"p99":>8} {"razão":>7} {"consultas":>10}')
+        for route, stats in results[scale].items():
+            print(f'  {route:18} {stats["p50_ms"]:6.1f}ms {stats["p95_ms"]:6.1f}ms '
+                  f'{stats["p99_ms"]:6.1f}ms {stats["p95_ratio"]:6.2f}x {str(stats["queries"]):>10}')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(json.dumps(results, indent=2, ensure_ascii=False))
+    if args.update_baseline:
+        baseline = {scale: {route: baseline_entry(stats) for route, stats in routes.items()}
+                    for scale, routes in results.items()}
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            file.write(json.dumps(baseline, indent=2, ensure_ascii=False) + '\n')
+        print(f'Linha de base gravada em {args.baseline}')
+        return
+    if not os.path.exists(args.baseline):
+        print(f'Sem linha de base em {args.baseline}; rode com --update-baseline para criar.')
+        return
+
+    with open(args.baseline, encoding='utf-8') as file:
+        baseline = json.load(file)
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+    for scale, route, reason in regressions:
+        print(f'❌ {scale} {route}: {reason}')
+    if not regressions:
+        print(f'✅ Nenhuma rota fez mais consultas nem ficou mais de {args.threshold:.0%} mais lenta '
+              'em relação à página inicial.')
+    sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark da busca: índice FTS5 (bm25) x busca antiga com LIKE '%q%'
+
+Uso:
+    python benchmarks/bench_search.py --materials 100000 --repeat 20
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import config, TestingConfig
+from main import create_app
+from app.structure.database import db
+from app.structure.database.models import Subject, Topic, StudyMaterial
+from app.structure.functions.search import get_search_engine, LikeSearchEngine
+
+WORDS = (
+    'função quadrática revolução francesa fotossíntese citologia genética ecologia '
+    'termodinâmica cinemática eletricidade óptica estequiometria interpretação texto '
+    'literatura modernismo barroco geografia urbanização globalização sociologia '
+    'filosofia ética política república império colonização industrialização '
+    'probabilidade estatística geometria trigonometria logaritmo progressão matriz'
+).split()
+QUERIES = ['revolução francesa', 'fotossíntese', 'função quadrática', 'modernismo',
+           'probabilidade', 'termodinâmica', 'globalização', 'logaritmo']
+
+SYLLABLES = ['ba', 'ce', 'di', 'fo', 'gu', 'la', 'me', 'ni', 'po', 'ra', 'se', 'ti', 'vo', 'xa', 'zu', 'ção', 'dos']
+
+def vocabulary(rng, size=20000):
+    """Palavras sintéticas para que os termos buscados sejam relativamente raros"""
+    return [''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) for _ in range(size)]
+
+def text(rng, filler, words):
+    """Texto com ~3% de termos do vocabulário do ENEM"""
+    return ' '.join(rng.choice(WORDS) if rng.random() < 0.03 else rng.choice(filler) for _ in range(words))
+
+def build_corpus(materials, seed):
+    """Popula o banco com um corpus sintético de materiais"""
+    rng = random.Random(seed)
+    filler = vocabulary(rng)
+    subject = Subject(name='Benchmark', area='Benchmark')
+    db.session.add(subject)
+    db.session.flush()
+    topics = [Topic(name=f'Tópico {i} {rng.choice(WORDS)}', description=text(rng, filler, 20),
+                    subject_id=subject.id) for i in range(200)]
+    db.session.add_all(topics)
+    db.session.flush()
+
+    chunk = []
+    for i in range(materials):
+        topic = topics[i % len(topics)]
+        chunk.append({
+            'title': text(rng, filler, 6).capitalize(),
+            'content': text(rng, filler, 150),
+            'material_type': 'text',
+            'subject_id': subject.id,
+            'topic_id': topic.id,
+            'is_active': True,
+        })
+        if len(chunk) == 5000:
+            db.session.execute(db.insert(StudyMaterial), chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(db.insert(StudyMaterial), chunk)
+    db.session.commit()
+
+def measure(engine, repeat):
+    timings = []
+    for _ in range(repeat):
+        for query in QUERIES:
+            start = time.perf_counter()
+            engine.search(query)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'p50': statistics.median(timings),
+        'p95': timings[int(len(timings) * 0.95) - 1],
+        'max': timings[-1],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--materials', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        class BenchmarkConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.join(directory, "bench.db")}'
+        config['benchmark'] = BenchmarkConfig
+        app = create_app('benchmark')
+
+        with app.test_request_context():
+            print(f'📚 Gerando {args.materials} materiais...')
+            start = time.perf_counter()
+            build_corpus(args.materials, args.seed)
+            print(f'✅ Corpus pronto em {time.perf_counter() - start:.1f}s')
+
+            for name, engine in (('FTS5 (bm25)', get_search_engine()), ('LIKE', LikeSearchEngine())):
+                result = measure(engine, args.repeat)
+                print(f'{name:12} p50={result["p50"]:8.2f}ms  p95={result["p95"]:8.2f}ms  max={result["max"]:8.2f}ms')
+            db.session.remove()
+            db.engine.dispose()
+
+if __name__ == '__main__':
+    main()
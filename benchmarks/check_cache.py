@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Verificação do cache com um Redis falso em memória (sem servidor): cada
+instância de Cache faz o papel de um processo e todas compartilham o mesmo
+cliente. Cobre a invalidação por tag entre processos, o single-flight entre
+threads e entre processos, o timeout do lock de um processo que morreu, o
+lock por chave e a queda do Redis.
+
+Uso:
+    python benchmarks/check_cache.py
+"""
+
+import fnmatch
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.structure.functions.cache import Cache, LocalCache, RedisCache, TieredCache, LOCK_PREFIX
+
+class FakeRedis:
+    """Subconjunto do redis-py usado pelo RedisCache, com TTL e queda simulada"""
+
+    def __init__(self):
+        self.data = {}  # chave -> (expira_em, valor)
+        self.down = False
+        self._lock = threading.Lock()
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError('redis falso fora do ar')
+
+    def _alive(self, key):
+        entry = self.data.get(key)
+        if entry is not None and entry[0] is not None and entry[0] <= time.monotonic():
+            del self.data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        self._check()
+        with self._lock:
+            entry = self._alive(key)
+            return entry[1] if entry else None
+
+    def setex(self, key, seconds, value):
+        self._check()
+        with self._lock:
+            self.data[key] = (time.monotonic() + seconds, str(value))
+
+    def set(self, key, value, ex=None, px=None, nx=False):
+        self._check()
+        with self._lock:
+            if nx and self._alive(key):
+                return None
+            self.data[key] = (time.monotonic() + ex if ex else None, str(value))
+            return True
+
+    def delete(self, *keys):
+        self._check()
+        with self._lock:
+            return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def scan_iter(self, match='*', count=None):
+        self._check()
+        with self._lock:
+            keys = [key for key in self.data if fnmatch.fnmatchcase(key, match)]
+        return iter(keys)
+
+    def incr(self, key):
+        self._check()
+        with self._lock:
+            entry = self._alive(key)
+            value = int(entry[1]) + 1 if entry else 1
+            self.data[key] = (entry[0] if entry else None, str(value))
+            return value
+
+    def expire(self, key, seconds):
+        self._check()
+        with self._lock:
+            entry = self._alive(key)
+            if entry:
+                self.data[key] = (time.monotonic() + seconds, entry[1])
+
+    def eval(self, script, numkeys, key, token):
+        # Só o RELEASE_SCRIPT: apaga o lock se ainda for do dono
+        self._check()
+        with self._lock:
+            entry = self._alive(key)
+            if entry and entry[1] == token:
+                del self.data[key]
+                return 1
+            return 0
+
+def process(client, tiered=False, lock_timeout=10.0):
+    """Um 'processo': Cache próprio sobre o Redis falso compartilhado"""
+    shared = RedisCache(client=client)
+    backend = TieredCache(LocalCache(max_ttl=60), shared) if tiered else shared
+    return Cache(backend, tag_ttl=0, lock_timeout=lock_timeout)
+
+def concurrently(functions):
+    results = [None] * len(functions)
+    barrier = threading.Barrier(len(functions))
+
+    def run(i):
+        barrier.wait()
+        results[i] = functions[i]()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(functions))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def slow_factory(calls, seconds=0.2, value='valor'):
+    def factory():
+        calls.append(1)
+        time.sleep(seconds)
+        return value
+    return factory
+
+def check_tag_invalidation():
+    for tiered in (False, True):
+        client = FakeRedis()
+        a, b = process(client, tiered), process(client, tiered)
+        a.set(a.tagged_key('perfil:1', ('usuario:1',)), 'antigo', 60)
+        if b.get(b.tagged_key('perfil:1', ('usuario:1',))) != 'antigo':
+            return False
+        a.invalidate_tag('usuario:1')
+        if b.get(b.tagged_key('perfil:1', ('usuario:1',))) is not None:
+            return False
+    return True
+
+def check_single_flight_threads():
+    cache, calls = process(FakeRedis()), []
+    results = concurrently([lambda: cache.get_or_set('quente', slow_factory(calls), 60)] * 20)
+    return len(calls) == 1 and set(results) == {'valor'}
+
+def check_single_flight_processes():
+    client, calls = FakeRedis(), []
+    caches = [process(client) for _ in range(4)]
+    results = concurrently([lambda cache=cache: cache.get_or_set('quente', slow_factory(calls), 60)
+                            for cache in caches for _ in range(5)])
+    return len(calls) == 1 and set(results) == {'valor'}
+
+def check_lock_timeout():
+    # Um processo pegou o lock e morreu sem liberar: quem espera desiste no
+    # timeout e calcula por conta própria
+    client, calls = FakeRedis(), []
+    cache = process(client, lock_timeout=0.5)
+    client.set(LOCK_PREFIX + 'orfa', 'outro-processo', 2, None, True)
+    start = time.monotonic()
+    value = cache.get_or_set('orfa', slow_factory(calls, seconds=0), 60)
+    elapsed = time.monotonic() - start
+    return value == 'valor' and len(calls) == 1 and 0.5 <= elapsed < 1.5
+
+def check_per_key_lock():
+    # Uma chave lenta não pode atrasar outra chave no mesmo processo
+    cache, calls = process(FakeRedis()), []
+    slow = threading.Thread(target=cache.get_or_set, args=('lenta', slow_factory(calls, seconds=1), 60))
+    slow.start()
+    time.sleep(0.05)
+    start = time.monotonic()
+    for i in range(64):
+        cache.get_or_set(f'rapida:{i}', lambda: 'ok', 60)
+    elapsed = time.monotonic() - start
+    slow.join()
+    return elapsed < 0.5 and not cache._key_locks
+
+def check_redis_down():
+    client, calls = FakeRedis(), []
+    cache = process(client)
+    client.down = True
+    value = cache.get_or_set('sem-redis', slow_factory(calls, seconds=0), 60)
+    cache.invalidate_tag('usuario:1')
+    return value == 'valor' and len(calls) == 1 and cache.tag_version('usuario:1') is None
+
+CHECKS = (
+    ('invalidação por tag entre processos (redis e tiered)', check_tag_invalidation),
+    ('single-flight entre threads', check_single_flight_threads),
+    ('single-flight entre processos', check_single_flight_processes),
+    ('timeout do lock de um processo morto', check_lock_timeout),
+    ('lock por chave', check_per_key_lock),
+    ('Redis fora do ar', check_redis_down),
+)
+
+def main():
+    failures = 0
+    for label, check in CHECKS:
+        ok = check()
+        failures += not ok
+        print(f'{"✅" if ok else "❌"} {label}')
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
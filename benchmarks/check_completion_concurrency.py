@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Verificação de concorrência da conclusão de materiais: várias threads
+concluem os mesmos materiais ao mesmo tempo (abas duplicadas, clique duplo)
+e o progresso final precisa contar cada material uma única vez, sem passar
+de 100% e com os agregados iguais aos recalculados do zero.
+
+Uso:
+    python benchmarks/check_completion_concurrency.py --threads 16 --repeat 5
+    DATABASE_URL=postgresql://... python benchmarks/check_completion_concurrency.py
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import config, TestingConfig
+from main import create_app
+from app.structure.database import db
+from app.structure.database.models import (
+    User, Subject, Topic, StudyMaterial, ProgressRecord, ProgressRollup, MaterialCompletion
+)
+from app.structure.functions.material_completion import record_completion
+from app.structure.functions.progress_rollup import _aggregate, COUNTERS
+
+def seed(materials):
+    user = User(username='concorrencia', email='concorrencia@example.com',
+                first_name='Teste', last_name='Concorrência')
+    user.set_password('concorrencia')
+    subject = Subject(name='Concorrência', area='Benchmark')
+    db.session.add_all([user, subject])
+    db.session.flush()
+    topic = Topic(name='Tópico', subject_id=subject.id)
+    db.session.add(topic)
+    db.session.flush()
+    db.session.add_all([StudyMaterial(title=f'Material {i}', content='...', material_type='text',
+                                      subject_id=subject.id, topic_id=topic.id)
+                        for i in range(materials)])
+    db.session.commit()
+    return user.id, [m.id for m in StudyMaterial.query.filter_by(topic_id=topic.id)]
+
+def complete_all(app, user_id, material_ids, threads, repeat):
+    """Cada thread conclui todos os materiais `repeat` vezes, começando de pontos diferentes"""
+    barrier = threading.Barrier(threads)
+    errors = []
+
+    def worker(offset):
+        with app.app_context():
+            barrier.wait()
+            try:
+                for _ in range(repeat):
+                    for i in range(len(material_ids)):
+                        material = db.session.get(StudyMaterial, material_ids[(i + offset) % len(material_ids)])
+                        record_completion(user_id, material, study_minutes=1)
+                        db.session.commit()
+            except Exception as error:
+                errors.append(error)
+                db.session.rollback()
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return errors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--materials', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        class CheckConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
+                f'sqlite:///{os.path.join(directory, "check.db")}'
+        config['check'] = CheckConfig
+        app = create_app('check')
+
+        with app.app_context():
+            user_id, material_ids = seed(args.materials)
+
+        errors = complete_all(app, user_id, material_ids, args.threads, args.repeat)
+
+        with app.app_context():
+            record = ProgressRecord.query.filter_by(user_id=user_id).one()
+            completions = MaterialCompletion.query.filter_by(user_id=user_id).count()
+            # Os minutos vêm de StudySession no recálculo; aqui são informados diretamente
+            progress_counters = [name for name in COUNTERS if name != 'study_minutes']
+            rollups = ProgressRollup.query.filter_by(user_id=user_id).all()
+            stored = {(row.user_id, row.subject_id): {name: getattr(row, name) for name in progress_counters}
+                      for row in rollups}
+            expected = {key: {name: values[name] for name in progress_counters}
+                        for key, values in _aggregate([user_id]).items()}
+            minutes = next(row.study_minutes for row in rollups if row.subject_id == 0)
+            calls = args.threads * args.repeat * args.materials
+
+            checks = [
+                ('sem erros nas threads', not errors),
+                ('uma conclusão por material', completions == args.materials),
+                ('materials_completed correto', record.materials_completed == args.materials),
+                ('progresso em 100%', record.progress_percentage == 100.0),
+                ('agregados iguais ao recálculo', stored == expected),
+                ('minutos de todas as chamadas', minutes == calls),
+            ]
+            for name, ok in checks:
+                print(f'{"✅" if ok else "❌"} {name}')
+            for error in errors[:3]:
+                print(f'   {type(error).__name__}: {error}')
+            db.session.remove()
+            db.engine.dispose()
+            sys.exit(0 if all(ok for _, ok in checks) else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Verificação do GET condicional com o cache padrão (local, de cada
+processo): as páginas do catálogo e a do material respondem 304 enquanto
+nada mudou e
+voltam a 200 depois de alterações feitas por outro worker, simulado por um
+processo filho (fork) que grava pelo ORM com o próprio cache local. Confere
+também que as versões da tabela counters não se repetem quando o banco é
+recriado, para não colidir com chaves antigas no Redis.
+
+Uso:
+    python benchmarks/check_conditional_get.py
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import config, TestingConfig
+from main import create_app
+from app.structure.database import db
+from app.structure.database.dataset import SCALES, DEFAULT_PASSWORD, generate_dataset
+from app.structure.database.models import User, Topic, StudyMaterial, MaterialCompletion
+from app.structure.functions.counters import get_counter, reconcile_counters, CATALOG_VERSION
+from app.structure.functions.material_completion import record_completion
+
+USERNAME = 'aluno2'
+
+def in_other_worker(app, change):
+    """Roda change() em um processo filho, com conexões e caches próprios"""
+    def run():
+        with app.app_context():
+            db.engine.dispose(close=False)
+            change()
+            db.session.commit()
+    process = multiprocessing.get_context('fork').Process(target=run)
+    process.start()
+    process.join()
+    return process.exitcode == 0
+
+def revalidate(client, path, etag):
+    return client.get(path, headers={'If-None-Match': etag}).status_code
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        class CheckConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.join(directory, "conditional.db")}'
+            CACHE_BACKEND = 'local'
+            COUNTER_REFRESH = 0  # as versões do banco valem já na próxima requisição
+        config['conditional'] = CheckConfig
+        app = create_app('conditional')
+
+        with app.app_context():
+            generate_dataset(SCALES['tiny'])
+            user_id = User.query.filter_by(username=USERNAME).one().id
+            # Material ainda não concluído: só a primeira conclusão altera o progresso
+            completed = db.session.query(MaterialCompletion.material_id).filter_by(user_id=user_id)
+            material = StudyMaterial.query.filter(StudyMaterial.is_active == True,
+                                                  StudyMaterial.id.notin_(completed))\
+                .order_by(StudyMaterial.id).first()
+            material_id, topic_id, subject_id = material.id, material.topic_id, material.subject_id
+            db.session.remove()
+
+        client = app.test_client()
+        client.post('/auth/login', data={'username': USERNAME, 'password': DEFAULT_PASSWORD})
+        client.get('/dashboard')  # consome a mensagem de login
+
+        pages = ['/subjects', f'/subject/{subject_id}', f'/topic/{topic_id}']
+        etags = {path: client.get(path).headers.get('ETag') for path in pages}
+        checks = [('páginas do catálogo com ETag', all(etags.values()))]
+        if not all(etags.values()):
+            etags = dict.fromkeys(pages, '"sem-etag"')
+        checks.append(('304 sem alterações', all(revalidate(client, path, etags[path]) == 304 for path in pages)))
+
+        def complete():
+            material = db.session.get(StudyMaterial, material_id)
+            record_completion(user_id, material)
+        ok = in_other_worker(app, complete)
+        checks.append(('200 após progresso gravado por outro worker',
+                       ok and all(revalidate(client, path, etags[path]) == 200 for path in pages)))
+
+        material_page = f'/material/{material_id}'
+        pages.append(material_page)
+        etags = {path: client.get(path).headers.get('ETag') for path in pages}
+        checks.append(('material com ETag e 304', etags[material_page] is not None
+                       and revalidate(client, material_page, etags[material_page]) == 304))
+
+        def rename():
+            db.session.get(Topic, topic_id).name += ' (revisado)'
+        ok = in_other_worker(app, rename)
+        checks.append(('200 após edição do catálogo por outro worker',
+                       ok and all(revalidate(client, path, etags[path]) == 200 for path in pages)))
+
+        etag = client.get(material_page).headers.get('ETag')
+        def edit():
+            db.session.get(StudyMaterial, material_id).content += ' (revisado)'
+        ok = in_other_worker(app, edit)
+        checks.append(('200 após edição do material por outro worker',
+                       ok and revalidate(client, material_page, etag) == 200))
+
+        # Renomear o tópico não muda o Last-Modified do material: ele sozinho não valida
+        last_modified = client.get(material_page).headers.get('Last-Modified')
+        in_other_worker(app, rename)
+        response = client.get(material_page, headers={'If-Modified-Since': last_modified})
+        checks.append(('If-Modified-Since sozinho não gera 304 desatualizado', response.status_code == 200))
+
+        with app.app_context():
+            before = get_counter(CATALOG_VERSION)
+            started = time.time_ns() // 1_000_000
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+            reconcile_counters()
+            after = get_counter(CATALOG_VERSION)
+            checks.append(('versão do catálogo não se repete ao recriar o banco',
+                           after > before and after >= started))
+            db.session.remove()
+            db.engine.dispose()
+
+        for name, ok in checks:
+            print(f'{"✅" if ok else "❌"} {name}')
+        sys.exit(0 if all(ok for _, ok in checks) else 1)
+
+if __name__ == '__main__':
+    main()
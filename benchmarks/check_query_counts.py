@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Verificação da quantidade de consultas por rota: popula o banco em escalas
+diferentes e confere que cada rota faz o mesmo número de consultas em todas
+elas (sem N+1), com o modo estrito de instrumentação ligado.
+
+Uso:
+    python benchmarks/check_query_counts.py --scales 0.05 0.2
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import config, TestingConfig
+from main import create_app
+from app.structure.database import db
+from app.structure.database.models import StudyMaterial
+from check_query_plans import seed, USERNAME, PASSWORD
+
+ID_IN_PATH = re.compile(r'/\d+')
+
+def query_counts(scale, seed_value):
+    """Consultas feitas por cada rota, lidas do cabeçalho Server-Timing"""
+    with tempfile.TemporaryDirectory() as directory:
+        class CountConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.join(directory, "counts.db")}'
+            SQL_SERVER_TIMING = True
+        config['counts'] = CountConfig
+        app = create_app('counts')
+
+        with app.app_context():
+            seed(scale, seed_value)
+            material = StudyMaterial.query.filter_by(is_active=True).first()
+            material_id, topic_id, subject_id = material.id, material.topic_id, material.subject_id
+            db.session.remove()
+
+        client = app.test_client()
+        client.post('/auth/login', data={'username': USERNAME, 'password': PASSWORD})
+        routes = [
+            ('GET', '/dashboard'),
+            ('GET', '/subjects'),
+            ('GET', f'/subject/{subject_id}'),
+            ('GET', f'/topic/{topic_id}'),
+            ('GET', f'/material/{material_id}'),
+            ('POST', f'/material/{material_id}/session'),
+            ('POST', f'/material/{material_id}/complete'),
+            ('GET', f'/quiz/{topic_id}'),
+            ('GET', '/progress'),
+            ('GET', '/search?q=Material'),
+        ]
+        counts = {}
+        for method, path in routes:
+            response = client.open(path, method=method)
+            timing = response.headers.get('Server-Timing', '')
+            counts[f'{method} {ID_IN_PATH.sub("/<id>", path)}'] = int(timing.split('desc="')[1].split()[0]) if timing else None
+
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=float, nargs='+', default=[0.05, 0.2])
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    results = {scale: query_counts(scale, args.seed) for scale in args.scales}
+    routes = list(results[args.scales[0]])
+    print(f'{"rota":36}' + ''.join(f'{f"x{scale}":>10}' for scale in args.scales))
+    failures = 0
+    for route in routes:
+        counts = [results[scale][route] for scale in args.scales]
+        stable = len(set(counts)) == 1 and None not in counts
+        failures += not stable
+        print(f'{"✅" if stable else "❌"} {route:34}' + ''.join(f'{str(c):>10}' for c in counts))
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Verificação dos planos de consulta: popula um banco SQLite grande, percorre
+as rotas principais com o cliente de teste, registra cada comando SQL
+executado e roda EXPLAIN QUERY PLAN em todos eles (nos comandos em lote,
+com o primeiro conjunto de parâmetros). Falha (código 1) se algum fizer
+varredura completa de uma tabela grande, ou seja, um "SCAN <tabela>" sem
+índice.
+
+Uso:
+    python benchmarks/check_query_plans.py --scale 1.0
+    python benchmarks/check_query_plans.py --verbose   # mostra todos os planos
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from config import config, TestingConfig
+from main import create_app
+from app.structure.database import db
+from app.structure.database.models import (
+    User, Subject, Topic, StudyMaterial, Question, Answer, StudySession,
+    ProgressRecord, QuizAttempt
+)
+from app.structure.functions.progress_rollup import rebuild_rollups
+
+# Tabelas pequenas e lidas inteiras de propósito (catálogo de disciplinas, contadores)
+SMALL_TABLES = {'subjects', 'counters'}
+
+USERNAME, PASSWORD = 'planos', 'planos123'
+ADMIN_USERNAME = 'planos_admin'
+
+# Sem filtro, na ordem da chave primária e com LIMIT: o SQLite mostra "SCAN", mas
+# percorre o rowid em ordem e para nas primeiras linhas (ex.: últimos cadastros)
+PRIMARY_KEY_PAGE = re.compile(r'^SELECT .* FROM (\w+) ORDER BY \1\.id(?: DESC)? LIMIT \S+(?: OFFSET \S+)?$', re.DOTALL)
+
+QUESTION_RE = re.compile(r'data-question-id="(\d+)"')
+ANSWER_RE = re.compile(r'data-question="(\d+)" data-answer="0"\s*data-answer-id="(\d+)"')
+
+def bulk(model, rows):
+    for start in range(0, len(rows), 5000):
+        db.session.execute(db.insert(model), rows[start:start + 5000])
+
+def seed(scale, seed):
+    """Volume proporcional a uma base de produção pequena (scale=1.0)"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    n = lambda value: max(1, int(value * scale))
+
+    bulk(Subject, [{'name': f'Disciplina {i}', 'area': f'Área {i % 4}', 'is_active': True} for i in range(10)])
+    bulk(Topic, [{'name': f'Tópico {i}', 'subject_id': i % 10 + 1, 'is_active': i % 20 != 0}
+                 for i in range(n(500))])
+    topics = n(500)
+    bulk(StudyMaterial, [{'title': f'Material {i}', 'content': 'conteúdo ' * 20, 'material_type': 'text',
+                          'subject_id': (i % topics) % 10 + 1, 'topic_id': i % topics + 1,
+                          'is_active': i % 25 != 0} for i in range(n(50000))])
+    bulk(Question, [{'question_text': f'Questão {i}', 'question_type': 'multiple_choice',
+                     'difficulty_level': rng.randint(1, 3), 'topic_id': i % topics + 1,
+                     'subject_id': (i % topics) % 10 + 1, 'is_active': i % 30 != 0}
+                    for i in range(n(20000))])
+    bulk(Answer, [{'answer_text': f'Alternativa {j}', 'is_correct': j == 0, 'question_id': q + 1}
+                  for q in range(n(20000)) for j in range(4)])
+
+    users = n(2000)
+    bulk(User, [{'username': f'usuario{i}', 'email': f'usuario{i}@example.com', 'password_hash': '!',
+                 'first_name': 'Usuário', 'last_name': str(i), 'is_active': True} for i in range(users)])
+    user = User(username=USERNAME, email='planos@example.com', first_name='Planos', last_name='Teste')
+    user.set_password(PASSWORD)
+    admin = User(username=ADMIN_USERNAME, email='planos_admin@example.com', first_name='Planos',
+                 last_name='Admin', is_admin=True)
+    admin.set_password(PASSWORD)
+    db.session.add_all([user, admin])
+    db.session.flush()
+
+    sessions, progress, attempts = [], {}, []
+    for i in range(n(200000)):
+        user_id = rng.randint(1, users + 1)
+        material = rng.randint(1, n(50000))
+        topic = (material - 1) % topics + 1
+        start = now - timedelta(minutes=rng.randint(0, 60 * 24 * 90))
+        sessions.append({'user_id': user_id, 'subject_id': (topic - 1) % 10 + 1, 'topic_id': topic,
+                         'material_id': material, 'start_time': start, 'end_time': start + timedelta(minutes=20),
+                         'duration_minutes': 20, 'completed': True})
+        progress[(user_id, topic)] = {'user_id': user_id, 'subject_id': (topic - 1) % 10 + 1, 'topic_id': topic,
+                                      'progress_percentage': 50.0, 'materials_completed': 1, 'total_materials': 2}
+    for i in range(n(20000)):
+        topic = rng.randint(1, topics)
+        attempts.append({'user_id': rng.randint(1, users + 1), 'subject_id': (topic - 1) % 10 + 1,
+                         'topic_id': topic, 'score': 50.0, 'total_questions': 10, 'completed': True})
+    bulk(StudySession, sessions)
+    bulk(ProgressRecord, list(progress.values()))
+    bulk(QuizAttempt, attempts)
+    db.session.commit()
+    rebuild_rollups()
+    db.session.execute(db.text('ANALYZE'))
+    db.session.commit()
+
+def full_scans(plan, statement=''):
+    """Linhas do plano que varrem uma tabela inteira sem índice"""
+    page = PRIMARY_KEY_PAGE.match(' '.join(statement.split()))
+    if page and not any('TEMP B-TREE' in row[-1] for row in plan):
+        return []
+    # Subconsultas materializadas são resultados intermediários, não tabelas
+    derived = {row[-1].split()[1] for row in plan
+               if row[-1].startswith(('MATERIALIZE ', 'CO-ROUTINE '))}
+    scans = []
+    for row in plan:
+        detail = row[-1]
+        if not detail.startswith('SCAN ') or 'USING' in detail or 'VIRTUAL TABLE' in detail:
+            continue
+        table = detail.split()[1]
+        if table in SMALL_TABLES or table in derived or table.startswith('(') or table == 'CONSTANT':
+            continue
+        scans.append(detail)
+    return scans
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        class PlanConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.join(directory, "plans.db")}'
+        config['plans'] = PlanConfig
+        app = create_app('plans')
+
+        with app.app_context():
+            print('📚 Populando o banco...')
+            seed(args.scale, args.seed)
+            material = StudyMaterial.query.filter_by(is_active=True).first()
+            material_id, topic_id, subject_id = material.id, material.topic_id, material.subject_id
+            engine = db.engine
+            db.session.remove()
+
+        # As requisições rodam fora do app context acima, cada uma com o seu
+        statements, request_path = [], ['']
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().split()[0].upper() in ('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'WITH'):
+                # Em lote o plano é o mesmo para todas as linhas: basta a primeira
+                if executemany:
+                    parameters = parameters[0] if parameters else ()
+                statements.append((request_path[0], statement, parameters))
+        event.listen(engine, 'before_cursor_execute', capture)
+
+        anonymous, client, admin = app.test_client(), app.test_client(), app.test_client()
+        request_path[0] = 'POST /auth/login'
+        client.post('/auth/login', data={'username': USERNAME, 'password': PASSWORD})
+        admin.post('/auth/login', data={'username': ADMIN_USERNAME, 'password': PASSWORD})
+
+        def open_route(http, method, path, **kwargs):
+            request_path[0] = f'{method} {path}'
+            response = http.open(path, method=method, **kwargs)
+            if response.status_code >= 400:
+                print(f'⚠️  {method} {path} respondeu {response.status_code}')
+            return response
+
+        requests = [
+            (anonymous, 'GET', '/'),
+            (client, 'GET', '/dashboard'),
+            (client, 'GET', '/subjects'),
+            (client, 'GET', f'/subject/{subject_id}'),
+            (client, 'GET', f'/topic/{topic_id}'),
+            (client, 'GET', f'/material/{material_id}'),
+            (client, 'GET', '/progress'),
+            (client, 'GET', '/search?q=Material'),
+            (client, 'GET', '/search?q=Materail'),
+            (admin, 'GET', '/admin'),
+        ]
+        for http, method, path in requests:
+            open_route(http, method, path)
+
+        # Sessão de estudo e conclusão do material, como a página faz
+        session_id = open_route(client, 'POST', f'/material/{material_id}/session').get_json()['session_id']
+        open_route(client, 'POST', f'/material/{material_id}/complete', json={'session_id': session_id})
+
+        # Quiz: inicia e envia a primeira alternativa de cada questão sorteada
+        page = open_route(client, 'GET', f'/quiz/{topic_id}').get_data(as_text=True)
+        attempt_id = re.search(r'/quiz/(\d+)/submit', page).group(1)
+        question_ids = QUESTION_RE.findall(page)
+        answers = {question_ids[int(index)]: answer_id for index, answer_id in ANSWER_RE.findall(page)}
+        open_route(client, 'POST', f'/quiz/{attempt_id}/submit', data=json.dumps({'answers': answers}),
+                   content_type='application/json')
+        event.remove(engine, 'before_cursor_execute', capture)
+
+        with app.app_context():
+            failures, reported = 0, set()
+            connection = db.engine.raw_connection()
+            try:
+                cursor = connection.cursor()
+                for path, statement, parameters in statements:
+                    plan = cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+                    scans = full_scans(plan, statement)
+                    if (args.verbose or scans) and statement not in reported:
+                        reported.add(statement)
+                        print(f'\n{"❌" if scans else "✅"} {path}\n   {" ".join(statement.split())[:300]}')
+                        for row in plan:
+                            print(f'     {row[-1]}')
+                    failures += bool(scans)
+            finally:
+                connection.close()
+
+            print(f'\n{len(statements)} comandos verificados, {failures} com varredura completa.')
+            db.session.remove()
+            db.engine.dispose()
+            sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
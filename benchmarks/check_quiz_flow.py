@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Verificação do fluxo do quiz pelas rotas: inicia um quiz, envia as
+respostas, confere a correção e depois exclui a conta do usuário, que
+precisa levar junto as tentativas e as respostas gravadas. No SQLite as
+chaves estrangeiras são ativadas para a exclusão falhar como no PostgreSQL.
+
+O script da página (submitQuiz) roda no Node com um DOM mínimo: as
+respostas escolhidas precisam sair no corpo enviado e a resposta real da
+correção precisa levar à revisão, sem alerta de erro. Sem Node essa parte
+é pulada.
+
+Uso:
+    python benchmarks/check_quiz_flow.py
+    DATABASE_URL=postgresql://... python benchmarks/check_quiz_flow.py
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from config import config, TestingConfig
+from main import create_app
+from app.structure.database import db
+from app.structure.database.models import (
+    User, Subject, Topic, Question, Answer, QuizAttempt, UserAnswer
+)
+
+USERNAME, PASSWORD = 'quiz', 'quiz123'
+QUESTIONS = 12
+
+QUESTION_RE = re.compile(r'id="question(\d+)" data-question-id="(\d+)"')
+OPTION_RE = re.compile(r'data-question="(\d+)" data-answer="(\d+)"\s*data-answer-id="(\d+)"')
+SCRIPT_RE = re.compile(r'<script>(.*?)</script>', re.DOTALL)
+
+# Roda o script da página com o DOM mínimo que ele usa; fetch devolve a
+# resposta real da correção. Entrada e saída em JSON.
+HARNESS = r"""
+const vm = require('vm');
+const {script, questions, options, choices, response} = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+const elements = {};
+function element(id) {
+    if (!elements[id]) {
+        elements[id] = {
+            id, style: {}, dataset: {}, textContent: '', innerHTML: '', disabled: false,
+            classList: {add() {}, remove() {}},
+            querySelector: selector => element(id + ' ' + selector),
+            querySelectorAll: () => [],
+            get parentElement() { return element(id + ' parent'); },
+        };
+    }
+    return elements[id];
+}
+for (const [index, questionId] of Object.entries(questions)) {
+    element('question' + index).dataset.questionId = questionId;
+}
+const document = {
+    getElementById: element,
+    addEventListener() {},
+    querySelector(selector) {
+        const [, question, answer = '0'] = selector.match(/data-question="(\d+)"(?:\]\[data-answer="(\d+)")?/);
+        const option = element(`option${question}:${answer}`);
+        option.dataset.answerId = options[question][answer];
+        return option;
+    },
+};
+const alerts = [];
+let request = null;
+const context = {
+    document, window: {addEventListener() {}, location: {}}, console: {error() {}},
+    alert: message => alerts.push(String(message)),
+    setInterval: () => 1, clearInterval() {},
+    bootstrap: {Modal: {getInstance: () => ({hide() {}})}},
+    fetch(url, init) {
+        request = {url, body: JSON.parse(init.body)};
+        return Promise.resolve({json: () => Promise.resolve(response)});
+    },
+};
+vm.runInNewContext(script + '\n;this.quiz = {selectAnswer, submitQuiz, isSubmitted: () => submitted};', context);
+for (const [question, answer] of choices) {
+    context.quiz.selectAnswer(question, answer);
+}
+context.quiz.submitQuiz();
+setTimeout(() => {
+    console.log(JSON.stringify({
+        request, alerts, submitted: context.quiz.isSubmitted(),
+        finish: element('finishBtn').innerHTML,
+        explanation: element('explanation0').querySelector('p').textContent,
+    }));
+}, 0);
+"""
+
+def seed():
+    user = User(username=USERNAME, email='quiz@example.com', first_name='Teste', last_name='Quiz')
+    user.set_password(PASSWORD)
+    subject = Subject(name='Quiz', area='Benchmark')
+    db.session.add_all([user, subject])
+    db.session.flush()
+    topic = Topic(name='Tópico', subject_id=subject.id)
+    db.session.add(topic)
+    db.session.flush()
+    for i in range(QUESTIONS):
+        question = Question(question_text=f'Questão {i}', question_type='multiple_choice',
+                            difficulty_level=1 + i % 5, topic_id=topic.id, subject_id=subject.id)
+        question.answers = [Answer(answer_text=f'Alternativa {n}', is_correct=n == 0,
+                                   explanation='Porque sim.' if n == 0 else None)
+                            for n in range(4)]
+        db.session.add(question)
+    db.session.commit()
+    return user.id, topic.id
+
+def _foreign_keys(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
+
+def run_page_script(page, choices, response):
+    """Executa submitQuiz da página no Node; None quando o Node não está instalado"""
+    node = shutil.which('node')
+    if node is None:
+        return None
+    script = next(block for block in SCRIPT_RE.findall(page) if 'function submitQuiz' in block)
+    options = {}
+    for question, answer, answer_id in OPTION_RE.findall(page):
+        options.setdefault(question, {})[answer] = answer_id
+    payload = json.dumps({'script': script, 'questions': dict(QUESTION_RE.findall(page)),
+                          'options': options, 'choices': choices, 'response': response})
+    result = subprocess.run([node, '-e', HARNESS], input=payload, capture_output=True, text=True, timeout=30)
+    if result.returncode != 0:
+        return {'error': result.stderr.strip()}
+    return json.loads(result.stdout)
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        class CheckConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
+                f'sqlite:///{os.path.join(directory, "check.db")}'
+        config['check'] = CheckConfig
+        app = create_app('check')
+
+        with app.app_context():
+            if db.engine.dialect.name == 'sqlite':
+                event.listen(db.engine, 'connect', _foreign_keys)
+                db.engine.dispose()
+            user_id, topic_id = seed()
+
+        client = app.test_client()
+        client.post('/auth/login', data={'username': USERNAME, 'password': PASSWORD})
+        page = client.get(f'/quiz/{topic_id}').get_data(as_text=True)
+        attempt_id = int(re.search(r'/quiz/(\d+)/submit', page).group(1))
+
+        # Alterna a primeira e a segunda alternativa de cada questão, como na tela
+        question_ids = dict(QUESTION_RE.findall(page))
+        answer_ids = {(question, answer): answer_id for question, answer, answer_id in OPTION_RE.findall(page)}
+        choices = [[int(index), int(index) % 2] for index in question_ids]
+        answers = {question_ids[str(index)]: answer_ids[(str(index), str(answer))] for index, answer in choices}
+        with app.app_context():
+            expected_correct = Answer.query.filter(Answer.id.in_([int(i) for i in answers.values()]),
+                                                   Answer.is_correct == True).count()
+            db.session.remove()
+
+        result = client.post(f'/quiz/{attempt_id}/submit', json={'answers': answers}).get_json() or {}
+        browser = run_page_script(page, choices, result)
+
+        deleted = client.post('/auth/delete-account', data={'password': PASSWORD})
+
+        with app.app_context():
+            checks = [
+                ('quiz corrigido', result.get('success') is True
+                    and result.get('correct_answers') == expected_correct),
+            ]
+            if browser is None:
+                print('⚠️  Node não encontrado: script da página não verificado')
+            else:
+                checks += [
+                    ('página envia as respostas escolhidas', (browser.get('request') or {}).get('body', {})
+                        .get('answers') == answers),
+                    ('página mostra a revisão sem erro', browser.get('submitted') is True
+                        and not browser.get('alerts') and 'Ver resultados' in browser.get('finish', '')
+                        and browser.get('explanation') not in (None, '')),
+                ]
+            checks += [
+                ('exclusão redireciona para o início', deleted.status_code == 302
+                    and urlparse(deleted.headers.get('Location', '')).path == '/'),
+                ('usuário removido', db.session.get(User, user_id) is None),
+                ('tentativas removidas', QuizAttempt.query.filter_by(user_id=user_id).count() == 0),
+                ('respostas removidas', UserAnswer.query.filter_by(quiz_attempt_id=attempt_id).count() == 0),
+            ]
+            for name, ok in checks:
+                print(f'{"✅" if ok else "❌"} {name}')
+            for message in (browser or {}).get('alerts', []) + [(browser or {}).get('error')]:
+                if message:
+                    print(f'   {message}')
+            db.session.remove()
+            db.engine.dispose()
+            sys.exit(0 if all(ok for _, ok in checks) else 1)
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,7 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///enem_study_system.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLITE_BUSY_TIMEOUT = 5000  # ms que uma escrita espera pelo lock do SQLite (filas gravam em outra thread)
     WTF_CSRF_ENABLED = True
     WTF_CSRF_SECRET_KEY = os.environ.get('WTF_CSRF_SECRET_KEY') or 'csrf-secret-key'
     
@@ -18,10 +19,55 @@ class Config:
     SESSION_COOKIE_SAMESITE = 'Lax'
     PERMANENT_SESSION_LIFETIME = 3600  # 1 hora
     
+    # Senhas: custo do bcrypt e pool de processos que faz o hashing
+    BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS') or 12)  # hashes com outro custo são regravados no login
+    BCRYPT_WORKERS = None  # processos do pool (None = núcleos da máquina, 0 = na thread da requisição)
+    BCRYPT_MAX_PENDING = 64  # verificações na fila antes de recusar o login com 503
+    BCRYPT_TIMEOUT = 10  # segundos de espera por uma verificação
+    USER_CACHE_TTL = 60  # segundos que o usuário logado fica no Redis
+    USER_LOCAL_CACHE_TTL = 5  # sem Redis: segundos que cada processo reaproveita o usuário logado
+    
     # Configurações de upload
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     UPLOAD_FOLDER = 'app/assets/uploads'
     
+    # Configurações de busca
+    AUTOCOMPLETE_REFRESH_SECONDS = 300  # validade do índice de autocompletar em memória
+    
+    # Configurações de cache: local (LRU em memória), redis, tiered (local + redis) ou null.
+    # Só redis e tiered são vistos por todos os workers: com local ou null as ETags das páginas
+    # usam as versões gravadas no banco (contadores, progresso), já que a invalidação feita
+    # em um worker não chega aos outros
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND') or 'local'
+    CACHE_REDIS_URL = os.environ.get('REDIS_URL') or 'redis://localhost:6379/0'
+    CACHE_LOCAL_MAX_ENTRIES = 10000
+    CACHE_LOCAL_MAX_BYTES = 64 * 1024 * 1024  # 64MB por processo
+    CACHE_LOCAL_TTL = 60  # validade máxima no cache local, para não divergir do Redis
+    CACHE_TAG_TTL = 1  # segundos que cada processo reaproveita a versão de uma tag
+    COUNTER_REFRESH = 5  # segundos que cada processo reaproveita os contadores (página inicial, admin)
+    
+    # Pacotes de quiz: tópicos grandes (200 mil questões ~ 86MB, acima do limite do cache local)
+    # são compilados por uma thread na primeira requisição e após cada alteração, fora das requisições
+    QUIZ_WARM_MIN_QUESTIONS = 2000  # questões ativas a partir das quais o tópico é pré-compilado (None = desliga)
+    
+    # Compressão das respostas (HTML, JSON...) na camada WSGI
+    COMPRESSION_LEVEL = 6  # gzip 1-9: mais alto comprime mais e gasta mais CPU (0 = desliga)
+    COMPRESSION_BROTLI_QUALITY = 4  # brotli 0-11, usado quando o pacote brotli está instalado
+    COMPRESSION_MIN_SIZE = 500  # bytes: respostas menores vão sem compressão
+    
+    # Sessões de estudo: inícios gravados em lote por uma thread de fundo. A fila é de cada
+    # processo: a conclusão atendida por outro worker antes da gravação não conta o tempo de estudo
+    STUDY_SESSION_FLUSH_INTERVAL = 5  # segundos entre gravações (0 = grava na própria requisição)
+    STUDY_SESSION_BUFFER_SIZE = 500  # inícios na fila que antecipam a gravação
+    
+    # Atividade dos usuários (último acesso e último login), gravada em lote
+    ACTIVITY_FLUSH_INTERVAL = 60  # segundos entre gravações: no máximo uma escrita por usuário nesse intervalo
+    ACTIVITY_BUFFER_SIZE = 5000  # usuários com atividade pendente que antecipam a gravação
+    
+    # Instrumentação de SQL por requisição
+    SQL_SERVER_TIMING = True  # cabeçalho Server-Timing com quantidade e tempo das consultas
+    SQL_N_PLUS_ONE_LIMIT = None  # repetições da mesma consulta que disparam NPlusOneError
+    
     # Configurações de email (para futuras funcionalidades)
     MAIL_SERVER = os.environ.get('MAIL_SERVER')
     MAIL_PORT = int(os.environ.get('MAIL_PORT') or 587)
@@ -37,11 +83,19 @@ class ProductionConfig(Config):
     DEBUG = False
     FLASK_ENV = 'production'
     SESSION_COOKIE_SECURE = True
+    SQL_SERVER_TIMING = False
 
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    CACHE_BACKEND = 'null'
+    SQL_N_PLUS_ONE_LIMIT = 5
+    BCRYPT_ROUNDS = 4
+    BCRYPT_WORKERS = 0
+    STUDY_SESSION_FLUSH_INTERVAL = 0
+    ACTIVITY_FLUSH_INTERVAL = 0
+    QUIZ_WARM_MIN_QUESTIONS = None
 
 config = {
     'development': DevelopmentConfig,
@@ -1,10 +1,24 @@
 import os
 from flask import Flask
+from flask_wtf.csrf import generate_csrf
 from config import config
 from app.structure.database import init_app as init_db
+from app.structure.database.instrumentation import init_instrumentation
+from app.structure.functions.cache import init_cache
 from app.structure.auth.auth_manager import init_auth
+from app.structure.functions.activity import init_activity
 from app.structure.routes.auth_routes import auth
 from app.structure.routes.main_routes import main
+from app.structure.functions.progress_rollup import rollup_cli
+from app.structure.database.dataset import dataset_cli
+from app.structure.functions.search import search_cli
+from app.structure.functions.fuzzy_search import init_fuzzy_search
+from app.structure.functions.study_sessions import init_study_sessions
+from app.structure.functions.counters import init_counters, counter_cli
+from app.structure.functions.fragments import init_fragments
+from app.structure.functions.assets import init_assets, assets_cli
+from app.structure.functions.compression import init_compression
+from app.structure.functions.quiz_bundle import init_quiz_bundles, quiz_cli
 
 def create_app(config_name='default'):
     app = Flask(__name__, 
@@ -16,12 +30,35 @@ def create_app(config_name='default'):
     
     # Inicializar extensões
     init_db(app)
+    init_instrumentation(app)
+    init_cache(app)
+    init_fragments(app)
     init_auth(app)
+    init_activity(app)
+    init_fuzzy_search(app)
+    init_study_sessions(app)
+    init_counters(app)
+    init_assets(app)
+    init_quiz_bundles(app)
+    
+    # Token CSRF para as requisições fetch dos templates
+    app.jinja_env.globals['csrf_token'] = generate_csrf
     
     # Registrar blueprints
     app.register_blueprint(auth, url_prefix='/auth')
     app.register_blueprint(main)
     
+    # Comandos de manutenção
+    app.cli.add_command(rollup_cli)
+    app.cli.add_command(dataset_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(counter_cli)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(quiz_cli)
+    
+    # Compressão das respostas
+    init_compression(app)
+    
     # Criar diretórios necessários
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     
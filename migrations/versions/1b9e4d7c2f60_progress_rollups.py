@@ -0,0 +1,82 @@
+"""progress rollups
+
+Agregados de progresso por (usuário, disciplina) lidos pelo dashboard. A
+tabela é preenchida a partir de progress_records, study_sessions e
+quiz_attempts com a mesma regra de `flask rollups rebuild`; sem isso todo
+usuário de um banco existente veria 0% de progresso até o recálculo manual.
+
+Revision ID: 1b9e4d7c2f60
+Revises: c8f1e7a2d054
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1b9e4d7c2f60'
+down_revision = 'c8f1e7a2d054'
+branch_labels = None
+depends_on = None
+
+COUNTERS = ('topics_started', 'topics_completed', 'progress_sum', 'materials_completed',
+            'total_materials', 'study_minutes', 'quizzes_completed', 'quiz_score_sum')
+
+# Uma linha por fonte e (usuário, disciplina), com as colunas na ordem de COUNTERS
+SOURCES = '''
+    SELECT user_id, subject_id, COUNT(*) AS topics_started,
+           SUM(CASE WHEN progress_percentage >= 100 THEN 1 ELSE 0 END) AS topics_completed,
+           COALESCE(SUM(progress_percentage), 0.0) AS progress_sum,
+           COALESCE(SUM(materials_completed), 0) AS materials_completed,
+           COALESCE(SUM(total_materials), 0) AS total_materials,
+           0 AS study_minutes, 0 AS quizzes_completed, 0.0 AS quiz_score_sum
+    FROM progress_records GROUP BY user_id, subject_id
+    UNION ALL
+    SELECT user_id, subject_id, 0, 0, 0.0, 0, 0, COALESCE(SUM(duration_minutes), 0), 0, 0.0
+    FROM study_sessions GROUP BY user_id, subject_id
+    UNION ALL
+    SELECT user_id, subject_id, 0, 0, 0.0, 0, 0, 0, COUNT(*), COALESCE(SUM(score), 0.0)
+    FROM quiz_attempts WHERE completed = :completed GROUP BY user_id, subject_id
+'''
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    # Bancos criados pelo db.create_all() já têm a tabela
+    if 'progress_rollups' not in sa.inspect(bind).get_table_names():
+        op.create_table(
+            'progress_rollups',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('subject_id', sa.Integer(), nullable=False),
+            sa.Column('topics_started', sa.Integer(), nullable=False),
+            sa.Column('topics_completed', sa.Integer(), nullable=False),
+            sa.Column('progress_sum', sa.Float(), nullable=False),
+            sa.Column('materials_completed', sa.Integer(), nullable=False),
+            sa.Column('total_materials', sa.Integer(), nullable=False),
+            sa.Column('study_minutes', sa.Integer(), nullable=False),
+            sa.Column('quizzes_completed', sa.Integer(), nullable=False),
+            sa.Column('quiz_score_sum', sa.Float(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('user_id', 'subject_id', name='uq_progress_rollups_user_subject'),
+        )
+
+    if bind.execute(sa.text('SELECT 1 FROM progress_rollups LIMIT 1')).first() is not None:
+        return  # já mantida pela aplicação; divergências: flask rollups rebuild
+    columns = ', '.join(COUNTERS)
+    sums = ', '.join(f'SUM({name})' for name in COUNTERS)
+    # Por disciplina e, com subject_id = 0, os totais do usuário
+    for subject, group_by in (('subject_id', 'user_id, subject_id'), ('0', 'user_id')):
+        bind.execute(sa.text(
+            f'INSERT INTO progress_rollups (user_id, subject_id, {columns}, updated_at) '
+            f'SELECT user_id, {subject}, {sums}, CURRENT_TIMESTAMP FROM ({SOURCES}) source '
+            f'GROUP BY {group_by}'
+        ), {'completed': True})
+
+
+def downgrade():
+    op.drop_table('progress_rollups')
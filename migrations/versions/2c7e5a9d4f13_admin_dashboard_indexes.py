@@ -0,0 +1,38 @@
+"""indexes for the admin dashboard charts
+
+Os gráficos do painel administrativo contam administradores e agrupam por
+dia os últimos logins e as sessões de estudo dos últimos 7 dias; com estes
+índices essas consultas leem só as faixas necessárias.
+
+Revision ID: 2c7e5a9d4f13
+Revises: 9a4c2e7f1b38
+Create Date: 2026-10-21 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c7e5a9d4f13'
+down_revision = '9a4c2e7f1b38'
+branch_labels = None
+depends_on = None
+
+ADMIN_ONLY = {'sqlite_where': sa.text('is_admin = 1'), 'postgresql_where': sa.text('is_admin')}
+
+INDEXES = (
+    ('ix_users_last_login', 'users', ['last_login'], {}),
+    ('ix_users_admin', 'users', ['is_admin'], ADMIN_ONLY),
+    ('ix_study_sessions_start', 'study_sessions', ['start_time'], {}),
+)
+
+
+def upgrade():
+    for name, table, columns, options in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True, **options)
+
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,46 @@
+"""indexes for hot query paths
+
+O esquema base continua sendo criado por db.create_all(); esta revisão
+adiciona os índices em bancos já existentes (if_not_exists, então também
+pode rodar em bancos novos).
+
+Revision ID: 3f2a9c1d7b10
+Revises: 
+Create Date: 2026-10-18 17:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7b10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+ACTIVE_ONLY = {'sqlite_where': sa.text('is_active = 1'), 'postgresql_where': sa.text('is_active')}
+
+INDEXES = (
+    ('ix_topics_subject_active', 'topics', ['subject_id', 'is_active'], {}),
+    ('ix_topics_active', 'topics', ['is_active'], ACTIVE_ONLY),
+    ('ix_study_materials_topic_active', 'study_materials', ['topic_id', 'is_active'], {}),
+    ('ix_study_materials_active', 'study_materials', ['is_active'], ACTIVE_ONLY),
+    ('ix_questions_topic_active', 'questions', ['topic_id', 'is_active', 'difficulty_level'], {}),
+    ('ix_answers_question', 'answers', ['question_id'], {}),
+    ('ix_study_sessions_user_start', 'study_sessions', ['user_id', 'start_time'], {}),
+    ('ix_progress_records_user_subject_topic', 'progress_records', ['user_id', 'subject_id', 'topic_id'], {}),
+    ('ix_quiz_attempts_user_completed', 'quiz_attempts', ['user_id', 'completed'], {}),
+    ('ix_user_answers_attempt', 'user_answers', ['quiz_attempt_id'], {}),
+    ('ix_user_answers_question', 'user_answers', ['question_id'], {}),
+)
+
+
+def upgrade():
+    for name, table, columns, options in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True, **options)
+
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
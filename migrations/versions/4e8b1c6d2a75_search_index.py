@@ -0,0 +1,78 @@
+"""search index
+
+Índice textual de materiais e tópicos: FTS5 com gatilhos no SQLite, índices
+GIN de expressão no PostgreSQL. Bancos novos recebem os mesmos objetos no
+create_all (ver app/structure/functions/search.py); aqui só os bancos já
+existentes, com a reconstrução inicial a partir das tabelas de origem.
+
+Revision ID: 4e8b1c6d2a75
+Revises: 1b9e4d7c2f60
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e8b1c6d2a75'
+down_revision = '1b9e4d7c2f60'
+branch_labels = None
+depends_on = None
+
+FTS_INDEXES = {
+    'study_materials_fts': ('study_materials', 'title', 'content'),
+    'topics_fts': ('topics', 'name', 'description'),
+}
+
+GIN_INDEXES = {
+    'ix_study_materials_search': ('study_materials', "coalesce(title, '') || ' ' || coalesce(content, '')"),
+    'ix_topics_search': ('topics', "coalesce(name, '') || ' ' || coalesce(description, '')"),
+}
+
+
+def _fts_ddl(index, table, title, body):
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5(
+                {title}, {body}, content='{table}', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2')""",
+        f"""CREATE TRIGGER IF NOT EXISTS {index}_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO {index}(rowid, {title}, {body}) VALUES (new.id, new.{title}, new.{body});
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {index}_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO {index}({index}, rowid, {title}, {body})
+                VALUES ('delete', old.id, old.{title}, old.{body});
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {index}_au AFTER UPDATE OF {title}, {body} ON {table} BEGIN
+                INSERT INTO {index}({index}, rowid, {title}, {body})
+                VALUES ('delete', old.id, old.{title}, old.{body});
+                INSERT INTO {index}(rowid, {title}, {body}) VALUES (new.id, new.{title}, new.{body});
+            END""",
+    ]
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        existing = set(sa.inspect(bind).get_table_names())
+        for index, (table, title, body) in FTS_INDEXES.items():
+            for statement in _fts_ddl(index, table, title, body):
+                op.execute(statement)
+            if index not in existing:
+                op.execute(f"INSERT INTO {index}({index}) VALUES ('rebuild')")
+    elif bind.dialect.name == 'postgresql':
+        for index, (table, document) in GIN_INDEXES.items():
+            op.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {table} USING GIN "
+                       f"(to_tsvector('portuguese', {document}))")
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for index in FTS_INDEXES:
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f'DROP TRIGGER IF EXISTS {index}_{suffix}')
+            op.execute(f'DROP TABLE IF EXISTS {index}')
+    elif bind.dialect.name == 'postgresql':
+        for index in GIN_INDEXES:
+            op.execute(f'DROP INDEX IF EXISTS {index}')
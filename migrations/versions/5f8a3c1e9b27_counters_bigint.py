@@ -0,0 +1,32 @@
+"""counters.value as bigint
+
+As versões da tabela counters (catalog_version, quiz_topic:<id>) partem dos
+milissegundos do relógio, que não cabem em um INTEGER do PostgreSQL. No
+SQLite todo inteiro já tem 64 bits.
+
+Revision ID: 5f8a3c1e9b27
+Revises: 2c7e5a9d4f13
+Create Date: 2026-10-21 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f8a3c1e9b27'
+down_revision = '2c7e5a9d4f13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        op.alter_column('counters', 'value', type_=sa.BigInteger(),
+                        existing_type=sa.Integer(), existing_nullable=False)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        op.alter_column('counters', 'value', type_=sa.Integer(),
+                        existing_type=sa.BigInteger(), existing_nullable=False)
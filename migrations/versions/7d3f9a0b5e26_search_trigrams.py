@@ -0,0 +1,54 @@
+"""search trigrams
+
+Índice de trigramas da busca tolerante a erros de digitação. O conteúdo é
+calculado em Python (ver app/structure/functions/fuzzy_search.py): a
+aplicação o constrói na inicialização quando a tabela está vazia, ou
+`flask search rebuild-trigrams`.
+
+Revision ID: 7d3f9a0b5e26
+Revises: 4e8b1c6d2a75
+Create Date: 2026-10-20 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3f9a0b5e26'
+down_revision = '4e8b1c6d2a75'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = sa.inspect(op.get_bind()).get_table_names()
+
+    # Bancos criados pelo db.create_all() já têm as tabelas
+    if 'search_terms' not in tables:
+        op.create_table(
+            'search_terms',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('doc_type', sa.String(length=20), nullable=False),
+            sa.Column('doc_id', sa.Integer(), nullable=False),
+            sa.Column('folded', sa.String(length=200), nullable=False),
+            sa.Column('trigram_count', sa.Integer(), nullable=False),
+            sa.Column('is_active', sa.Boolean(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('doc_type', 'doc_id', name='uq_search_terms_doc'),
+        )
+    if 'search_trigrams' not in tables:
+        op.create_table(
+            'search_trigrams',
+            sa.Column('trigram', sa.String(length=3), nullable=False),
+            sa.Column('term_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['term_id'], ['search_terms.id']),
+            sa.PrimaryKeyConstraint('trigram', 'term_id'),
+        )
+        op.create_index('ix_search_trigrams_term_id', 'search_trigrams', ['term_id'])
+
+
+def downgrade():
+    op.drop_index('ix_search_trigrams_term_id', table_name='search_trigrams')
+    op.drop_table('search_trigrams')
+    op.drop_table('search_terms')
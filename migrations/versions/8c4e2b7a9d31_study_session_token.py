@@ -0,0 +1,35 @@
+"""study session token
+
+Token aleatório que identifica a sessão de estudo no formulário de
+conclusão; as sessões passam a ser inseridas em lote, sem id na requisição.
+
+Revision ID: 8c4e2b7a9d31
+Revises: 3f2a9c1d7b10
+Create Date: 2026-10-18 19:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4e2b7a9d31'
+down_revision = '3f2a9c1d7b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bancos criados pelo db.create_all() já têm a coluna (o SQLite não
+    # aceita ADD COLUMN IF NOT EXISTS)
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('study_sessions')}
+    if 'session_token' not in columns:
+        op.add_column('study_sessions', sa.Column('session_token', sa.String(length=32), nullable=True))
+    op.create_index('uq_study_sessions_token', 'study_sessions', ['session_token'], unique=True,
+                    if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('uq_study_sessions_token', table_name='study_sessions', if_exists=True)
+    with op.batch_alter_table('study_sessions') as batch_op:
+        batch_op.drop_column('session_token')
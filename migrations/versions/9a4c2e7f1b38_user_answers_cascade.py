@@ -0,0 +1,59 @@
+"""user answers cascade
+
+As respostas de uma tentativa são apagadas junto com ela (exclusão de
+conta). No SQLite a chave estrangeira só muda recriando a tabela.
+
+Revision ID: 9a4c2e7f1b38
+Revises: 7d3f9a0b5e26
+Create Date: 2026-10-20 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4c2e7f1b38'
+down_revision = '7d3f9a0b5e26'
+branch_labels = None
+depends_on = None
+
+
+def _user_answers(ondelete):
+    return sa.Table(
+        'user_answers', sa.MetaData(),
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('quiz_attempt_id', sa.Integer(),
+                  sa.ForeignKey('quiz_attempts.id', ondelete=ondelete), nullable=False),
+        sa.Column('question_id', sa.Integer(), sa.ForeignKey('questions.id'), nullable=False),
+        sa.Column('selected_answer_id', sa.Integer(), sa.ForeignKey('answers.id'), nullable=False),
+        sa.Column('is_correct', sa.Boolean(), nullable=True),
+        sa.Column('time_taken', sa.Integer(), nullable=True),
+        sa.Index('ix_user_answers_attempt', 'quiz_attempt_id'),
+        sa.Index('ix_user_answers_question', 'question_id'),
+    )
+
+
+def _set_ondelete(ondelete):
+    bind = op.get_bind()
+    foreign_key = next(fk for fk in sa.inspect(bind).get_foreign_keys('user_answers')
+                       if fk['referred_table'] == 'quiz_attempts')
+    # Bancos criados pelo db.create_all() já têm a regra
+    if (foreign_key['options'].get('ondelete') or '').upper() == (ondelete or ''):
+        return
+    if bind.dialect.name == 'sqlite':
+        with op.batch_alter_table('user_answers', copy_from=_user_answers(ondelete), recreate='always'):
+            pass
+    else:
+        name = foreign_key['name']
+        op.drop_constraint(name, 'user_answers', type_='foreignkey')
+        op.create_foreign_key(name, 'user_answers', 'quiz_attempts', ['quiz_attempt_id'], ['id'],
+                              ondelete=ondelete)
+
+
+def upgrade():
+    _set_ondelete('CASCADE')
+
+
+def downgrade():
+    _set_ondelete(None)
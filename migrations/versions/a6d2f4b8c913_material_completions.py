@@ -0,0 +1,68 @@
+"""material completions
+
+Conclusões por (usuário, material) e o índice único de progresso por
+tópico usado pelo upsert da conclusão. Bancos com progresso duplicado por
+(user_id, topic_id) precisam ser corrigidos antes: a migração para com a
+lista dos pares duplicados. As conclusões já registradas nas sessões de
+estudo são importadas.
+
+Revision ID: a6d2f4b8c913
+Revises: e5b37c0a9f18
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d2f4b8c913'
+down_revision = 'e5b37c0a9f18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    # Bancos criados pelo db.create_all() já têm a tabela e o índice
+    if 'material_completions' not in inspector.get_table_names():
+        op.create_table(
+            'material_completions',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('material_id', sa.Integer(), nullable=False),
+            sa.Column('topic_id', sa.Integer(), nullable=False),
+            sa.Column('completed_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.ForeignKeyConstraint(['material_id'], ['study_materials.id']),
+            sa.ForeignKeyConstraint(['topic_id'], ['topics.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('user_id', 'material_id', name='uq_material_completions_user_material'),
+        )
+
+    if 'uq_progress_records_user_topic' not in {i['name'] for i in inspector.get_indexes('progress_records')}:
+        duplicates = bind.execute(sa.text(
+            'SELECT user_id, topic_id FROM progress_records '
+            'GROUP BY user_id, topic_id HAVING COUNT(*) > 1 LIMIT 10'
+        )).all()
+        if duplicates:
+            raise RuntimeError(
+                'progress_records tem mais de uma linha para os pares (user_id, topic_id) '
+                f'{[tuple(row) for row in duplicates]}; remova as duplicatas e rode a migração de novo')
+        op.create_index('uq_progress_records_user_topic', 'progress_records',
+                        ['user_id', 'topic_id'], unique=True)
+
+    if bind.execute(sa.text('SELECT 1 FROM material_completions LIMIT 1')).first() is None:
+        bind.execute(sa.text(
+            'INSERT INTO material_completions (user_id, material_id, topic_id, completed_at) '
+            'SELECT user_id, material_id, MIN(topic_id), MIN(end_time) FROM study_sessions '
+            'WHERE completed = :completed AND material_id IS NOT NULL '
+            'GROUP BY user_id, material_id'
+        ), {'completed': True})
+
+
+def downgrade():
+    op.drop_index('uq_progress_records_user_topic', table_name='progress_records')
+    op.drop_table('material_completions')
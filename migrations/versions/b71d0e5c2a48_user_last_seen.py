@@ -0,0 +1,30 @@
+"""user last seen
+
+Último acesso de cada usuário, gravado em lote pelo registro de atividade.
+
+Revision ID: b71d0e5c2a48
+Revises: 8c4e2b7a9d31
+Create Date: 2026-10-18 19:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b71d0e5c2a48'
+down_revision = '8c4e2b7a9d31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bancos criados pelo db.create_all() já têm a coluna
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('users')}
+    if 'last_seen' not in columns:
+        op.add_column('users', sa.Column('last_seen', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('last_seen')
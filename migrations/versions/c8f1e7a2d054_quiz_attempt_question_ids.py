@@ -0,0 +1,32 @@
+"""quiz attempt question ids
+
+Questões sorteadas para cada tentativa, gravadas com ela: a correção só
+aceita respostas dessas questões, em qualquer worker. Tentativas abertas
+antes desta revisão precisam ser reiniciadas.
+
+Revision ID: c8f1e7a2d054
+Revises: a6d2f4b8c913
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8f1e7a2d054'
+down_revision = 'a6d2f4b8c913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bancos criados pelo db.create_all() já têm a coluna
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('quiz_attempts')}
+    if 'question_ids' not in columns:
+        op.add_column('quiz_attempts', sa.Column('question_ids', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('quiz_attempts') as batch_op:
+        batch_op.drop_column('question_ids')
@@ -0,0 +1,35 @@
+"""counters
+
+Contadores de linhas (totais e ativas) mantidos por eventos do ORM, lidos
+pela página inicial e pelo painel administrativo. Rode `flask counters
+reconcile` depois de aplicar (a aplicação também preenche a tabela vazia
+ao iniciar).
+
+Revision ID: d4a19f6e3c52
+Revises: b71d0e5c2a48
+Create Date: 2026-10-18 21:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a19f6e3c52'
+down_revision = 'b71d0e5c2a48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'counters',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_table('counters')
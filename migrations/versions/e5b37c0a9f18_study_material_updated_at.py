@@ -0,0 +1,32 @@
+"""study material updated_at
+
+Revisão de cada material, usada como Last-Modified/ETag da página de
+estudo. Materiais existentes começam com a data de criação.
+
+Revision ID: e5b37c0a9f18
+Revises: d4a19f6e3c52
+Create Date: 2026-10-18 22:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b37c0a9f18'
+down_revision = 'd4a19f6e3c52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bancos criados pelo db.create_all() já têm a coluna
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('study_materials')}
+    if 'updated_at' not in columns:
+        op.add_column('study_materials', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute('UPDATE study_materials SET updated_at = created_at WHERE updated_at IS NULL')
+
+
+def downgrade():
+    with op.batch_alter_table('study_materials') as batch_op:
+        batch_op.drop_column('updated_at')
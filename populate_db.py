@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 """
 Script para popular o banco de dados com dados iniciais do sistema ENEM
+
+Para bases grandes (testes de desempenho) use o gerador em lote:
+    flask --app main dataset generate --scale production
 """
 
 from main import create_app
@@ -9,6 +12,8 @@ from app.structure.database.models import (
     User, Subject, Topic, StudyMaterial, Question, Answer
 )
 from app.structure.auth.auth_manager import create_user
+from app.structure.functions.counters import reconcile_counters
+from app.structure.functions.fuzzy_search import rebuild_trigram_index
 from datetime import datetime
 
 def populate_database():
@@ -125,13 +130,11 @@ def populate_database():
             }
         ]
         
-        subjects = {}
-        for subject_data in subjects_data:
-            subject = Subject(**subject_data)
-            db.session.add(subject)
-            db.session.flush()  # Para obter o ID
-            subjects[subject.name] = subject
-            print(f"Disciplina criada: {subject.name}")
+        # Cada tabela é gravada com um único INSERT em lote; os ids gerados
+        # são lidos de volta com uma consulta, em vez de um flush por linha
+        db.session.execute(db.insert(Subject), subjects_data)
+        subjects = dict(db.session.query(Subject.name, Subject.id))
+        print(f"{len(subjects)} disciplinas criadas")
         
         # Criar tópicos para cada disciplina
         print("Criando tópicos...")
@@ -178,16 +181,15 @@ def populate_database():
             ]
         }
         
-        topics = {}
-        for subject_name, topic_list in topics_data.items():
-            if subject_name in subjects:
-                for topic_data in topic_list:
-                    topic_data['subject_id'] = subjects[subject_name].id
-                    topic = Topic(**topic_data)
-                    db.session.add(topic)
-                    db.session.flush()
-                    topics[f"{subject_name}_{topic.name}"] = topic
-                    print(f"Tópico criado: {subject_name} - {topic.name}")
+        db.session.execute(db.insert(Topic), [
+            dict(topic_data, subject_id=subjects[subject_name])
+            for subject_name, topic_list in topics_data.items() if subject_name in subjects
+            for topic_data in topic_list
+        ])
+        subject_names = {subject_id: name for name, subject_id in subjects.items()}
+        topics = {f"{subject_names[subject_id]}_{name}": (subject_id, topic_id)
+                  for topic_id, subject_id, name in db.session.query(Topic.id, Topic.subject_id, Topic.name)}
+        print(f"{len(topics)} tópicos criados")
         
         # Criar materiais de estudo
         print("Criando materiais de estudo...")
@@ -303,17 +305,15 @@ def populate_database():
             }
         ]
         
+        material_rows = []
         for material_data in materials_data:
-            subject_name = material_data.pop('subject')
-            topic_name = material_data.pop('topic')
-            topic_key = f"{subject_name}_{topic_name}"
-            
+            topic_key = f"{material_data.pop('subject')}_{material_data.pop('topic')}"
             if topic_key in topics:
-                material_data['subject_id'] = topics[topic_key].subject_id
-                material_data['topic_id'] = topics[topic_key].id
-                material = StudyMaterial(**material_data)
-                db.session.add(material)
-                print(f"Material criado: {material.title}")
+                material_data['subject_id'], material_data['topic_id'] = topics[topic_key]
+                material_rows.append(material_data)
+        if material_rows:
+            db.session.execute(db.insert(StudyMaterial), material_rows)
+        print(f"{len(material_rows)} materiais criados")
         
         # Criar algumas questões de exemplo
         print("Criando questões de exemplo...")
@@ -359,29 +359,29 @@ def populate_database():
             }
         ]
         
+        question_rows, answers_by_question = [], {}
         for question_data in questions_data:
-            subject_name = question_data.pop('subject')
-            topic_name = question_data.pop('topic')
+            topic_key = f"{question_data.pop('subject')}_{question_data.pop('topic')}"
             answers_data = question_data.pop('answers')
-            
-            topic_key = f"{subject_name}_{topic_name}"
             if topic_key in topics:
-                question_data['subject_id'] = topics[topic_key].subject_id
-                question_data['topic_id'] = topics[topic_key].id
-                
-                question = Question(**question_data)
-                db.session.add(question)
-                db.session.flush()
-                
-                for answer_data in answers_data:
-                    answer_data['question_id'] = question.id
-                    answer = Answer(**answer_data)
-                    db.session.add(answer)
-                
-                print(f"Questão criada: {question.question_text[:50]}...")
+                question_data['subject_id'], question_data['topic_id'] = topics[topic_key]
+                question_rows.append(question_data)
+                answers_by_question[(question_data['topic_id'], question_data['question_text'])] = answers_data
+        if question_rows:
+            db.session.execute(db.insert(Question), question_rows)
+            question_ids = db.session.query(Question.id, Question.topic_id, Question.question_text)
+            db.session.execute(db.insert(Answer), [
+                dict(answer_data, question_id=question_id)
+                for question_id, topic_id, text in question_ids
+                for answer_data in answers_by_question.get((topic_id, text), ())
+            ])
+        print(f"{len(question_rows)} questões criadas")
         
-        # Commit final
+        # Commit final; a limpeza com DELETE e as inserções em lote não passam
+        # pelos eventos dos contadores nem do índice de trigramas
         db.session.commit()
+        reconcile_counters()
+        rebuild_trigram_index()
         print("\n✅ Banco de dados populado com sucesso!")
         print("\nCredenciais de acesso:")
         print("👤 Admin: admin / admin123")